@@ -0,0 +1,43 @@
+"""Add unique index on cart_items user_id and product_id
+
+Revision ID: 3f1b9c2d7a4e
+Revises: e9de878839a5
+Create Date: 2026-10-18 09:12:31.402117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1b9c2d7a4e'
+down_revision: Union[str, Sequence[str], None] = 'e9de878839a5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Merge duplicate rows left by concurrent adds into the oldest one before enforcing uniqueness.
+    op.execute("""
+        UPDATE cart_items
+        SET quantity = (
+            SELECT SUM(dup.quantity) FROM cart_items AS dup
+            WHERE dup.user_id = cart_items.user_id AND dup.product_id = cart_items.product_id
+        )
+        WHERE id IN (
+            SELECT MIN(id) FROM cart_items GROUP BY user_id, product_id HAVING COUNT(*) > 1
+        )
+    """)
+    op.execute("""
+        DELETE FROM cart_items
+        WHERE id NOT IN (SELECT MIN(id) FROM cart_items GROUP BY user_id, product_id)
+    """)
+    op.create_index('ix_cart_items_user_id_product_id', 'cart_items', ['user_id', 'product_id'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_cart_items_user_id_product_id', table_name='cart_items')
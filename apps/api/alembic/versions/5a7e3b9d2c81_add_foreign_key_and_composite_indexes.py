@@ -0,0 +1,37 @@
+"""Add foreign key and composite indexes
+
+Revision ID: 5a7e3b9d2c81
+Revises: 8c4d2e6f1a9b
+Create Date: 2026-10-18 13:05:52.690318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a7e3b9d2c81'
+down_revision: Union[str, Sequence[str], None] = '8c4d2e6f1a9b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # cart_items.user_id is already the leading column of ix_cart_items_user_id_product_id.
+    op.create_index(op.f('ix_cart_items_product_id'), 'cart_items', ['product_id'], unique=False)
+    op.create_index('ix_orders_user_id_order_date', 'orders', ['user_id', 'order_date'], unique=False)
+    op.create_index(op.f('ix_order_items_order_id'), 'order_items', ['order_id'], unique=False)
+    op.create_index(op.f('ix_order_items_product_id'), 'order_items', ['product_id'], unique=False)
+    op.create_index('ix_products_category_id_id', 'products', ['category_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_products_category_id_id', table_name='products')
+    op.drop_index(op.f('ix_order_items_product_id'), table_name='order_items')
+    op.drop_index(op.f('ix_order_items_order_id'), table_name='order_items')
+    op.drop_index('ix_orders_user_id_order_date', table_name='orders')
+    op.drop_index(op.f('ix_cart_items_product_id'), table_name='cart_items')
@@ -0,0 +1,31 @@
+"""Add product keyset pagination indexes
+
+Revision ID: b61e0f4a93d7
+Revises: 5a7e3b9d2c81
+Create Date: 2026-10-18 14:22:18.047731
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b61e0f4a93d7'
+down_revision: Union[str, Sequence[str], None] = '5a7e3b9d2c81'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # (category_id, id) from the previous revision covers the unsorted listing.
+    op.create_index('ix_products_price_id', 'products', ['price', 'id'], unique=False)
+    op.create_index('ix_products_category_id_price_id', 'products', ['category_id', 'price', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_products_category_id_price_id', table_name='products')
+    op.drop_index('ix_products_price_id', table_name='products')
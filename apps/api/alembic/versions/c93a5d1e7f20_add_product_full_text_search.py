@@ -0,0 +1,70 @@
+"""Add product full-text search
+
+Revision ID: c93a5d1e7f20
+Revises: b61e0f4a93d7
+Create Date: 2026-10-18 15:48:36.518220
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c93a5d1e7f20'
+down_revision: Union[str, Sequence[str], None] = 'b61e0f4a93d7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute("""
+            ALTER TABLE products ADD COLUMN search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+                setweight(to_tsvector('english', coalesce(description, '')), 'B')
+            ) STORED
+        """)
+        op.execute("CREATE INDEX ix_products_search_vector ON products USING GIN (search_vector)")
+    elif dialect == "sqlite":
+        op.execute("""
+            CREATE VIRTUAL TABLE products_fts USING fts5(
+                name, description, content='products', content_rowid='id', tokenize='porter unicode61'
+            )
+        """)
+        op.execute("INSERT INTO products_fts(products_fts, rank) VALUES ('rank', 'bm25(4.0, 1.0)')")
+        op.execute("""
+            CREATE TRIGGER products_fts_ai AFTER INSERT ON products BEGIN
+                INSERT INTO products_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER products_fts_ad AFTER DELETE ON products BEGIN
+                INSERT INTO products_fts(products_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER products_fts_au AFTER UPDATE OF name, description ON products BEGIN
+                INSERT INTO products_fts(products_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+                INSERT INTO products_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+            END
+        """)
+        # Index the rows that already exist
+        op.execute("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute("DROP INDEX ix_products_search_vector")
+        op.execute("ALTER TABLE products DROP COLUMN search_vector")
+    elif dialect == "sqlite":
+        op.execute("DROP TRIGGER products_fts_au")
+        op.execute("DROP TRIGGER products_fts_ad")
+        op.execute("DROP TRIGGER products_fts_ai")
+        op.execute("DROP TABLE products_fts")
@@ -0,0 +1,32 @@
+"""Add product sku
+
+Revision ID: d27a4f8b1c36
+Revises: c93a5d1e7f20
+Create Date: 2026-10-18 17:05:12.381904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd27a4f8b1c36'
+down_revision: Union[str, Sequence[str], None] = 'c93a5d1e7f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Nullable: existing products have no sku until an import sets one, and NULLs
+    # never collide in a unique index.
+    op.add_column('products', sa.Column('sku', sa.String(), nullable=True))
+    op.create_index('ix_products_sku', 'products', ['sku'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_products_sku', table_name='products')
+    op.drop_column('products', 'sku')
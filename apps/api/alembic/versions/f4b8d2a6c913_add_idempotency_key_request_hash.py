@@ -0,0 +1,32 @@
+"""Add idempotency key request hash and created_at index
+
+Revision ID: f4b8d2a6c913
+Revises: d27a4f8b1c36
+Create Date: 2026-10-18 22:30:41.517209
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4b8d2a6c913'
+down_revision: Union[str, Sequence[str], None] = 'd27a4f8b1c36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Nullable: keys stored before this revision carry no hash and replay as before.
+    op.add_column('idempotency_keys', sa.Column('request_hash', sa.String(length=64), nullable=True))
+    # Expired keys are purged by created_at
+    op.create_index('ix_idempotency_keys_created_at', 'idempotency_keys', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_idempotency_keys_created_at', table_name='idempotency_keys')
+    op.drop_column('idempotency_keys', 'request_hash')
@@ -0,0 +1,239 @@
+import csv
+import itertools
+import json
+import math
+import time
+from typing import Iterable, Iterator, NamedTuple
+
+from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from . import catalog, crud, models
+from .config import BULK_IMPORT_CHUNK_SIZE, BULK_IMPORT_MAX_ERRORS
+
+# Streaming product import. Rows are parsed and checked one at a time and written in
+# chunks of multi-row INSERT ... ON CONFLICT (sku) DO UPDATE, each committed on its own,
+# so memory stays flat for any feed size and a failing chunk never undoes earlier ones.
+
+FORMATS = ("csv", "ndjson")
+UPDATED_COLUMNS = ("name", "description", "price", "image_url", "stock", "category_id")
+
+
+class RowError(ValueError):
+    pass
+
+
+class ImportedProduct(NamedTuple):
+    id: int
+    name: str
+    description: str
+    category_id: int
+    price: float
+    category_name: str
+
+
+class InvalidLine(str):
+    """Stands in (as a blank line) for a line that is not valid UTF-8."""
+
+    def __new__(cls, error: UnicodeDecodeError):
+        line = super().__new__(cls, "\n")
+        line.error = RowError(f"invalid UTF-8: {error.reason} at byte {error.start}")
+        return line
+
+
+def decode(line: bytes) -> str:
+    try:
+        return line.decode("utf-8")
+    except UnicodeDecodeError as error:
+        return InvalidLine(error)
+
+def iter_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    """Decoded lines of a byte stream, whatever the chunk boundaries.
+
+    Lines are decoded one at a time, so a bad byte costs its own line (an InvalidLine)
+    rather than the rest of the feed.
+    """
+    pending = b""
+    for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield decode(line + b"\n")
+    if pending:
+        yield decode(pending)
+
+def parse_records(lines: Iterable[str], format: str):
+    """Yield (line number, record dict or RowError) for a CSV (with header) or NDJSON feed."""
+    lines = iter(lines)
+    first = next(lines, "")
+    lines = itertools.chain([first if isinstance(first, InvalidLine) else first.removeprefix("\ufeff")], lines)
+    if format == "csv":
+        # The csv reader sees invalid lines as blank ones; their errors are reported in
+        # line order once the reader has read past them.
+        invalid = []
+
+        def checked(lines):
+            for line_number, line in enumerate(lines, start=1):
+                if isinstance(line, InvalidLine):
+                    invalid.append((line_number, line.error))
+                yield line
+
+        reader = csv.DictReader(checked(lines))
+        for record in reader:
+            yield from invalid
+            invalid.clear()
+            yield reader.line_num, record
+        yield from invalid
+        return
+    for line_number, line in enumerate(lines, start=1):
+        if isinstance(line, InvalidLine):
+            yield line_number, line.error
+            continue
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as error:
+            yield line_number, RowError(f"invalid JSON: {error}")
+            continue
+        yield line_number, record if isinstance(record, dict) else RowError("expected a JSON object")
+
+
+class CategoryMap:
+    """Category name -> id, loaded with one query instead of one lookup per row."""
+
+    def __init__(self, db: Session, create_missing: bool = False):
+        self.db = db
+        self.create_missing = create_missing
+        self.ids = dict(db.query(models.Category.name, models.Category.id).all())
+        self.names = {category_id: name for name, category_id in self.ids.items()}
+        self.created = []
+
+    def resolve(self, name: str) -> int:
+        category_id = self.ids.get(name)
+        if category_id is not None:
+            return category_id
+        if not self.create_missing:
+            raise RowError(f"Category '{name}' not found")
+        # Committed right away (no chunk is pending while rows are being checked), so a
+        # later failing chunk can't roll back a category the map already handed out.
+        category = models.Category(name=name)
+        self.db.add(category)
+        self.db.commit()
+        self.ids[name] = category.id
+        self.names[category.id] = name
+        self.created.append(name)
+        return category.id
+
+
+def product_row(record: dict, categories: CategoryMap) -> dict:
+    """Check one record and turn it into products column values."""
+    sku = str(record.get("sku") or "").strip()
+    if not sku:
+        raise RowError("sku is required")
+    name = str(record.get("name") or "").strip()
+    if not name:
+        raise RowError("name is required")
+    try:
+        price = float(record.get("price"))
+    except (TypeError, ValueError):
+        raise RowError("price must be a number")
+    if not math.isfinite(price) or price < 0:
+        raise RowError("price must be a non-negative number")
+    try:
+        stock = int(record.get("stock") or 0)
+    except (TypeError, ValueError):
+        raise RowError("stock must be an integer")
+    if stock < 0:
+        raise RowError("stock must not be negative")
+    category = str(record.get("category") or "").strip()
+    if not category:
+        raise RowError("category is required")
+    return {
+        "sku": sku,
+        "name": name,
+        "description": record.get("description") or None,
+        "price": price,
+        "image_url": record.get("image_url") or record.get("imageUrl") or None,
+        "stock": stock,
+        "category_id": categories.resolve(category),
+    }
+
+def upsert_products(db: Session, rows):
+    """Insert rows or update the products already holding their sku.
+
+    Executed as a Core executemany, so the statement compiles once and SQLAlchemy
+    ("insertmanyvalues") sends the rows as batched multi-row VALUES; building a
+    ``.values(rows)`` statement per chunk costs more than the database write.
+    """
+    products = models.Product.__table__
+    stmt = crud.dialect_insert(db, products)
+    updates = {column: stmt.excluded[column] for column in UPDATED_COLUMNS}
+    stmt = stmt.on_conflict_do_update(index_elements=[products.c.sku], set_={**updates, "updated_at": func.now()})
+    stmt = stmt.returning(products.c.id, products.c.name, products.c.description, products.c.category_id, products.c.price)
+    return db.connection().execute(stmt, rows).all()
+
+
+def import_products(db: Session, records, chunk_size: int = BULK_IMPORT_CHUNK_SIZE, create_categories: bool = False, on_chunk=None):
+    """Import (line number, record) pairs from parse_records and return a report.
+
+    ``on_chunk(stats)`` is called after every chunk with its row count, timing and
+    throughput. Rows that fail validation, and every row of a chunk the database
+    rejects, are counted and listed (up to BULK_IMPORT_MAX_ERRORS) in ``errors``.
+    """
+    categories = CategoryMap(db, create_missing=create_categories)
+    report = {"rows": 0, "written": 0, "failed": 0, "chunks": [], "errors": [], "created_categories": categories.created}
+    started = time.perf_counter()
+
+    def fail(line, error, sku=None):
+        report["failed"] += 1
+        if len(report["errors"]) < BULK_IMPORT_MAX_ERRORS:
+            report["errors"].append({"line": line, "sku": sku, "error": str(error)})
+
+    def flush(chunk, chunk_started):
+        # A sku repeated within one chunk keeps its last row: ON CONFLICT can't touch a row twice.
+        rows = list({row["sku"]: row for _, row in chunk}.values())
+        try:
+            written = upsert_products(db, rows)
+            db.commit()
+        except SQLAlchemyError as error:
+            db.rollback()
+            for line, row in chunk:
+                fail(line, getattr(error, "orig", error), row["sku"])
+            written = []
+        else:
+            report["written"] += len(written)
+            catalog.products_changed([ImportedProduct(*row, categories.names.get(row[3])) for row in written])
+        seconds = time.perf_counter() - chunk_started
+        stats = {
+            "chunk": len(report["chunks"]) + 1,
+            "rows": len(chunk),
+            "written": len(written),
+            "seconds": round(seconds, 4),
+            "rows_per_second": round(len(chunk) / seconds) if seconds else None,
+        }
+        report["chunks"].append(stats)
+        if on_chunk:
+            on_chunk(stats)
+
+    chunk, chunk_started = [], time.perf_counter()
+    for line, record in records:
+        report["rows"] += 1
+        if isinstance(record, RowError):
+            fail(line, record)
+            continue
+        try:
+            chunk.append((line, product_row(record, categories)))
+        except RowError as error:
+            fail(line, error, record.get("sku"))
+            continue
+        if len(chunk) >= chunk_size:
+            flush(chunk, chunk_started)
+            chunk, chunk_started = [], time.perf_counter()
+    if chunk:
+        flush(chunk, chunk_started)
+
+    report["seconds"] = round(time.perf_counter() - started, 4)
+    report["rows_per_second"] = round(report["rows"] / report["seconds"]) if report["seconds"] else None
+    return report
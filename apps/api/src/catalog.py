@@ -0,0 +1,67 @@
+# In-process listeners for product and cart writes, so derived in-memory structures (search
+# indexes, caches) follow the catalog without polling the database.
+
+_listeners = []
+_bulk_listeners = []
+_update_listeners = []
+_sales_listeners = []
+_cart_listeners = []
+
+def on_product_change(listener):
+    """Register ``listener(product)``; called after a product is created or updated and committed."""
+    _listeners.append(listener)
+    return listener
+
+def remove_listener(listener):
+    """Unregister ``listener`` from every event it was registered for."""
+    for listeners in (_listeners, _bulk_listeners, _update_listeners, _sales_listeners, _cart_listeners):
+        if listener in listeners:
+            listeners.remove(listener)
+
+def product_changed(product):
+    for listener in list(_listeners):
+        listener(product)
+
+def on_products_change(listener):
+    """Register ``listener(products)``; called after a bulk write commits.
+
+    ``products`` are the written rows with ``id``, ``name``, ``description``,
+    ``category_id``, ``price`` and ``category_name``, so listeners need no database access.
+    """
+    _bulk_listeners.append(listener)
+    return listener
+
+def products_changed(products):
+    for listener in list(_bulk_listeners):
+        listener(products)
+
+def on_products_updated(listener):
+    """Register ``listener(product_ids, prices)``; called after a bulk price/stock update commits.
+
+    ``prices`` maps the ids whose price was set to the new price. Names, descriptions
+    and categories are untouched, so text indexes can ignore it.
+    """
+    _update_listeners.append(listener)
+    return listener
+
+def products_updated(product_ids, prices=None):
+    for listener in list(_update_listeners):
+        listener(product_ids, prices or {})
+
+def on_products_sold(listener):
+    """Register ``listener(quantities)``; called with {product_id: units} after a checkout commits."""
+    _sales_listeners.append(listener)
+    return listener
+
+def products_sold(quantities):
+    for listener in list(_sales_listeners):
+        listener(quantities)
+
+def on_cart_change(listener):
+    """Register ``listener(user_id)``; called after a user's cart is written and committed."""
+    _cart_listeners.append(listener)
+    return listener
+
+def cart_changed(user_id):
+    for listener in list(_cart_listeners):
+        listener(user_id)
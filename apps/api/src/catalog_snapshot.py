@@ -0,0 +1,281 @@
+import copy
+import threading
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import catalog, models, versions
+
+NO_CATEGORY = -1
+# More price changes than this in one update re-sort the snapshot instead of moving each product
+REINSERT_MAX = 1000
+
+
+class CatalogSnapshot:
+    """Columnar copy of the product fields listings filter and sort on.
+
+    One NumPy array per column, all in id order, plus orderings computed once at
+    build time: by (price, id), and both of those grouped by category so that a
+    category is one contiguous slice. A listing page narrows the right ordering
+    with binary searches (category, price range on a price sort) and boolean masks
+    (everything else), so a query costs a few vector passes over the candidates and
+    no SQL beyond loading the page's rows by primary key.
+    """
+
+    def __init__(self, ids, prices, stock, category_ids, version: str = None):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.prices = np.asarray(prices, dtype=np.float64)
+        self.stock = np.asarray(stock, dtype=np.int32)
+        self.category_ids = np.asarray(category_ids, dtype=np.int32)
+        self.version = version
+        self.by_id = np.arange(len(self.ids), dtype=np.int32)
+        self.by_price = np.lexsort((self.ids, self.prices)).astype(np.int32)
+        self.prices_by_price = self.prices[self.by_price]
+        # Stable sorts keep id / (price, id) order within each category
+        self.by_category = np.argsort(self.category_ids, kind="stable").astype(np.int32)
+        self.by_category_price = self.by_price[np.argsort(self.category_ids[self.by_price], kind="stable")]
+        self.categories_sorted = self.category_ids[self.by_category]
+        # NULL prices sort differently per database; price queries go to SQL then.
+        self.has_null_prices = bool(np.isnan(self.prices).any())
+
+    @classmethod
+    def load(cls, db: Session, version: str = None):
+        products = models.Product.__table__
+        rows = db.execute(
+            select(products.c.id, products.c.price, products.c.stock, products.c.category_id).order_by(products.c.id)
+        ).all()
+        if not rows:
+            return cls([], [], [], [], version=version)
+        ids, prices, stock, category_ids = zip(*rows)
+        return cls(
+            ids,
+            [np.nan if price is None else price for price in prices],
+            [0 if units is None else units for units in stock],
+            [NO_CATEGORY if category_id is None else category_id for category_id in category_ids],
+            version=version,
+        )
+
+    def with_values(self, ids, prices, stock):
+        """This snapshot with new prices and stock for the given ids.
+
+        Stock is written in place (no ordering depends on it). Products whose price
+        changed are moved within the price orderings of a copy, so readers keep a
+        consistent snapshot until the new one replaces it.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        positions = np.searchsorted(self.ids, ids)
+        # Ids the snapshot doesn't hold yet arrive with the rebuild their insert triggers
+        known = positions < len(self.ids)
+        known[known] = self.ids[positions[known]] == ids[known]
+        positions = positions[known]
+        prices = np.array([np.nan if price is None else price for price in prices], dtype=np.float64)[known]
+        self.stock[positions] = np.array([0 if units is None else units for units in stock], dtype=np.int32)[known]
+        moved = self.prices[positions] != prices
+        moved &= ~(np.isnan(self.prices[positions]) & np.isnan(prices))
+        if not moved.any():
+            return self
+        changed = positions[moved]
+        updated = self.prices.copy()
+        updated[changed] = prices[moved]
+        if len(changed) > REINSERT_MAX:
+            return CatalogSnapshot(self.ids, updated, self.stock, self.category_ids, version=self.version)
+        snapshot = copy.copy(self)
+        snapshot.prices = updated
+        kept, at, changed = self._reinsert(self.by_price, changed, self.prices_by_price, updated)
+        snapshot.by_price = np.insert(self.by_price[kept], at, changed)
+        snapshot.prices_by_price = np.insert(self.prices_by_price[kept], at, updated[changed])
+        kept, at, changed = self._reinsert(self.by_category_price, changed, self.categories_sorted, self.category_ids, updated)
+        snapshot.by_category_price = np.insert(self.by_category_price[kept], at, changed)
+        snapshot.has_null_prices = bool(np.isnan(updated).any())
+        return snapshot
+
+    def _reinsert(self, order, changed, first, *keys):
+        """Where ``changed`` positions now sort in ``order`` (sorted by ``keys``, then position).
+
+        Returns the mask of the entries of ``order`` that stay, the insertion indices
+        into what stays (for np.insert) and ``changed`` in insertion order. ``first``
+        is ``keys[0]`` already in ``order``, so only the runs searched are gathered.
+        """
+        dropped = np.zeros(len(self.ids), dtype=bool)
+        dropped[changed] = True
+        kept = ~dropped[order]
+        base, first = order[kept], first[kept]
+        # Sorted the same way, so positions landing on the same index keep their order
+        changed = changed[np.lexsort((changed, *(key[changed] for key in reversed(keys))))].astype(order.dtype)
+        at = []
+        for position in changed:
+            start, stop = 0, len(base)
+            for level, key in enumerate(keys):
+                run = first[start:stop] if level == 0 else key[base[start:stop]]
+                start, stop = start + np.searchsorted(run, key[position], "left"), start + np.searchsorted(run, key[position], "right")
+            at.append(start + np.searchsorted(base[start:stop], position))
+        return kept, at, changed
+
+    def __len__(self):
+        return len(self.ids)
+
+    def memory_bytes(self):
+        arrays = (self.ids, self.prices, self.stock, self.category_ids, self.by_id, self.by_price,
+                  self.prices_by_price, self.by_category, self.by_category_price, self.categories_sorted)
+        return sum(array.nbytes for array in arrays)
+
+    def page(self, skip=0, limit=100, category_id=None, sort_by_price=None, after=None,
+             min_price=None, max_price=None, in_stock=False):
+        """Product ids of one listing page, in crud.get_products order; None if SQL must answer."""
+        if self.has_null_prices and (sort_by_price or min_price is not None or max_price is not None):
+            return None
+        if after is not None:
+            skip = 0
+
+        # Candidate positions in ascending sort order
+        if category_id:
+            # Bounds in the array's own dtype; mixed dtypes make searchsorted cast the whole array.
+            bounds = np.array([category_id, category_id + 1], dtype=self.categories_sorted.dtype)
+            start, stop = np.searchsorted(self.categories_sorted, bounds)
+            order = (self.by_category if sort_by_price is None else self.by_category_price)[start:stop]
+        else:
+            order = self.by_id if sort_by_price is None else self.by_price
+        if sort_by_price is not None and (min_price is not None or max_price is not None):
+            order_prices = self.prices_by_price if order is self.by_price else self.prices[order]
+            start = 0 if min_price is None else np.searchsorted(order_prices, min_price, "left")
+            stop = len(order) if max_price is None else np.searchsorted(order_prices, max_price, "right")
+            order = order[start:stop]
+            min_price = max_price = None
+        if sort_by_price == "desc":
+            # (price desc, id desc) is exactly the reverse of (price asc, id asc)
+            order = order[::-1]
+
+        def keep(positions):
+            conditions = []
+            if min_price is not None:
+                conditions.append(self.prices[positions] >= min_price)
+            if max_price is not None:
+                conditions.append(self.prices[positions] <= max_price)
+            if in_stock:
+                conditions.append(self.stock[positions] > 0)
+            if after is not None:
+                ids = self.ids[positions]
+                if sort_by_price is None:
+                    conditions.append(ids > after[0])
+                else:
+                    prices = self.prices[positions]
+                    if sort_by_price == "asc":
+                        conditions.append((prices > after[0]) | ((prices == after[0]) & (ids > after[1])))
+                    else:
+                        conditions.append((prices < after[0]) | ((prices == after[0]) & (ids < after[1])))
+            return np.logical_and.reduce(conditions) if conditions else None
+
+        # Filter in growing blocks and stop once the page is full, so a broad filter
+        # doesn't mask the whole catalog to return the first hundred rows.
+        wanted, found, start, block = skip + limit, [], 0, max(4 * (skip + limit), 4096)
+        while start < len(order) and sum(len(part) for part in found) < wanted:
+            part = order[start:start + block]
+            mask = keep(part)
+            found.append(part if mask is None else part[mask])
+            start, block = start + block, block * 4
+        matches = np.concatenate(found) if found else order[:0]
+        return self.ids[matches[skip:wanted]].tolist()
+
+
+class SnapshotEngine:
+    """Keeps a snapshot matching the current catalog.
+
+    Sales and bulk price/stock updates are applied to the snapshot in place (the
+    rows they touched are read back by primary key); only writes that can add
+    products or move them between categories bump ``version_name`` and make it
+    rebuild. ``current()`` never blocks on a rebuild: until a background rebuild has
+    caught up, callers get None (and answer from SQL).
+    """
+
+    def __init__(self, bind, version_name: str = versions.STRUCTURE):
+        self.bind = bind
+        self.version_name = version_name
+        self.snapshot = None
+        self._rebuilding = False
+        self._lock = threading.Lock()
+        # Serializes in-place updates with the swap of a rebuilt snapshot
+        self._update_lock = threading.Lock()
+        # Ids updated while a rebuild is loading; re-read before it is swapped in
+        self._touched = None
+
+    def _values(self, product_ids):
+        products = models.Product.__table__
+        product_ids, rows = list(product_ids), []
+        with Session(bind=self.bind) as db:
+            for start in range(0, len(product_ids), 1000):
+                rows += db.execute(
+                    select(products.c.id, products.c.price, products.c.stock)
+                    .where(products.c.id.in_(product_ids[start:start + 1000]))
+                ).all()
+        return tuple(zip(*rows)) or ((), (), ())
+
+    def apply(self, product_ids):
+        """Bring the prices and stock of ``product_ids`` up to date after a committed write."""
+        with self._update_lock:
+            if self._touched is not None:
+                self._touched.update(product_ids)
+            if self.snapshot is not None:
+                self.snapshot = self.snapshot.with_values(*self._values(product_ids))
+
+    def refresh(self):
+        # The version is read first, so a write landing during the load leaves the
+        # snapshot tagged as outdated and triggers another rebuild.
+        version = versions.tag(self.version_name)
+        with self._update_lock:
+            self._touched = set()
+        try:
+            with Session(bind=self.bind) as db:
+                snapshot = CatalogSnapshot.load(db, version=version)
+        except BaseException:
+            with self._update_lock:
+                self._touched = None
+            raise
+        with self._update_lock:
+            touched, self._touched = self._touched, None
+            if touched:
+                snapshot = snapshot.with_values(*self._values(touched))
+            self.snapshot = snapshot
+        return snapshot
+
+    def _rebuild(self):
+        try:
+            self.refresh()
+        finally:
+            with self._lock:
+                self._rebuilding = False
+
+    def current(self):
+        snapshot = self.snapshot
+        if snapshot is not None and snapshot.version == versions.tag(self.version_name):
+            return snapshot
+        with self._lock:
+            if not self._rebuilding:
+                self._rebuilding = True
+                threading.Thread(target=self._rebuild, name="catalog-snapshot", daemon=True).start()
+        return None
+
+
+_engine = None
+
+def enable(bind):
+    """Build the first snapshot now; later writes update or rebuild it."""
+    global _engine
+    if versions.is_shared():
+        # Sales and price updates reach the snapshot through this process's listeners
+        # only, and rebuilding on the shared "catalog" counter would rebuild every
+        # snapshot on every checkout.
+        raise RuntimeError("LISTING_BACKEND=memory serves a single worker; it can't be used with VERSIONS_BACKEND=redis")
+    _engine = SnapshotEngine(bind)
+    _engine.refresh()
+    return _engine
+
+@catalog.on_products_updated
+def _products_updated(product_ids, prices):
+    if _engine is not None:
+        _engine.apply(product_ids)
+
+@catalog.on_products_sold
+def _products_sold(quantities):
+    if _engine is not None:
+        _engine.apply(quantities)
@@ -0,0 +1,102 @@
+import threading
+from collections import Counter
+
+from sqlalchemy import func
+
+from . import catalog, models, response_cache as responses, versions
+
+# Rendered category pages kept per (skip, limit); dropped on any change.
+MAX_BODIES = 32
+
+
+class CategoryRegistry:
+    """Every category with its product count, held in memory for reads and writes.
+
+    Category rows only change through imports and seeding, so they are loaded once.
+    crud keeps the counts current as it creates and moves products; a bulk import
+    marks the registry stale and the next use reloads it (two queries). When workers
+    share versions, writes in other workers show only there, so ``version`` (the
+    STRUCTURE tag it was loaded at) going out of date reloads it too.
+    """
+
+    def __init__(self, categories, counts, version: str = None):
+        self.names = dict(categories)  # id -> name
+        self.ids = {name: category_id for category_id, name in self.names.items()}
+        self.counts = Counter(counts)
+        self.stale = False
+        self.version = version
+        self._bodies = {}
+        self._lock = threading.Lock()
+
+    def id_for(self, name: str):
+        return self.ids.get(name)
+
+    def add_category(self, category_id: int, name: str):
+        with self._lock:
+            self.names[category_id] = name
+            self.ids[name] = category_id
+            self._bodies.clear()
+
+    def product_moved(self, from_category: int = None, to_category: int = None):
+        # A new product comes from None; only its category's count changes.
+        with self._lock:
+            if from_category is not None:
+                self.counts[from_category] -= 1
+            if to_category is not None:
+                self.counts[to_category] += 1
+            self._bodies.clear()
+
+    def rows(self, skip: int = 0, limit: int = 100):
+        return [
+            {"id": category_id, "name": self.names[category_id], "product_count": self.counts[category_id]}
+            for category_id in sorted(self.names)[skip:skip + limit]
+        ]
+
+    def body(self, skip: int = 0, limit: int = 100) -> bytes:
+        """JSON for GET /api/categories, rendered once per page until the next change."""
+        body = self._bodies.get((skip, limit))
+        if body is None:
+            with self._lock:
+                body = responses.render(responses.CATEGORY_LIST, self.rows(skip, limit))
+                if len(self._bodies) >= MAX_BODIES:
+                    self._bodies.clear()
+                self._bodies[(skip, limit)] = body
+        return body
+
+
+def load(db):
+    # Read before the queries, so a write landing during the load triggers another one
+    version = versions.tag(versions.STRUCTURE) if versions.is_shared() else None
+    counts = db.query(models.Product.category_id, func.count(models.Product.id)).group_by(models.Product.category_id)
+    return CategoryRegistry(
+        db.query(models.Category.id, models.Category.name).all(),
+        {category_id: count for category_id, count in counts if category_id is not None},
+        version=version,
+    )
+
+_registry = None
+_load_lock = threading.Lock()
+
+def _is_current(registry):
+    return registry is not None and not registry.stale and (
+        registry.version is None or registry.version == versions.tag(versions.STRUCTURE)
+    )
+
+def get_registry(db):
+    """The process-wide registry, (re)loaded from ``db`` when missing or out of date."""
+    global _registry
+    if not _is_current(_registry):
+        with _load_lock:
+            if not _is_current(_registry):
+                _registry = load(db)
+    return _registry
+
+def reset():
+    global _registry
+    _registry = None
+
+@catalog.on_products_change
+def _products_changed(products):
+    # Upserted rows may be new or moved, and the import may have created categories.
+    if _registry is not None:
+        _registry.stale = True
@@ -6,3 +6,48 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+
+# Authenticated principals are cached per token subject to skip the user lookup.
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+
+# Size of the process pool used for bcrypt hashing; 0 falls back to the thread pool.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+
+# Stored checkout responses replayed for a repeated Idempotency-Key header.
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+IDEMPOTENCY_CACHE_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_CACHE_TTL_SECONDS", "86400"))
+# How long a key is remembered at all; older keys are ignored, purged and free for reuse.
+IDEMPOTENCY_KEY_RETENTION_SECONDS = float(os.getenv("IDEMPOTENCY_KEY_RETENTION_SECONDS", "86400"))
+
+# "database" searches the full-text index in the database; "memory" serves search from an
+# in-process BM25 index built at startup (needs numpy).
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "database")
+
+# "database" answers product listings with SQL; "memory" filters and sorts them over a
+# columnar in-process snapshot that follows catalog writes (needs numpy; one worker, so
+# not with VERSIONS_BACKEND=redis).
+LISTING_BACKEND = os.getenv("LISTING_BACKEND", "database")
+
+# Cache for serialized product listing/detail responses: "memory" (one worker), "redis"
+# (shared by all workers, see REDIS_URL) or "none".
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "5000"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# Where the version counters behind cache keys and ETags live: "memory" or "redis". They
+# must be shared whenever responses or ETags are, so this follows the response cache.
+VERSIONS_BACKEND = os.getenv("VERSIONS_BACKEND", "redis" if RESPONSE_CACHE_BACKEND == "redis" else "memory")
+
+# Bulk product import: rows per multi-row upsert (and commit), and row errors kept in the report.
+BULK_IMPORT_CHUNK_SIZE = int(os.getenv("BULK_IMPORT_CHUNK_SIZE", "1000"))
+BULK_IMPORT_MAX_ERRORS = int(os.getenv("BULK_IMPORT_MAX_ERRORS", "1000"))
+
+# Upper bounds of the price buckets counted for GET /api/products/facets (the last bucket is open-ended).
+FACET_PRICE_BUCKETS = [float(bound) for bound in os.getenv("FACET_PRICE_BUCKETS", "10,25,50,100,250,500,1000").split(",")]
+
+# Most ids one GET /api/products?ids= request may ask for.
+PRODUCT_BATCH_MAX_IDS = int(os.getenv("PRODUCT_BATCH_MAX_IDS", "500"))
+
+# Most partial updates accepted by one PATCH /api/products/bulk request.
+BULK_UPDATE_MAX_ITEMS = int(os.getenv("BULK_UPDATE_MAX_ITEMS", "50000"))
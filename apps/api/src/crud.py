@@ -1,52 +1,167 @@
-from sqlalchemy.orm import Session
+import re
+
+from sqlalchemy import Float, Integer, bindparam, delete, func, insert, select, text, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
 from . import models, schemas
 from .models.category import Category # Import Category model
-from passlib.context import CryptContext
 from fastapi import HTTPException # Import HTTPException
+from .cache import principal_cache
+from . import catalog, categories, fieldsets
+from .hashing import pwd_context
+
+def read_only(db: Session, model, exclude=()):
+    """Query ``model``'s columns rather than the entity, for reads that only serialize.
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    Results are Core rows: tuple-backed records with attribute access by column name,
+    never added to the identity map, tracked for changes or given lazy loaders.
+    """
+    return db.query(*(column for column in model.__table__.columns if column.name not in exclude))
 
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
 def get_users(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.User).offset(skip).limit(limit).all()
+    return read_only(db, models.User, exclude=("hashed_password",)).offset(skip).limit(limit).all()
 
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = pwd_context.hash(user.password)
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: str = None):
+    if hashed_password is None:
+        hashed_password = pwd_context.hash(user.password)
     db_user = models.User(email=user.email, hashed_password=hashed_password)
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
     return db_user
 
-def get_product(db: Session, product_id: int):
-    return db.query(models.Product).filter(models.Product.id == product_id).first()
+def product_query(db: Session, fields: tuple = None):
+    """Products, or with ``fields`` (fieldsets.parse) rows of just the columns they need."""
+    if fields is None:
+        return db.query(models.Product)
+    query = db.query(*fieldsets.product_columns(fields)).select_from(models.Product)
+    if "category" in fields:
+        query = query.outerjoin(models.Product.category)
+    return query
+
+def get_product(db: Session, product_id: int, fields: tuple = None):
+    return product_query(db, fields).filter(models.Product.id == product_id).first()
+
+def product_sort_key(product: models.Product, sort_by_price: str = None):
+    return (product.id,) if sort_by_price is None else (product.price, product.id)
+
+# Columnar listing snapshot (catalog_snapshot.SnapshotEngine), set at startup when LISTING_BACKEND=memory
+product_snapshots = None
 
-def get_products(db: Session, skip: int = 0, limit: int = 100, category_id: int = None, sort_by_price: str = None):
-    query = db.query(models.Product)
+def get_products_by_ids(db: Session, ids, fields: tuple = None):
+    # One query (categories joined) however many ids; rows come back in the order of ids.
+    query = product_query(db, fields)
+    if fields is None:
+        query = query.options(joinedload(models.Product.category))
+    products = query.filter(models.Product.id.in_(ids)).all()
+    by_id = {product.id: product for product in products}
+    return [by_id[product_id] for product_id in ids if product_id in by_id]
+
+def get_products(db: Session, skip: int = 0, limit: int = 100, category_id: int = None, sort_by_price: str = None, after: list = None,
+                 min_price: float = None, max_price: float = None, in_stock: bool = False, fields: tuple = None):
+    snapshot = product_snapshots.current() if product_snapshots is not None else None
+    if snapshot is not None:
+        ids = snapshot.page(skip, limit, category_id, sort_by_price, after, min_price, max_price, in_stock)
+        if ids is not None:
+            return get_products_by_ids(db, ids, fields)
+    # id breaks price ties so pages are stable; `after` is the sort key of the previous page's
+    # last row and replaces the offset, matching the (category_id,) price, id indexes.
+    query = product_query(db, fields)
     if category_id:
         query = query.filter(models.Product.category_id == category_id)
+    if min_price is not None:
+        query = query.filter(models.Product.price >= min_price)
+    if max_price is not None:
+        query = query.filter(models.Product.price <= max_price)
+    if in_stock:
+        query = query.filter(models.Product.stock > 0)
     if sort_by_price == "asc":
-        query = query.order_by(models.Product.price.asc())
+        query = query.order_by(models.Product.price.asc(), models.Product.id.asc())
+        if after is not None:
+            query = query.filter(tuple_(models.Product.price, models.Product.id) > tuple_(*after))
     elif sort_by_price == "desc":
-        query = query.order_by(models.Product.price.desc())
+        query = query.order_by(models.Product.price.desc(), models.Product.id.desc())
+        if after is not None:
+            query = query.filter(tuple_(models.Product.price, models.Product.id) < tuple_(*after))
+    else:
+        query = query.order_by(models.Product.id.asc())
+        if after is not None:
+            query = query.filter(models.Product.id > after[0])
+    if after is not None:
+        skip = 0
     return query.offset(skip).limit(limit).all()
 
+SEARCH_HITS_SQL = {
+    # Both yield (id, score) with lower scores ranking first.
+    "postgresql": "SELECT id, -ts_rank(search_vector, plainto_tsquery('english', :q)) AS score "
+                  "FROM products WHERE search_vector @@ plainto_tsquery('english', :q)",
+    "sqlite": "SELECT rowid AS id, rank AS score FROM products_fts WHERE products_fts MATCH :q",
+}
+
+def fts_query(db: Session, q: str):
+    if db.bind.dialect.name == "postgresql":
+        return q
+    # Quote each word so FTS5 syntax (AND, NEAR, column filters, ...) in user input is matched literally
+    return " ".join(f'"{word}"' for word in re.findall(r"\w+", q))
+
+# In-process BM25 index (search_index.SearchIndex), set at startup when SEARCH_BACKEND=memory
+product_search_index = None
+
+def search_products(db: Session, q: str, limit: int = 20, category_id: int = None, after: list = None):
+    # Returns (product, score) rows by relevance; `after` is the (score, id) of the previous page's last row.
+    if product_search_index is not None:
+        hits = product_search_index.search(q, limit=limit, category_id=category_id, after=after)
+        products = {
+            product.id: product
+            for product in db.query(models.Product).options(joinedload(models.Product.category))
+            .filter(models.Product.id.in_([product_id for product_id, _ in hits]))
+        }
+        return [(products[product_id], score) for product_id, score in hits if product_id in products]
+
+    match = fts_query(db, q)
+    if not match:
+        return []
+    hits = text(SEARCH_HITS_SQL[db.bind.dialect.name]).bindparams(q=match).columns(id=Integer, score=Float).subquery("hits")
+    query = (
+        db.query(models.Product, hits.c.score)
+        .join(hits, hits.c.id == models.Product.id)
+        .options(joinedload(models.Product.category))
+    )
+    if category_id:
+        query = query.filter(models.Product.category_id == category_id)
+    if after is not None:
+        query = query.filter(tuple_(hits.c.score, models.Product.id) > tuple_(*after))
+    return query.order_by(hits.c.score, models.Product.id).limit(limit).all()
+
 def get_categories(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Category).offset(skip).limit(limit).all()
+    return categories.get_registry(db).rows(skip, limit)
+
+def get_category_id(db: Session, category_name: str):
+    registry = categories.get_registry(db)
+    category_id = registry.id_for(category_name)
+    if category_id is None:
+        # Not known to the registry: created since it loaded (seed script, another worker) or missing
+        db_category = db.query(models.Category).filter(models.Category.name == category_name).first()
+        if db_category is None:
+            raise HTTPException(status_code=400, detail=f"Category '{category_name}' not found")
+        registry.add_category(db_category.id, db_category.name)
+        category_id = db_category.id
+    return category_id
 
 def create_product(db: Session, product: schemas.ProductCreate):
     product_data = product.model_dump()
-    category_name = product_data.pop("category")
-    db_category = db.query(models.Category).filter(models.Category.name == category_name).first()
-    if db_category is None:
-        raise HTTPException(status_code=400, detail=f"Category '{category_name}' not found")
+    category_id = get_category_id(db, product_data.pop("category"))
     
-    db_product = models.Product(**product_data, category_id=db_category.id)
+    db_product = models.Product(**product_data, category_id=category_id)
     db.add(db_product)
     db.commit()
     db.refresh(db_product)
+    categories.get_registry(db).product_moved(to_category=category_id)
+    catalog.product_changed(db_product)
     return db_product
 
 def update_product(db: Session, product_id: int, product: schemas.ProductUpdate):
@@ -55,29 +170,63 @@ def update_product(db: Session, product_id: int, product: schemas.ProductUpdate)
     if db_product:
         update_data = product.model_dump(exclude_unset=True)
         print(f"[DEBUG] crud.update_product - update_data: {update_data}") # Added log
+        previous_category_id = db_product.category_id
         if "category" in update_data:
-            category_name = update_data.pop("category")
-            db_category = db.query(models.Category).filter(models.Category.name == category_name).first()
-            if db_category is None:
-                raise HTTPException(status_code=400, detail=f"Category '{category_name}' not found")
-            db_product.category_id = db_category.id
+            db_product.category_id = get_category_id(db, update_data.pop("category"))
 
         for key, value in update_data.items():
             setattr(db_product, key, value)
         db.add(db_product)
         db.commit()
         db.refresh(db_product)
+        if db_product.category_id != previous_category_id:
+            categories.get_registry(db).product_moved(previous_category_id, db_product.category_id)
+        catalog.product_changed(db_product)
         return db_product
     return None
 
+def bulk_update_products(db: Session, updates):
+    """Apply partial price/stock updates in one transaction.
+
+    One SELECT per 1000 ids finds the products that exist, then a single UPDATE
+    statement runs as an executemany, with COALESCE keeping fields an update leaves
+    out. Returns (updated ids, missing ids), each in request order.
+    """
+    products = models.Product.__table__
+    ids = list(dict.fromkeys(item.id for item in updates))
+    existing = set()
+    for start in range(0, len(ids), 1000):
+        existing.update(db.scalars(select(products.c.id).where(products.c.id.in_(ids[start:start + 1000]))))
+    rows = [
+        {"b_id": item.id, "b_price": item.price, "b_stock": item.stock}
+        for item in updates if item.id in existing
+    ]
+    if rows:
+        stmt = update(products).where(products.c.id == bindparam("b_id")).values(
+            price=func.coalesce(bindparam("b_price", type_=Float), products.c.price),
+            stock=func.coalesce(bindparam("b_stock", type_=Integer), products.c.stock),
+        )
+        db.connection().execute(stmt, rows)
+    db.commit()
+    updated = [product_id for product_id in ids if product_id in existing]
+    # One invalidation for the whole batch; a later item for the same id wins, as in the UPDATE
+    catalog.products_updated(updated, {item.id: item.price for item in updates if item.id in existing and item.price is not None})
+    return updated, [product_id for product_id in ids if product_id not in existing]
+
+def cart_item_loader():
+    # Loads CartItem -> Product -> Category in the same SELECT as the cart rows, so
+    # serializing a cart never lazy-loads per line.
+    return joinedload(models.CartItem.product).joinedload(models.Product.category)
+
 def get_cart_items(db: Session, user_id: int):
-    return db.query(models.CartItem).filter(models.CartItem.user_id == user_id).all()
+    return db.query(models.CartItem).options(cart_item_loader()).filter(models.CartItem.user_id == user_id).all()
 
 def add_item_to_cart(db: Session, user_id: int, product_id: int, quantity: int):
     db_cart_item = models.CartItem(user_id=user_id, product_id=product_id, quantity=quantity)
     db.add(db_cart_item)
     db.commit()
     db.refresh(db_cart_item)
+    catalog.cart_changed(user_id)
     return db_cart_item
 
 def get_cart_item(db: Session, cart_item_id: int):
@@ -88,11 +237,23 @@ def remove_item_from_cart(db: Session, cart_item_id: int):
     if db_cart_item:
         db.delete(db_cart_item)
         db.commit()
+        catalog.cart_changed(db_cart_item.user_id)
     return db_cart_item
 
 def clear_cart(db: Session, user_id: int):
     db.query(models.CartItem).filter(models.CartItem.user_id == user_id).delete()
     db.commit()
+    catalog.cart_changed(user_id)
+
+def insert_order_items(db: Session, order_id: int, lines):
+    # lines: (product_id, quantity, price) tuples, written as a single multi-row INSERT
+    db.execute(
+        insert(models.OrderItem),
+        [
+            {"order_id": order_id, "product_id": product_id, "quantity": quantity, "price": price}
+            for product_id, quantity, price in lines
+        ],
+    )
 
 def create_order(db: Session, user_id: int):
     cart_items = get_cart_items(db, user_id)
@@ -100,25 +261,16 @@ def create_order(db: Session, user_id: int):
         return None # Or raise an exception
 
     total_amount = sum(item.product.price * item.quantity for item in cart_items)
-    
+
     db_order = models.Order(user_id=user_id, total_amount=total_amount)
     db.add(db_order)
-    db.commit()
-    db.refresh(db_order)
+    db.flush()
 
-    for item in cart_items:
-        db_order_item = models.OrderItem(
-            order_id=db_order.id,
-            product_id=item.product_id,
-            quantity=item.quantity,
-            price=item.product.price
-        )
-        db.add(db_order_item)
-    
+    insert_order_items(db, db_order.id, [(item.product_id, item.quantity, item.product.price) for item in cart_items])
+    db.execute(delete(models.CartItem).where(models.CartItem.user_id == user_id).execution_options(synchronize_session=False))
     db.commit()
-    
-    clear_cart(db, user_id)
-    
+    catalog.cart_changed(user_id)
+
     db.refresh(db_order)
     return db_order
 
@@ -129,5 +281,53 @@ def update_user_role(db: Session, user_id: int, new_role: str):
         db.add(db_user)
         db.commit()
         db.refresh(db_user)
+        principal_cache.delete(db_user.email)
         return db_user
-    return None
\ No newline at end of file
+    return None
+
+# AsyncSession variants used by the async routes (cart, login, register)
+
+async def get_user_by_email_async(db: AsyncSession, email: str):
+    return await db.scalar(select(models.User).where(models.User.email == email))
+
+async def create_user_async(db: AsyncSession, user: schemas.UserCreate, hashed_password: str):
+    db_user = models.User(email=user.email, hashed_password=hashed_password)
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+async def get_cart_items_async(db: AsyncSession, user_id: int, fields: tuple = None):
+    if fields is not None:
+        # Rows of the cart line columns plus the requested product columns (fieldsets.cart_line)
+        query = select(*fieldsets.cart_columns(fields)).select_from(models.CartItem).join(models.CartItem.product)
+        if "category" in fields:
+            query = query.outerjoin(models.Product.category)
+        return (await db.execute(query.where(models.CartItem.user_id == user_id))).all()
+    result = await db.scalars(
+        select(models.CartItem).options(cart_item_loader()).where(models.CartItem.user_id == user_id)
+    )
+    return result.all()
+
+async def get_product_async(db: AsyncSession, product_id: int):
+    return await db.scalar(
+        select(models.Product)
+        .options(joinedload(models.Product.category))
+        .where(models.Product.id == product_id)
+    )
+
+def dialect_insert(db, entity):
+    # INSERT construct with ON CONFLICT support for the session's backend (Postgres or SQLite)
+    if db.bind.dialect.name == "postgresql":
+        return postgresql.insert(entity)
+    return sqlite.insert(entity)
+
+async def upsert_cart_item_async(db: AsyncSession, user_id: int, product_id: int, quantity: int):
+    # One atomic statement: insert the line, or add to the existing quantity (unique on user_id, product_id)
+    stmt = dialect_insert(db, models.CartItem).values(user_id=user_id, product_id=product_id, quantity=quantity)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.CartItem.user_id, models.CartItem.product_id],
+        set_={"quantity": models.CartItem.quantity + stmt.excluded.quantity},
+    ).returning(models.CartItem)
+    result = await db.scalars(stmt, execution_options={"populate_existing": True})
+    return result.one()
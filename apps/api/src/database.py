@@ -1,4 +1,6 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from .models.base import Base
 from sqlalchemy.orm import sessionmaker, Session
 import os
@@ -14,6 +16,16 @@ else:
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async drivers for the same database: asyncpg for Postgres, aiosqlite for SQLite.
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+def get_async_url(url: str):
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+
+async_engine = create_async_engine(get_async_url(DATABASE_URL))
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 
 
 # Dependency to get the DB session
@@ -23,3 +35,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Dependency to get an AsyncSession for the async routes
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -4,9 +4,21 @@ from sqlalchemy.orm import Session
 from jose import JWTError, jwt
 
 from apps.api.src import crud, schemas
+from apps.api.src.cache import principal_cache
 from apps.api.src.database import get_db
 from apps.api.src.config import SECRET_KEY, ALGORITHM, oauth2_scheme
 
+def get_principal(db: Session, email: str):
+    # Served from the principal cache when possible; crud.update_user_role evicts stale entries.
+    principal = principal_cache.get(email)
+    if principal is None:
+        user = crud.get_user_by_email(db, email=email)
+        if user is None:
+            return None
+        principal = schemas.User.model_validate(user)
+        principal_cache.set(email, principal)
+    return principal
+
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -20,7 +32,17 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    user = crud.get_user_by_email(db, email=email)
+    user = get_principal(db, email=email)
     if user is None:
         raise credentials_exception
     return user
+
+def get_current_admin_user(current_user: schemas.User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
+    return current_user
+
+def get_current_manager_user(current_user: schemas.User = Depends(get_current_user)):
+    if current_user.role not in ("admin", "manager"):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
+    return current_user
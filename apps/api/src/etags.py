@@ -0,0 +1,19 @@
+from fastapi import Request, Response
+
+# Strong ETags built from version counters instead of a hash of the body, so a matching
+# If-None-Match is answered before any query or serialization runs.
+
+def etag(scope: str, version: str):
+    """``version`` is a versions.tag() read before the response is built."""
+    return f'"{scope}-{version}"'
+
+def matches(request: Request, tag: str):
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    # If-None-Match compares weakly, so a W/ prefix added by a proxy still matches.
+    return any(candidate.strip().removeprefix("W/") in (tag, "*") for candidate in header.split(","))
+
+def not_modified(tag: str, headers: dict = None):
+    # A 304 repeats the caching headers the 200 would have carried.
+    return Response(status_code=304, headers={"ETag": tag, **(headers or {})})
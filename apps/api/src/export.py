@@ -0,0 +1,62 @@
+import csv
+import io
+import json
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import models
+
+# Full catalog dumps. Rows come from a server-side cursor in partitions of
+# EXPORT_BATCH_SIZE and are written out one partition at a time, so memory depends on
+# the batch size, not the catalog. The columns are the ones bulk_import reads, so a dump
+# can be imported again as is.
+
+EXPORT_BATCH_SIZE = 1000
+COLUMNS = ("id", "sku", "name", "description", "price", "image_url", "stock", "category")
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def export_statement(category_id: int = None):
+    products, categories = models.Product.__table__, models.Category.__table__
+    stmt = (
+        select(
+            products.c.id, products.c.sku, products.c.name, products.c.description, products.c.price,
+            products.c.image_url, products.c.stock, categories.c.name.label("category"),
+        )
+        # Outer join: a product without a category is exported with category null.
+        .outerjoin(categories, categories.c.id == products.c.category_id)
+        .order_by(products.c.id)
+    )
+    if category_id is not None:
+        stmt = stmt.where(products.c.category_id == category_id)
+    return stmt
+
+def iter_partitions(db: Session, category_id: int = None, batch_size: int = None):
+    # yield_per streams from a server-side cursor (Postgres) instead of buffering the result
+    batch_size = batch_size or EXPORT_BATCH_SIZE
+    result = db.connection().execute(export_statement(category_id).execution_options(yield_per=batch_size))
+    yield from result.partitions()
+
+def ndjson_lines(partitions):
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+    for rows in partitions:
+        yield "".join(dumps(dict(zip(COLUMNS, row))) + "\n" for row in rows)
+
+def csv_lines(partitions):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(COLUMNS)
+    for rows in partitions:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+def stream(bind, format: str, category_id: int = None):
+    """Encoded dump chunks, read through a session of its own that lives as long as the stream."""
+    with Session(bind=bind) as db:
+        partitions = iter_partitions(db, category_id)
+        lines = ndjson_lines(partitions) if format == "ndjson" else csv_lines(partitions)
+        for chunk in lines:
+            yield chunk.encode()
@@ -0,0 +1,170 @@
+import threading
+from bisect import bisect_right
+from collections import Counter
+
+from . import catalog, models, versions
+from .config import FACET_PRICE_BUCKETS
+
+
+class FacetCounts:
+    """Product counts per (category, price bucket), kept current from catalog writes.
+
+    Each product is remembered with the cell it is counted in, so a write moves it
+    between two cells instead of re-counting anything. Category totals and price
+    histograms are sums over the cells, which number categories x buckets.
+    """
+
+    def __init__(self, boundaries=FACET_PRICE_BUCKETS):
+        self.boundaries = sorted(boundaries)
+        self._cells = {}  # product id -> (category_id, bucket)
+        self._counts = Counter()  # (category_id, bucket) -> products
+        self._category_names = {}
+        self._lock = threading.Lock()
+        # versions tag the counts were loaded at; only checked when workers share counters
+        self.version = None
+
+    def bucket(self, price):
+        # Bucket i holds boundaries[i - 1] <= price < boundaries[i]; no price, no bucket.
+        return None if price is None else bisect_right(self.boundaries, price)
+
+    def _move(self, product_id, cell):
+        previous = self._cells.get(product_id)
+        if previous == cell:
+            return
+        if previous is not None:
+            self._counts[previous] -= 1
+            if not self._counts[previous]:
+                del self._counts[previous]
+        self._cells[product_id] = cell
+        self._counts[cell] += 1
+
+    def load(self, categories, products):
+        """Bulk-load (id, name) categories and (id, category_id, price) products."""
+        with self._lock:
+            self._category_names.update(categories)
+            for product_id, category_id, price in products:
+                self._move(product_id, (category_id, self.bucket(price)))
+
+    def set_category(self, category_id: int, name: str):
+        with self._lock:
+            self._category_names[category_id] = name
+
+    def set_product(self, product_id: int, category_id: int, price: float):
+        with self._lock:
+            self._move(product_id, (category_id, self.bucket(price)))
+
+    def set_prices(self, prices: dict):
+        with self._lock:
+            for product_id, price in prices.items():
+                cell = self._cells.get(product_id)
+                if cell is not None:
+                    self._move(product_id, (cell[0], self.bucket(price)))
+
+    def facets(self, category_id: int = None):
+        """Category counts over the whole catalog, price buckets within ``category_id`` if given."""
+        with self._lock:
+            by_category, by_bucket = Counter(), Counter()
+            for (cell_category, bucket), count in self._counts.items():
+                by_category[cell_category] += count
+                if bucket is not None and (category_id is None or cell_category == category_id):
+                    by_bucket[bucket] += count
+            bounds = [None, *self.boundaries, None]
+            return {
+                "categories": [
+                    {"id": cell_category, "name": self._category_names.get(cell_category), "count": count}
+                    for cell_category, count in sorted(item for item in by_category.items() if item[0] is not None)
+                ],
+                "price_buckets": [
+                    {"min": bounds[bucket], "max": bounds[bucket + 1], "count": by_bucket[bucket]}
+                    for bucket in range(len(self.boundaries) + 1)
+                ],
+            }
+
+
+def build(db):
+    counts = FacetCounts()
+    if versions.is_shared():
+        # Read before the queries, so a write landing during the load triggers another build
+        counts.version = versions.tag(versions.STRUCTURE, versions.PRICES)
+    counts.load(
+        db.query(models.Category.id, models.Category.name).all(),
+        db.query(models.Product.id, models.Product.category_id, models.Product.price).all(),
+    )
+    return counts
+
+_counts = None
+_build_lock = threading.Lock()
+# Writes committed while a build is loading, replayed onto it before it is published
+_pending = None
+_pending_lock = threading.Lock()
+
+def _is_current(counts):
+    # Listeners see every write in this process; other workers' writes show in the versions.
+    return counts is not None and (counts.version is None or counts.version == versions.tag(versions.STRUCTURE, versions.PRICES))
+
+def get_counts(db):
+    """The process-wide counts, built from ``db`` on first use (and again after other workers' writes)."""
+    global _counts, _pending
+    if not _is_current(_counts):
+        with _build_lock:
+            if not _is_current(_counts):
+                with _pending_lock:
+                    _pending = []
+                try:
+                    counts = build(db)
+                except BaseException:
+                    with _pending_lock:
+                        _pending = None
+                    raise
+                with _pending_lock:
+                    writes, _pending = _pending, None
+                    # Writes set absolute cells and prices, so replaying one the load already saw is harmless
+                    for write in writes:
+                        write(counts)
+                    _counts = counts
+    return _counts
+
+def reset():
+    global _counts
+    _counts = None
+
+def _tracking():
+    # With no counts and no build loading, a later build's queries will see this write.
+    return _counts is not None or _pending is not None
+
+def _apply(write):
+    with _pending_lock:
+        if _pending is not None:
+            _pending.append(write)
+        if _counts is not None:
+            write(_counts)
+
+@catalog.on_product_change
+def _product_changed(product):
+    if not _tracking():
+        return
+    # Values are read now: the write may be replayed after the session has moved on.
+    product_id, category_id, price = product.id, product.category_id, product.price
+    category_name = product.category.name if product.category is not None else None
+
+    def write(counts):
+        if category_name is not None:
+            counts.set_category(category_id, category_name)
+        counts.set_product(product_id, category_id, price)
+    _apply(write)
+
+@catalog.on_products_change
+def _products_changed(products):
+    if not _tracking():
+        return
+
+    def write(counts):
+        for product in products:
+            counts.set_category(product.category_id, product.category_name)
+            counts.set_product(product.id, product.category_id, product.price)
+    _apply(write)
+
+@catalog.on_products_updated
+def _products_updated(product_ids, prices):
+    if _tracking():
+        _apply(lambda counts: counts.set_prices(prices))
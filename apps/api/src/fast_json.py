@@ -0,0 +1,27 @@
+import json
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder below writes the same bytes, only slower
+    orjson = None
+
+# JSON encoding for hot read endpoints, whose bodies are plain dicts built straight from
+# Core rows (fieldsets.serializer) instead of ORM objects run through pydantic.
+
+
+def dumps(value) -> bytes:
+    """Compact UTF-8 JSON, the same bytes JSONResponse writes.
+
+    orjson differs only in float exponents ("1e-7" for "1e-07"), which decode to
+    the same number.
+    """
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -0,0 +1,98 @@
+import functools
+from operator import itemgetter
+
+from fastapi import HTTPException
+
+from . import fast_json, models, schemas
+
+# Product responses built from Core rows: only the columns of the requested fields are
+# selected and each row goes straight to a dict, with no Product objects or pydantic in
+# between. ?fields=id,name,price narrows product responses (and the products in cart
+# lines) to those fields; full responses are the fieldset FIELDS.
+
+# Response field -> products column; "category" is the joined category's name and id.
+PRODUCT_COLUMNS = {
+    "sku": models.Product.sku,
+    "name": models.Product.name,
+    "description": models.Product.description,
+    "price": models.Product.price,
+    "imageUrl": models.Product.image_url,
+    "stock": models.Product.stock,
+    "id": models.Product.id,
+}
+# Fields in the order schemas.Product serializes them.
+FIELDS = tuple(field.alias or name for name, field in schemas.Product.model_fields.items())
+ALIASES = {"image_url": "imageUrl"}
+
+CART_LINE_COLUMNS = {
+    "product_id": models.CartItem.product_id,
+    "quantity": models.CartItem.quantity,
+    "id": models.CartItem.id,
+    "user_id": models.CartItem.user_id,
+}
+
+
+def parse(fields: str = None):
+    """Requested fields in response order, or None for full responses (FIELDS)."""
+    if fields is None:
+        return None
+    names = {ALIASES.get(name.strip(), name.strip()) for name in fields.split(",") if name.strip()}
+    unknown = names.difference(FIELDS)
+    if not names or unknown:
+        raise HTTPException(status_code=422, detail=f"fields must be a comma-separated subset of {', '.join(FIELDS)}")
+    return tuple(field for field in FIELDS if field in names)
+
+def key(fields):
+    # Part of cache keys and ETags; "+" keeps the commas out of If-None-Match lists.
+    return "+".join(fields) if fields else None
+
+def scope(name: str, fields):
+    return name if not fields else f"{name}.{key(fields)}"
+
+def product_columns(fields):
+    # id and price are always selected: listing cursors are built from them.
+    selected = {"id": models.Product.id, "price": models.Product.price}
+    for field in fields:
+        if field == "category":
+            selected["category_name"] = models.Category.name
+            selected["category_id"] = models.Category.id
+        else:
+            selected[field] = PRODUCT_COLUMNS[field]
+    return [column.label(label) for label, column in selected.items()]
+
+def cart_columns(fields):
+    lines = [column.label("line_" + label) for label, column in CART_LINE_COLUMNS.items()]
+    return lines + product_columns(fields)
+
+@functools.lru_cache(maxsize=256)
+def serializer(fields, offset: int = 0):
+    """row -> response dict for rows selected with product_columns(fields).
+
+    Column positions are resolved once per fieldset; ``offset`` skips columns selected
+    before the product's (the cart line's).
+    """
+    positions = {column.name: offset + i for i, column in enumerate(product_columns(fields))}
+    if "category" not in fields:
+        pick = itemgetter(*(positions[field] for field in fields))
+        if len(fields) == 1:
+            return lambda row: {fields[0]: pick(row)}
+        return lambda row: dict(zip(fields, pick(row)))
+
+    name_at, id_at = positions["category_name"], positions["category_id"]
+
+    def category(row):
+        return None if row[id_at] is None else {"name": row[name_at], "id": row[id_at]}
+
+    getters = [(field, category if field == "category" else itemgetter(positions[field])) for field in fields]
+    return lambda row: {field: get(row) for field, get in getters}
+
+def product(row, fields=FIELDS):
+    return serializer(fields)(row)
+
+def cart_line(row, fields=FIELDS):
+    body = {label: row[i] for i, label in enumerate(CART_LINE_COLUMNS)}
+    body["product"] = serializer(fields, len(CART_LINE_COLUMNS))(row)
+    return body
+
+def render(value) -> bytes:
+    return fast_json.dumps(value)
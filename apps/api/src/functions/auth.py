@@ -5,7 +5,8 @@ from sqlalchemy.orm import Session
 
 from apps.api.src.config import SECRET_KEY, ALGORITHM
 from apps.api.src.database import SessionLocal
-from apps.api.src import crud, schemas
+from apps.api.src import schemas
+from apps.api.src.dependencies import get_principal
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
@@ -30,7 +31,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         token_data = schemas.TokenData(email=email)
     except JWTError:
         raise credentials_exception
-    user = crud.get_user_by_email(db, email=token_data.email)
+    user = get_principal(db, email=token_data.email)
     if user is None:
         raise credentials_exception
     return user
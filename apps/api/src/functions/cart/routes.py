@@ -1,23 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+from typing import List, Optional
 
-from apps.api.src import crud, schemas, models
-from apps.api.src.database import get_db
-from apps.api.src.config import oauth2_scheme, SECRET_KEY, ALGORITHM
+from apps.api.src import catalog, crud, etags, fieldsets, schemas, models, versions
+from apps.api.src.fast_json import FastJSONResponse
+from apps.api.src.database import get_async_db
 from apps.api.src.dependencies import get_current_user # Import from dependencies
-from jose import JWTError, jwt
 
 cart_router = APIRouter()
 
+# Carts are per user: shared caches must not store them, and the tag names the user.
+PRIVATE = {"Cache-Control": "private", "Vary": "Authorization"}
+
+def select_cart_items():
+    # Relationships can't lazy-load on an AsyncSession, so the response graph is loaded up front.
+    return select(models.CartItem).options(crud.cart_item_loader())
+
 @cart_router.get("/cart", response_model=List[schemas.CartItem])
-async def read_cart(user: schemas.User = Depends(get_current_user), db: Session = Depends(get_db)):
-    cart_items = db.query(models.CartItem).filter(models.CartItem.user_id == user.id).all()
-    return cart_items
+async def read_cart(request: Request, fields: Optional[str] = None, user: schemas.User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    # The user comes from the principal cache, so a match is answered without the database.
+    # Cart lines embed products, so the tag follows the catalog too.
+    fields = fieldsets.parse(fields)
+    tag = etags.etag(fieldsets.scope(f"cart-{user.id}", fields), versions.tag(versions.cart(user.id), "catalog"))
+    if etags.matches(request, tag):
+        return etags.not_modified(tag, PRIVATE)
+    # Lines are rendered straight from rows; fields narrows the product in each line.
+    fields = fields or fieldsets.FIELDS
+    rows = await crud.get_cart_items_async(db, user_id=user.id, fields=fields)
+    return FastJSONResponse([fieldsets.cart_line(row, fields) for row in rows], headers={"ETag": tag, **PRIVATE})
 
 @cart_router.post("/cart/items", response_model=schemas.CartItem)
-async def add_item_to_cart(item: schemas.CartItemCreate, user: schemas.User = Depends(get_current_user), db: Session = Depends(get_db)):
-    product = crud.get_product(db, product_id=item.product_id)
+async def add_item_to_cart(item: schemas.CartItemCreate, user: schemas.User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    product = await crud.get_product_async(db, product_id=item.product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     if item.quantity <= 0:
@@ -25,35 +41,24 @@ async def add_item_to_cart(item: schemas.CartItemCreate, user: schemas.User = De
     if product.stock < item.quantity:
         raise HTTPException(status_code=400, detail="Not enough stock")
 
-    db_cart_item = db.query(models.CartItem).filter(
-        models.CartItem.user_id == user.id,
-        models.CartItem.product_id == item.product_id
-    ).first()
-
-    if db_cart_item:
-        db_cart_item.quantity += item.quantity
-        db.add(db_cart_item)
-        db.commit()
-        db.refresh(db_cart_item)
-        return db_cart_item
-    else:
-        new_cart_item = models.CartItem(user_id=user.id, product_id=item.product_id, quantity=item.quantity)
-        db.add(new_cart_item)
-        db.commit()
-        db.refresh(new_cart_item)
-        return new_cart_item
+    db_cart_item = await crud.upsert_cart_item_async(db, user_id=user.id, product_id=item.product_id, quantity=item.quantity)
+    await db.commit()
+    catalog.cart_changed(user.id)
+    # The product (and its category) was loaded above; attach it without another query.
+    set_committed_value(db_cart_item, "product", product)
+    return db_cart_item
 
 @cart_router.put("/cart/items/{item_id}", response_model=schemas.CartItem)
-async def update_cart_item(item_id: int, item: schemas.CartItemCreate, user: schemas.User = Depends(get_current_user), db: Session = Depends(get_db)):
-    db_cart_item = db.query(models.CartItem).filter(
+async def update_cart_item(item_id: int, item: schemas.CartItemCreate, user: schemas.User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    db_cart_item = await db.scalar(select_cart_items().where(
         models.CartItem.id == item_id,
         models.CartItem.user_id == user.id
-    ).first()
+    ))
 
     if not db_cart_item:
         raise HTTPException(status_code=404, detail="Cart item not found")
-    
-    product = crud.get_product(db, product_id=item.product_id)
+
+    product = await crud.get_product_async(db, product_id=item.product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     if item.quantity <= 0:
@@ -62,21 +67,21 @@ async def update_cart_item(item_id: int, item: schemas.CartItemCreate, user: sch
         raise HTTPException(status_code=400, detail="Not enough stock")
 
     db_cart_item.quantity = item.quantity
-    db.add(db_cart_item)
-    db.commit()
-    db.refresh(db_cart_item)
+    await db.commit()
+    catalog.cart_changed(user.id)
     return db_cart_item
 
 @cart_router.delete("/cart/items/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_cart_item(item_id: int, user: schemas.User = Depends(get_current_user), db: Session = Depends(get_db)):
-    db_cart_item = db.query(models.CartItem).filter(
+async def delete_cart_item(item_id: int, user: schemas.User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    db_cart_item = await db.scalar(select(models.CartItem).where(
         models.CartItem.id == item_id,
         models.CartItem.user_id == user.id
-    ).first()
+    ))
 
     if not db_cart_item:
         raise HTTPException(status_code=404, detail="Cart item not found")
 
-    db.delete(db_cart_item)
-    db.commit()
+    await db.delete(db_cart_item)
+    await db.commit()
+    catalog.cart_changed(user.id)
     return {"message": "Cart item deleted successfully"}
@@ -1,14 +1,19 @@
 from typing import List
 
-from fastapi import Depends, APIRouter, HTTPException
+from fastapi import Depends, APIRouter, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 
-from ... import crud, schemas
+from ... import categories, etags, schemas, versions
 from ...database import get_db
 
 categories_router = APIRouter()
 
-@categories_router.get("/categories", response_model=List[schemas.Category])
-def read_categories(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    categories = crud.get_categories(db, skip=skip, limit=limit)
-    return categories
+@categories_router.get("/categories", response_model=List[schemas.CategoryListing])
+def read_categories(request: Request, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+    # Categories only change together with the catalog
+    tag = etags.etag("categories", versions.tag("catalog"))
+    if etags.matches(request, tag):
+        return etags.not_modified(tag)
+    # Served from the in-memory registry; the session is only used if it has to (re)load.
+    body = categories.get_registry(db).body(skip, limit)
+    return Response(content=body, media_type="application/json", headers={"ETag": tag})
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import case, delete, update
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from apps.api.src.database import SessionLocal
+from apps.api.src import catalog, crud, idempotency, schemas
+from apps.api.src.database import get_db
 from apps.api.src.models.order import Order
-from apps.api.src.models.order_item import OrderItem
 from apps.api.src.models.product import Product
 from apps.api.src.models.cart import CartItem
 from apps.api.src.schemas import OrderCreate
@@ -12,48 +14,99 @@ from apps.api.src.dependencies import get_current_user # Import from dependencie
 
 router = APIRouter()
 
-# Dependency to get the database session
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-@router.post("/orders", status_code=status.HTTP_201_CREATED)
+@router.post("/orders", status_code=status.HTTP_201_CREATED, response_model=schemas.Order)
 def create_order(
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user) # Assuming get_current_user returns a dict with 'id'
+    current_user: dict = Depends(get_current_user), # Assuming get_current_user returns a dict with 'id'
+    idempotency_key: Optional[str] = Header(None),
+    order: Optional[OrderCreate] = None,
 ):
     user_id = current_user.id
+    if idempotency_key is None:
+        return JSONResponse(status_code=status.HTTP_201_CREATED, content=place_order(db, user_id))
+    if not idempotency_key or len(idempotency_key) > idempotency.MAX_KEY_LENGTH:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Idempotency-Key must be 1 to {idempotency.MAX_KEY_LENGTH} characters.")
+
+    # Retries with the same key replay the first response instead of running checkout again
+    request_hash = idempotency.request_hash(order.model_dump() if order else None)
+    with idempotency.key_lock(user_id, idempotency_key):
+        stored = idempotency.get_stored_response(db, user_id, idempotency_key)
+        if stored is None:
+            record = idempotency.claim(db, user_id, idempotency_key, request_hash)
+            if record is not None:
+                try:
+                    body = place_order(db, user_id, idempotency_record=record)
+                except HTTPException:
+                    # A failed checkout releases the key so the client can retry it
+                    db.rollback()
+                    raise
+                idempotency.remember(user_id, idempotency_key, status.HTTP_201_CREATED, body, request_hash)
+                if idempotency.purge_due():
+                    # In a transaction of its own, after the order has committed
+                    idempotency.purge(db)
+                return JSONResponse(status_code=status.HTTP_201_CREATED, content=body)
+            # Another process committed this key while we waited on its unique index
+            stored = idempotency.get_stored_response(db, user_id, idempotency_key)
+            if stored is None:
+                # Its response isn't visible yet (the claim is still in flight), so the client retries
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="A request with this Idempotency-Key is still in progress. Retry it shortly.",
+                    headers={"Retry-After": "1"},
+                )
+    # Keys stored without a hash (before hashes were kept) replay whatever the body
+    if stored.request_hash is not None and stored.request_hash != request_hash:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="This Idempotency-Key was already used with a different request body.",
+        )
+    return JSONResponse(status_code=stored.status_code, content=stored.body, headers={"Idempotent-Replayed": "true"})
 
+def place_order(db: Session, user_id: int, idempotency_record=None):
     # 1. Retrieve the current user's cart contents
     cart_items = db.query(CartItem).filter(CartItem.user_id == user_id).all()
     if not cart_items:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cart is empty. Cannot create an order.")
 
-    total_amount = 0
-    order_items_to_create = []
-    products_to_update = []
+    quantities = {}
+    for item in cart_items:
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+
+    # 2. Fetch every product in one IN query, locking rows in id order so concurrent
+    # checkouts sharing SKUs always acquire locks in the same sequence (no deadlocks)
+    products = {
+        product.id: product
+        for product in db.query(Product)
+        .filter(Product.id.in_(sorted(quantities)))
+        .order_by(Product.id)
+        .with_for_update()
+        .all()
+    }
 
-    # 2. Validate product stock and prepare order items
+    total_amount = 0
+    order_lines = []
     for item in cart_items:
-        product = db.query(Product).filter(Product.id == item.product_id).first()
+        product = products.get(item.product_id)
         if not product:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Product with ID {item.product_id} not found.")
-        if product.stock < item.quantity:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Insufficient stock for product {product.name}. Available: {product.stock}, Requested: {item.quantity}")
+        if product.stock < quantities[item.product_id]:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Insufficient stock for product {product.name}. Available: {product.stock}, Requested: {quantities[item.product_id]}")
 
-        order_items_to_create.append(
-            OrderItem(
-                product_id=item.product_id,
-                quantity=item.quantity,
-                price=product.price # Use current product price
-            )
-        )
+        order_lines.append((item.product_id, item.quantity, product.price)) # Use current product price
         total_amount += item.quantity * product.price
-        product.stock -= item.quantity # Decrease stock
-        products_to_update.append(product)
+
+    # Decrease stock for all products in one guarded UPDATE; any row failing the
+    # guard means another checkout got there first, so the whole order is rolled back
+    ordered_quantity = case(quantities, value=Product.id)
+    result = db.execute(
+        update(Product)
+        .where(Product.id.in_(quantities), Product.stock >= ordered_quantity)
+        .values(stock=Product.stock - ordered_quantity)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != len(quantities):
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Insufficient stock for one or more products. Please review your cart.")
 
     # 3. Create a new order entry
     new_order = Order(
@@ -65,20 +118,19 @@ def create_order(
     db.add(new_order)
     db.flush() # Flush to get the new_order.id
 
-    # 4. Populate the order_items table
-    for order_item in order_items_to_create:
-        order_item.order_id = new_order.id
-        db.add(order_item)
+    # 4. Populate the order_items table with one multi-row INSERT
+    crud.insert_order_items(db, new_order.id, order_lines)
 
-    # Update product stock
-    for product in products_to_update:
-        db.add(product)
+    # 5. Clear the user's shopping cart with one DELETE, committed together with the order
+    db.execute(delete(CartItem).where(CartItem.user_id == user_id).execution_options(synchronize_session=False))
 
-    # 5. Clear the user's shopping cart
-    for item in cart_items:
-        db.delete(item)
-
-    db.commit()
+    db.flush()
     db.refresh(new_order)
+    body = schemas.Order.model_validate(new_order).model_dump(mode="json")
+    if idempotency_record is not None:
+        idempotency.save_response(idempotency_record, status.HTTP_201_CREATED, body)
 
-    return new_order
\ No newline at end of file
+    db.commit()
+    catalog.products_sold(quantities)
+    catalog.cart_changed(user_id)
+    return body
\ No newline at end of file
@@ -1,36 +1,224 @@
+import hashlib
 from typing import List, Optional
 
-from fastapi import Depends, APIRouter, HTTPException
+import anyio
+from fastapi import Body, Depends, APIRouter, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
-from ... import crud, schemas
+from ... import bulk_import, crud, etags, export, facets, fieldsets, response_cache as responses, schemas, suggest, versions
+from ...pagination import decode_cursor, encode_cursor
 from ...database import get_db
+from ...dependencies import get_current_admin_user, get_current_manager_user
+from ...config import BULK_UPDATE_MAX_ITEMS, PRODUCT_BATCH_MAX_IDS
 
 products_router = APIRouter()
 
+def parse_ids(ids: str):
+    try:
+        product_ids = list(dict.fromkeys(int(product_id) for product_id in ids.split(",") if product_id.strip()))
+    except ValueError:
+        raise HTTPException(status_code=422, detail="ids must be comma-separated integers")
+    if not product_ids or len(product_ids) > PRODUCT_BATCH_MAX_IDS:
+        raise HTTPException(status_code=422, detail=f"ids must list 1 to {PRODUCT_BATCH_MAX_IDS} products")
+    return product_ids
+
+def render_product(row, fields=None) -> bytes:
+    # Rows come from crud with fields=fields or FIELDS: both render without pydantic.
+    return fieldsets.render(fieldsets.product(row, fields or fieldsets.FIELDS))
+
+def read_products_by_ids(request: Request, product_ids: List[int], db: Session, fields: tuple = None):
+    # Each product is cached under the same key as GET /products/{id}; only the ones
+    # not cached are loaded, with a single IN query.
+    product_versions = versions.tags(*(versions.product(product_id) for product_id in product_ids))
+    # Hundreds of counters make a long tag; a digest of ids and versions stays short.
+    state = " ".join(f"{product_id}:{version}" for product_id, version in zip(product_ids, product_versions))
+    tag = etags.etag(fieldsets.scope("products-batch", fields), hashlib.blake2b(state.encode(), digest_size=12).hexdigest())
+    if etags.matches(request, tag):
+        return etags.not_modified(tag)
+    cache = responses.response_cache
+    keys = [
+        cache.product_key(product_id, version, fieldsets.key(fields)) for product_id, version in zip(product_ids, product_versions)
+    ] if cache else []
+    bodies = dict(zip(product_ids, cache.get_many(keys) if cache else [None] * len(product_ids)))
+    uncached = [product_id for product_id, body in bodies.items() if body is None]
+    if uncached:
+        keys = dict(zip(product_ids, keys))
+        for product in crud.get_products_by_ids(db, uncached, fields or fieldsets.FIELDS):
+            bodies[product.id] = render_product(product, fields)
+            if cache:
+                cache.set(keys[product.id], bodies[product.id])
+    # Same bytes as rendering the list at once: product bodies are compact JSON objects.
+    body = b"[" + b",".join(body for body in bodies.values() if body is not None) + b"]"
+    headers = {"ETag": tag}
+    missing = [str(product_id) for product_id, body in bodies.items() if body is None]
+    if missing:
+        headers["X-Missing-Ids"] = ",".join(missing)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @products_router.get("/products", response_model=List[schemas.Product])
 def read_products(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     category_id: Optional[int] = None,
     sort_by_price: Optional[str] = None,
+    cursor: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    in_stock: bool = False,
+    ids: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    fields = fieldsets.parse(fields)
+    if ids is not None:
+        # Multi-get: the products with these comma-separated ids, in that order; the
+        # listing parameters don't apply.
+        return read_products_by_ids(request, parse_ids(ids), db, fields)
+    if sort_by_price not in ("asc", "desc"):
+        sort_by_price = None
+    version = versions.tag("catalog")
+    tag = etags.etag(fieldsets.scope("products", fields), version)
+    if etags.matches(request, tag):
+        return etags.not_modified(tag)
+    cache = responses.response_cache
+    cache_key = cache.listing_key(
+        version, skip, cursor, limit, category_id, sort_by_price, min_price, max_price, in_stock, fieldsets.key(fields)
+    ) if cache else None
+    cached = cache.get(cache_key) if cache else None
+    if cached is None:
+        # With a cursor the page starts after the previous one (keyset) and skip is ignored.
+        after = decode_cursor(cursor, sort_by_price) if cursor else None
+        products = crud.get_products(
+            db, skip=skip, limit=limit, category_id=category_id, sort_by_price=sort_by_price, after=after,
+            min_price=min_price, max_price=max_price, in_stock=in_stock, fields=fields or fieldsets.FIELDS,
+        )
+        next_cursor = None
+        if products and len(products) == limit:
+            next_cursor = encode_cursor(sort_by_price, crud.product_sort_key(products[-1], sort_by_price))
+        serialize = fieldsets.serializer(fields or fieldsets.FIELDS)
+        cached = responses.pack_listing(fieldsets.render([serialize(product) for product in products]), next_cursor)
+        if cache:
+            cache.set(cache_key, cached)
+    body, next_cursor = responses.unpack_listing(cached)
+    headers = {"ETag": tag}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@products_router.get("/products/search", response_model=List[schemas.Product])
+def search_products(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    category_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    after = decode_cursor(cursor, "relevance") if cursor else None
+    rows = crud.search_products(db, q, limit=limit, category_id=category_id, after=after)
+    if len(rows) == limit:
+        product, score = rows[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor("relevance", (score, product.id))
+    return [product for product, _ in rows]
+
+
+@products_router.get("/products/suggest", response_model=List[schemas.Suggestion])
+async def suggest_products(
+    prefix: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=suggest.MAX_LIMIT),
+):
+    # Served from memory without a database session; only the first call builds the index.
+    index = suggest._index or await run_in_threadpool(suggest.get_index)
+    return index.suggest(prefix, limit=limit)
+
+
+@products_router.get("/products/facets", response_model=schemas.ProductFacets)
+def read_product_facets(request: Request, category_id: Optional[int] = None, db: Session = Depends(get_db)):
+    # Counts the listing's category page shows next to it; kept current by catalog writes,
+    # so no GROUP BY runs per request (only the first call loads them).
+    tag = etags.etag("facets", versions.tag("catalog"))
+    if etags.matches(request, tag):
+        return etags.not_modified(tag)
+    body = responses.render(responses.PRODUCT_FACETS, facets.get_counts(db).facets(category_id))
+    return Response(content=body, media_type="application/json", headers={"ETag": tag})
+
+
+@products_router.get("/products/export")
+def export_products(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    category_id: Optional[int] = None,
     db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_admin_user),
 ):
-    products = crud.get_products(db, skip=skip, limit=limit, category_id=category_id, sort_by_price=sort_by_price)
-    return products
+    # The stream opens its own session on the same engine; the request's one closes first.
+    return StreamingResponse(
+        export.stream(db.get_bind(), format, category_id=category_id),
+        media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="products.{format}"'},
+    )
 
 
 @products_router.get("/products/{product_id}", response_model=schemas.Product)
-def read_product(product_id: int, db: Session = Depends(get_db)):
-    db_product = crud.get_product(db, product_id=product_id)
-    if db_product is None:
-        raise HTTPException(status_code=404, detail="Product not found")
-    return db_product
+def read_product(product_id: int, request: Request, fields: Optional[str] = None, db: Session = Depends(get_db)):
+    fields = fieldsets.parse(fields)
+    version = versions.tag(versions.product(product_id))
+    tag = etags.etag(fieldsets.scope("product", fields), version)
+    if etags.matches(request, tag):
+        return etags.not_modified(tag)
+    cache = responses.response_cache
+    cache_key = cache.product_key(product_id, version, fieldsets.key(fields)) if cache else None
+    body = cache.get(cache_key) if cache else None
+    if body is None:
+        db_product = crud.get_product(db, product_id=product_id, fields=fields or fieldsets.FIELDS)
+        if db_product is None:
+            raise HTTPException(status_code=404, detail="Product not found")
+        body = render_product(db_product, fields)
+        if cache:
+            cache.set(cache_key, body)
+    return Response(content=body, media_type="application/json", headers={"ETag": tag})
 
 @products_router.post("/products", response_model=schemas.Product)
 def create_product(product: schemas.ProductCreate, db: Session = Depends(get_db)):
     return crud.create_product(db=db, product=product)
 
+def iter_request_body(request: Request):
+    # Called from a threadpool endpoint: each chunk is awaited on the event loop, so
+    # the upload is consumed as it arrives instead of being buffered whole.
+    stream = request.stream()
+
+    async def next_chunk():
+        return await stream.__anext__()
+
+    while True:
+        try:
+            yield anyio.from_thread.run(next_chunk)
+        except StopAsyncIteration:
+            return
+
+@products_router.post("/products/import")
+def import_products(
+    request: Request,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    create_categories: bool = False,
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_admin_user),
+):
+    records = bulk_import.parse_records(bulk_import.iter_lines(iter_request_body(request)), format)
+    return bulk_import.import_products(db, records, create_categories=create_categories)
+
+@products_router.patch("/products/bulk", response_model=schemas.ProductBulkUpdateResult)
+def bulk_update_products(
+    updates: List[schemas.ProductBulkUpdate] = Body(..., max_length=BULK_UPDATE_MAX_ITEMS),
+    db: Session = Depends(get_db),
+    current_user: schemas.User = Depends(get_current_manager_user),
+):
+    updated, not_found = crud.bulk_update_products(db, updates)
+    return {"updated": updated, "not_found": not_found}
+
 @products_router.put("/products/{product_id}", response_model=schemas.Product)
 def update_product(product_id: int, product: schemas.ProductUpdate, db: Session = Depends(get_db)):
     print(f"[DEBUG] update_product endpoint - Received product_id: {product_id}, product data: {product.model_dump()}")
@@ -0,0 +1,44 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+from passlib.context import CryptContext
+
+from .config import PASSWORD_HASH_WORKERS
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+_workers = PASSWORD_HASH_WORKERS
+_executor = None
+
+# Module-level functions so they can be pickled into the worker processes.
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+def _verify(password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(password, hashed_password)
+
+def get_executor():
+    # With PASSWORD_HASH_WORKERS=0 bcrypt runs on the default thread pool instead.
+    global _executor
+    if _executor is None and _workers > 0:
+        _executor = ProcessPoolExecutor(max_workers=_workers)
+    return _executor
+
+def configure(workers: int):
+    global _workers
+    shutdown()
+    _workers = workers
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+async def hash_password(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), _hash, password)
+
+async def verify_password(password: str, hashed_password: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), _verify, password, hashed_password)
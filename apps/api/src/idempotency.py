@@ -0,0 +1,119 @@
+import hashlib
+import json
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import models
+from .cache import TTLCache
+from .config import IDEMPOTENCY_CACHE_SIZE, IDEMPOTENCY_CACHE_TTL_SECONDS, IDEMPOTENCY_KEY_RETENTION_SECONDS
+
+MAX_KEY_LENGTH = 255
+# Expired keys are deleted at most this often, after a checkout (see purge_due)
+PURGE_INTERVAL_SECONDS = 3600
+
+StoredResponse = namedtuple("StoredResponse", ["status_code", "body", "request_hash"])
+
+# Recently completed responses, so most replays never reach the database.
+replay_cache = TTLCache(maxsize=IDEMPOTENCY_CACHE_SIZE, ttl=min(IDEMPOTENCY_CACHE_TTL_SECONDS, IDEMPOTENCY_KEY_RETENTION_SECONDS))
+
+_next_purge = 0.0
+_purge_guard = threading.Lock()
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+@contextmanager
+def key_lock(user_id: int, key: str):
+    # Concurrent requests with the same key in this process wait for the first one to finish.
+    # Across processes the unique (user_id, key) index in claim() does the same job.
+    cache_key = (user_id, key)
+    with _locks_guard:
+        lock, waiters = _locks.get(cache_key, (threading.Lock(), 0))
+        _locks[cache_key] = (lock, waiters + 1)
+    try:
+        with lock:
+            yield
+    finally:
+        with _locks_guard:
+            lock, waiters = _locks[cache_key]
+            if waiters == 1:
+                del _locks[cache_key]
+            else:
+                _locks[cache_key] = (lock, waiters - 1)
+
+def request_hash(payload) -> str:
+    """Digest of a request body, so a key reused for a different request can be refused."""
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+def _now():
+    # Naive UTC, written and compared by the app so the database clock and time zone don't matter
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def _cutoff():
+    return _now() - timedelta(seconds=IDEMPOTENCY_KEY_RETENTION_SECONDS)
+
+def get_stored_response(db: Session, user_id: int, key: str):
+    stored = replay_cache.get((user_id, key))
+    if stored is not None:
+        return stored
+    record = db.query(models.IdempotencyKey).filter(
+        models.IdempotencyKey.user_id == user_id,
+        models.IdempotencyKey.key == key,
+        models.IdempotencyKey.status_code.isnot(None),
+        models.IdempotencyKey.created_at >= _cutoff(),
+    ).first()
+    if record is None:
+        return None
+    stored = StoredResponse(record.status_code, json.loads(record.response_body), record.request_hash)
+    replay_cache.set((user_id, key), stored)
+    return stored
+
+def purge(db: Session):
+    """Delete keys older than IDEMPOTENCY_KEY_RETENTION_SECONDS; returns how many went."""
+    deleted = db.query(models.IdempotencyKey).filter(models.IdempotencyKey.created_at < _cutoff()).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+def purge_due():
+    """True at most once per PURGE_INTERVAL_SECONDS (and on the first call) in this process."""
+    global _next_purge
+    with _purge_guard:
+        if time.monotonic() < _next_purge:
+            return False
+        _next_purge = time.monotonic() + PURGE_INTERVAL_SECONDS
+        return True
+
+def claim(db: Session, user_id: int, key: str, request_hash: str = None):
+    """Insert the key inside the caller's transaction, before any other work.
+
+    Returns None when another request has already committed the key; the caller
+    should roll back and replay its stored response instead. An expired row for
+    the key (not purged yet) is replaced.
+    """
+    db.query(models.IdempotencyKey).filter(
+        models.IdempotencyKey.user_id == user_id,
+        models.IdempotencyKey.key == key,
+        models.IdempotencyKey.created_at < _cutoff(),
+    ).delete(synchronize_session=False)
+    record = models.IdempotencyKey(user_id=user_id, key=key, request_hash=request_hash, created_at=_now())
+    db.add(record)
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        return None
+    return record
+
+def save_response(record, status_code: int, body):
+    # Written in the same transaction as the order, so the key and the order commit together.
+    record.status_code = status_code
+    record.response_body = json.dumps(body)
+
+def remember(user_id: int, key: str, status_code: int, body, request_hash: str = None):
+    replay_cache.set((user_id, key), StoredResponse(status_code, body, request_hash))
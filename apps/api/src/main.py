@@ -1,17 +1,19 @@
 from fastapi import FastAPI, Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 
-from . import models, schemas, crud
-from .database import engine, SessionLocal
+from . import models, schemas, crud, hashing, response_cache
+from .cache import principal_cache
+from .database import engine, SessionLocal, get_async_db
+from .dependencies import get_current_admin_user
 from .functions.products.routes import products_router
 from .functions.cart.routes import cart_router
 
 import os
 
-from .config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, oauth2_scheme
+from .config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, LISTING_BACKEND, SEARCH_BACKEND, oauth2_scheme
 
 models.Base.metadata.create_all(bind=engine)
 
@@ -29,8 +31,26 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "X-Missing-Ids"],
 )
 
+@app.on_event("startup")
+def build_search_index():
+    if SEARCH_BACKEND == "memory":
+        from . import search_index # numpy is only needed for this backend
+        with SessionLocal() as db:
+            crud.product_search_index = search_index.enable(db)
+
+@app.on_event("startup")
+def build_catalog_snapshot():
+    if LISTING_BACKEND == "memory":
+        from . import catalog_snapshot # numpy is only needed for this backend
+        crud.product_snapshots = catalog_snapshot.enable(engine)
+
+@app.on_event("shutdown")
+def shutdown_password_hashing_pool():
+    hashing.shutdown()
+
 # Dependency
 def get_db():
     db = SessionLocal()
@@ -59,16 +79,17 @@ from .functions.users.routes import router as users_router
 app.include_router(users_router, prefix="/api")
 
 @app.post("/api/auth/register", response_model=schemas.User)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = crud.get_user_by_email(db, email=user.email)
+async def create_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    db_user = await crud.get_user_by_email_async(db, email=user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    return crud.create_user(db=db, user=user)
+    hashed_password = await hashing.hash_password(user.password)
+    return await crud.create_user_async(db=db, user=user, hashed_password=hashed_password)
 
 @app.post("/api/auth/login", response_model=schemas.Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = crud.get_user_by_email(db, email=form_data.username)
-    if not user or not crud.pwd_context.verify(form_data.password, user.hashed_password):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    user = await crud.get_user_by_email_async(db, email=form_data.username)
+    if not user or not await hashing.verify_password(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=401,
             detail="Incorrect username or password",
@@ -80,6 +101,11 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
+@app.get("/api/cache/stats")
+def read_cache_stats(current_user: schemas.User = Depends(get_current_admin_user)):
+    cache = response_cache.response_cache
+    return {"responses": cache.stats() if cache else None, "principals": principal_cache.stats()}
+
 @app.get("/")
 def read_root():
     return {"Hello": "World"}
@@ -5,3 +5,5 @@ from .user import User
 from .cart import CartItem
 from .order import Order
 from .order_item import OrderItem
+from .idempotency_key import IdempotencyKey
+from . import product_search
@@ -1,12 +1,19 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .base import Base
 
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        Index("ix_products_category_id_id", "category_id", "id"),
+        Index("ix_products_price_id", "price", "id"),
+        Index("ix_products_category_id_price_id", "category_id", "price", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
+    # Supplier / merchant identifier; the natural key bulk imports upsert on
+    sku = Column(String, unique=True, index=True)
     name = Column(String, index=True)
     description = Column(String)
     price = Column(Float)
@@ -0,0 +1,40 @@
+from sqlalchemy import DDL, event
+from .product import Product
+
+# Full-text index over products.name and products.description, maintained by the database:
+# a generated tsvector column with a GIN index on Postgres, an external-content FTS5 table
+# kept in sync by triggers on SQLite. Both are created alongside the products table.
+
+POSTGRES_DDL = [
+    """ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    ) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_products_search_vector ON products USING GIN (search_vector)",
+]
+
+SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name, description, content='products', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    # Name matches outrank description matches, like the A/B weights on Postgres.
+    "INSERT INTO products_fts(products_fts, rank) VALUES ('rank', 'bm25(4.0, 1.0)')",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+    END""",
+    # Only text changes touch the index; stock and price updates at checkout skip it.
+    """CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, description ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO products_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+]
+
+for statement in POSTGRES_DDL:
+    event.listen(Product.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+for statement in SQLITE_DDL:
+    event.listen(Product.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(Product.__table__, "after_drop", DDL("DROP TABLE IF EXISTS products_fts").execute_if(dialect="sqlite"))
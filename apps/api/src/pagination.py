@@ -0,0 +1,32 @@
+import base64
+import binascii
+import json
+import math
+
+from fastapi import HTTPException
+
+# Keyset cursors are opaque to clients: base64url JSON holding the sort mode and the
+# sort key of the last row served, e.g. {"s": "asc", "k": [19.99, 812]}.
+
+def encode_cursor(sort, key):
+    raw = json.dumps({"s": sort, "k": list(key)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def is_number(value):
+    # bool is an int subclass, and NaN/Infinity parse from JSON but never compare usefully
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+def decode_cursor(cursor: str, sort):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        key = data["k"]
+        valid = (
+            data["s"] == sort and isinstance(key, list) and len(key) == (1 if sort is None else 2)
+            # The key is [id] or [price or score, id]
+            and isinstance(key[-1], int) and all(is_number(value) for value in key)
+        )
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        valid = False
+    if not valid:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return key
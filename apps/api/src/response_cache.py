@@ -0,0 +1,137 @@
+from typing import List
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from . import schemas
+from .cache import TTLCache
+from .config import REDIS_URL, RESPONSE_CACHE_BACKEND, RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL_SECONDS
+
+# Serialized catalog responses. Keys embed a version tag (versions.tag) that product
+# writes change, so an entry is never served after a write that could change it:
+# listings follow the catalog-wide version, product detail follows that product's own
+# version. Callers read the version before the database, so a response rendered from
+# older rows can only be stored under the older key.
+
+
+PRODUCT = TypeAdapter(schemas.Product)
+PRODUCT_LIST = TypeAdapter(List[schemas.Product])
+PRODUCT_FACETS = TypeAdapter(schemas.ProductFacets)
+CATEGORY_LIST = TypeAdapter(List[schemas.CategoryListing])
+
+def render(adapter: TypeAdapter, value) -> bytes:
+    # Same bytes FastAPI produces for a response_model of this type.
+    return JSONResponse(adapter.dump_python(adapter.validate_python(value), mode="json", by_alias=True)).body
+
+def pack_listing(body: bytes, next_cursor: str = None) -> bytes:
+    # Cursors are base64url, so the first newline always ends the header part.
+    return (next_cursor or "").encode() + b"\n" + body
+
+def unpack_listing(value: bytes):
+    next_cursor, body = value.split(b"\n", 1)
+    return body, next_cursor.decode() or None
+
+
+class InProcessBackend:
+    """LRU + TTL entries in this process (single worker)."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.entries = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def get_many(self, keys):
+        return [self.entries.get(key) for key in keys]
+
+    def set(self, key, value: bytes):
+        self.entries.set(key, value)
+
+    def clear(self):
+        self.entries.clear()
+
+
+class RedisBackend:
+    """Entries shared by every worker through Redis.
+
+    Entries expire after the TTL; LRU eviction is the server's, so run Redis with
+    ``maxmemory-policy volatile-lru`` (only keys with a TTL are evicted, which keeps
+    the version counters).
+    """
+
+    def __init__(self, client, ttl: float, prefix: str = "response-cache:"):
+        self.client = client
+        self.ttl = max(int(ttl), 1)
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def get_many(self, keys):
+        return self.client.mget([self.prefix + key for key in keys]) if keys else []
+
+    def set(self, key, value: bytes):
+        self.client.set(self.prefix + key, value, ex=self.ttl)
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+
+class ResponseCache:
+    def __init__(self, backend):
+        self.backend = backend
+        # Counted per process, also with the shared Redis backend.
+        self.hits = 0
+        self.misses = 0
+
+    def listing_key(self, version: str, *params):
+        return f"products:{version}:" + ":".join("" if param is None else str(param) for param in params)
+
+    def product_key(self, product_id: int, version: str, fields: str = None):
+        return f"product:{product_id}:{version}" + (f":{fields}" if fields else "")
+
+    def get(self, key):
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def get_many(self, keys):
+        values = self.backend.get_many(keys)
+        found = sum(value is not None for value in values)
+        self.hits += found
+        self.misses += len(values) - found
+        return values
+
+    def set(self, key, value: bytes):
+        self.backend.set(key, value)
+
+    def clear(self):
+        self.backend.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def create_backend(name: str = RESPONSE_CACHE_BACKEND):
+    if name == "redis":
+        import redis # only needed for this backend
+        return RedisBackend(redis.Redis.from_url(REDIS_URL), ttl=RESPONSE_CACHE_TTL_SECONDS)
+    if name == "memory":
+        return InProcessBackend(maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL_SECONDS)
+    return None
+
+_backend = create_backend()
+response_cache = ResponseCache(_backend) if _backend is not None else None
@@ -1,8 +1,10 @@
 from __future__ import annotations
 from pydantic import BaseModel, Field
 from typing import Optional, List
+from datetime import datetime
 
 class ProductBase(BaseModel):
+    sku: Optional[str] = None
     name: str
     description: Optional[str] = None
     price: float
@@ -26,6 +28,36 @@ class Product(ProductBase):
     class Config:
         from_attributes = True
 
+class ProductBulkUpdate(BaseModel):
+    id: int
+    # Omitted fields keep their current value
+    price: Optional[float] = Field(None, ge=0)
+    stock: Optional[int] = Field(None, ge=0)
+
+class ProductBulkUpdateResult(BaseModel):
+    updated: List[int]
+    not_found: List[int]
+
+class Suggestion(BaseModel):
+    type: str
+    id: int
+    text: str
+
+class CategoryFacet(BaseModel):
+    id: int
+    name: Optional[str] = None
+    count: int
+
+class PriceBucket(BaseModel):
+    # min inclusive, max exclusive; None for the open ends
+    min: Optional[float] = None
+    max: Optional[float] = None
+    count: int
+
+class ProductFacets(BaseModel):
+    categories: List[CategoryFacet]
+    price_buckets: List[PriceBucket]
+
 class CategoryBase(BaseModel):
     name: str
 
@@ -38,6 +70,9 @@ class Category(CategoryBase):
     class Config:
         from_attributes = True
 
+class CategoryListing(Category):
+    product_count: int = 0
+
 class UserBase(BaseModel):
     email: str
 
@@ -82,4 +117,28 @@ class OrderItemCreate(BaseModel):
     price: float
 
 class OrderCreate(BaseModel):
-    shipping_address_id: Optional[int] = None
\ No newline at end of file
+    shipping_address_id: Optional[int] = None
+
+class OrderItem(BaseModel):
+    id: int
+    order_id: int
+    product_id: int
+    quantity: int
+    price: float
+
+    class Config:
+        from_attributes = True
+
+class Order(BaseModel):
+    id: int
+    user_id: int
+    order_date: Optional[datetime] = None
+    total_amount: float
+    status: str
+    shipping_address_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    order_items: List[OrderItem] = []
+
+    class Config:
+        from_attributes = True
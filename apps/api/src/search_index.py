@@ -0,0 +1,229 @@
+import re
+import sys
+import threading
+from array import array
+from collections import Counter
+
+import numpy as np
+
+from . import catalog, models
+
+TOKEN_RE = re.compile(r"\w+")
+# A word in the product name counts as this many occurrences in the description.
+NAME_WEIGHT = 2
+NO_CATEGORY = -1
+# Cached per-term BM25 weights are reused while the average document length stays within this fraction.
+IMPACT_TOLERANCE = 0.02
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+
+class SearchIndex:
+    """In-memory BM25 index over product name and description.
+
+    Postings are append-only ``array`` buffers (doc numbers and term frequencies) that
+    NumPy reads without copying. Updating a product appends a new document and marks
+    the old one dead; dead documents are dropped by ``compact()`` once they outnumber
+    the live ones.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings = {}  # term -> (array("i") doc numbers, array("H") term frequencies)
+        self._doc_product = array("q")
+        self._doc_length = array("f")
+        self._doc_category = array("i")
+        self._alive = bytearray()
+        self._product_doc = {}
+        self._live_length = 0.0
+        self._impacts = {}  # term -> (posting count, average length, float32 weights)
+        self._scratch = np.zeros(0, dtype=np.float32)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._product_doc)
+
+    def add(self, product_id: int, name: str, description: str = None, category_id: int = None):
+        """Index a product, replacing any previous version of it."""
+        counts = Counter()
+        for term in tokenize(name):
+            counts[term] += NAME_WEIGHT
+        counts.update(tokenize(description))
+        with self._lock:
+            self._remove(product_id)
+            doc = len(self._doc_product)
+            for term, tf in counts.items():
+                docs, tfs = self._postings.get(term) or self._postings.setdefault(term, (array("i"), array("H")))
+                docs.append(doc)
+                tfs.append(min(tf, 0xFFFF))
+            length = sum(counts.values())
+            self._doc_product.append(product_id)
+            self._doc_length.append(length)
+            self._doc_category.append(NO_CATEGORY if category_id is None else category_id)
+            self._alive.append(1)
+            self._product_doc[product_id] = doc
+            self._live_length += length
+            if len(self._alive) - len(self._product_doc) > max(len(self._product_doc), 1024):
+                self._compact()
+
+    def add_product(self, product):
+        self.add(product.id, product.name, product.description, product.category_id)
+
+    def add_products(self, products):
+        for product in products:
+            self.add_product(product)
+
+    def remove(self, product_id: int):
+        with self._lock:
+            self._remove(product_id)
+
+    def _remove(self, product_id):
+        doc = self._product_doc.pop(product_id, None)
+        if doc is not None:
+            self._alive[doc] = 0
+            self._live_length -= self._doc_length[doc]
+
+    def compact(self):
+        with self._lock:
+            self._compact()
+
+    def _compact(self):
+        alive = np.frombuffer(self._alive, dtype=np.bool_)
+        renumber = np.cumsum(alive, dtype=np.int32) - 1
+        postings = {}
+        for term, (docs, tfs) in self._postings.items():
+            doc_numbers = np.frombuffer(docs, dtype=np.int32)
+            keep = alive[doc_numbers]
+            if keep.any():
+                postings[term] = (
+                    array("i", renumber[doc_numbers[keep]].tobytes()),
+                    array("H", np.frombuffer(tfs, dtype=np.uint16)[keep].tobytes()),
+                )
+        self._postings = postings
+        self._impacts = {}
+        self._doc_product = array("q", np.frombuffer(self._doc_product, dtype=np.int64)[alive].tobytes())
+        self._doc_length = array("f", np.frombuffer(self._doc_length, dtype=np.float32)[alive].tobytes())
+        self._doc_category = array("i", np.frombuffer(self._doc_category, dtype=np.int32)[alive].tobytes())
+        del alive
+        self._alive = bytearray(b"\x01" * len(self._doc_product))
+        self._product_doc = {product_id: doc for doc, product_id in enumerate(self._doc_product)}
+
+    def _term_weights(self, term, docs, tfs, doc_length, avg_length):
+        # The length-normalised tf part of BM25 only changes with the posting list or the
+        # average document length, so it is cached per term and refreshed when either moves.
+        cached = self._impacts.get(term)
+        if cached is not None and cached[0] == len(docs) and abs(cached[1] - avg_length) <= IMPACT_TOLERANCE * avg_length:
+            return cached[2]
+        tf = np.frombuffer(tfs, dtype=np.uint16).astype(np.float32)
+        norm = self.k1 * (1 - self.b + self.b * doc_length[docs] / avg_length)
+        impact = (self.k1 + 1) * tf / (tf + norm)
+        self._impacts[term] = (len(docs), avg_length, impact)
+        return impact
+
+    def search(self, q: str, limit: int = 20, category_id: int = None, after: list = None):
+        """Return up to ``limit`` (product_id, score) pairs, best first.
+
+        Scores are negated BM25 so that, as with the database search, lower ranks first;
+        ``after`` is the (score, product_id) of the previous page's last hit.
+        """
+        terms = set(tokenize(q))
+        with self._lock:
+            live = len(self._product_doc)
+            if not terms or not live:
+                return []
+            has_dead = len(self._alive) > live
+            avg_length = self._live_length / live
+            doc_length = np.frombuffer(self._doc_length, dtype=np.float32)
+            alive = np.frombuffer(self._alive, dtype=np.bool_)
+
+            matched = []
+            for term in terms:
+                if term not in self._postings:
+                    continue
+                docs, tfs = self._postings[term]
+                docs = np.frombuffer(docs, dtype=np.int32)
+                df = np.count_nonzero(alive[docs]) if has_dead else len(docs)
+                if not df:
+                    continue
+                idf = np.float32(np.log1p((live - df + 0.5) / (df + 0.5)))
+                matched.append((docs, idf * self._term_weights(term, docs, tfs, doc_length, avg_length)))
+            if not matched:
+                return []
+
+            if len(matched) == 1:
+                # One term: its postings already are the candidates and their scores.
+                candidates, weights = matched[0]
+                if has_dead:
+                    keep = alive[candidates]
+                    candidates, weights = candidates[keep], weights[keep]
+                hit_scores = -weights
+            else:
+                if len(self._scratch) < len(alive):
+                    self._scratch = np.zeros(len(alive) * 2, dtype=np.float32)
+                scores = self._scratch
+                for docs, weights in matched:
+                    scores[docs] += weights
+                # Every matched document has a positive score; a linear pass beats sorting the union.
+                hit = scores[:len(alive)] > 0
+                if has_dead:
+                    hit &= alive
+                candidates = np.flatnonzero(hit)
+                hit_scores = -scores[candidates]
+                for docs, _ in matched:
+                    scores[docs] = 0
+            if category_id is not None:
+                keep = np.frombuffer(self._doc_category, dtype=np.int32)[candidates] == category_id
+                candidates, hit_scores = candidates[keep], hit_scores[keep]
+            hit_products = np.frombuffer(self._doc_product, dtype=np.int64)[candidates]
+            # Drop the views on the buffers before add() may need to grow them.
+            del alive, doc_length, matched, docs, candidates
+
+        if after is not None:
+            after_score = np.float32(after[0])
+            keep = (hit_scores > after_score) | ((hit_scores == after_score) & (hit_products > after[1]))
+            hit_scores, hit_products = hit_scores[keep], hit_products[keep]
+        if len(hit_scores) > limit:
+            # Keep everything tied with the limit-th score so the id tie-break below stays exact.
+            threshold = np.partition(hit_scores, limit - 1)[limit - 1]
+            keep = hit_scores <= threshold
+            hit_scores, hit_products = hit_scores[keep], hit_products[keep]
+        order = np.lexsort((hit_products, hit_scores))[:limit]
+        return [(int(hit_products[i]), float(hit_scores[i])) for i in order]
+
+    def stats(self):
+        with self._lock:
+            postings = sum(len(docs) for docs, _ in self._postings.values())
+            buffers = sum(
+                docs.itemsize * len(docs) + tfs.itemsize * len(tfs) for docs, tfs in self._postings.values()
+            )
+            buffers += sum(a.itemsize * len(a) for a in (self._doc_product, self._doc_length, self._doc_category))
+            buffers += sum(impact.nbytes for _, _, impact in self._impacts.values())
+            buffers += len(self._alive) + self._scratch.nbytes
+            overhead = sys.getsizeof(self._postings) + sys.getsizeof(self._product_doc)
+            overhead += sum(sys.getsizeof(term) + 2 * sys.getsizeof(array("i")) for term in self._postings)
+            return {
+                "documents": len(self._product_doc),
+                "dead_documents": len(self._alive) - len(self._product_doc),
+                "terms": len(self._postings),
+                "postings": postings,
+                "memory_bytes": buffers + overhead,
+            }
+
+
+def build_from_db(db, batch_size: int = 10000):
+    index = SearchIndex()
+    query = db.query(
+        models.Product.id, models.Product.name, models.Product.description, models.Product.category_id
+    ).order_by(models.Product.id)
+    for row in query.yield_per(batch_size):
+        index.add(*row)
+    return index
+
+def enable(db):
+    """Build the index from the products table and keep it in sync with product writes."""
+    index = build_from_db(db)
+    catalog.on_product_change(index.add_product)
+    catalog.on_products_change(index.add_products)
+    return index
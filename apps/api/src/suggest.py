@@ -0,0 +1,202 @@
+import heapq
+import re
+import threading
+from bisect import bisect_left, insort
+
+from sqlalchemy import func
+
+from . import catalog, models
+from .database import SessionLocal
+
+WORD_START_RE = re.compile(r"\b\w")
+# Sorts after any character a prefix can end with, closing the bisect range.
+PREFIX_END = "\U0010ffff"
+# Prefixes matching more entries than this keep their top results between requests.
+KEEP_RESULTS_ABOVE = 256
+MAX_LIMIT = 20
+
+
+class SuggestIndex:
+    """Prefix index over product and category names, ranked by units sold.
+
+    Every word start of a name is an entry in one sorted list, so "lap" finds
+    "Gaming Laptop". A prefix is answered with two bisects and a top-k over the
+    matching range. Broad prefixes ("l", "lap") match a large share of the
+    catalog, so their top results are kept once computed and adjusted in place
+    as sales come in.
+    """
+
+    def __init__(self):
+        self._entries = []  # sorted (key, kind, id)
+        self._names = {}  # (kind, id) -> display name
+        self._product_category = {}
+        self._sold = {}  # product id -> units sold
+        self._category_sold = {}
+        self._top = {}  # broad prefix -> best (kind, id) matches, at most MAX_LIMIT
+        self._lock = threading.Lock()
+
+    def _keys(self, name):
+        lowered = name.lower()
+        return [lowered[match.start():] for match in WORD_START_RE.finditer(lowered)]
+
+    def _kept_prefixes(self, match):
+        return {
+            key[:length] for key in self._keys(self._names[match])
+            for length in range(1, len(key) + 1) if key[:length] in self._top
+        }
+
+    def _rank(self, match):
+        return (-self._popularity(*match), self._names[match].lower(), match)
+
+    def _popularity(self, kind, id):
+        return self._sold.get(id, 0) if kind == "product" else self._category_sold.get(id, 0)
+
+    def _insert(self, kind, id, name):
+        self._names[(kind, id)] = name
+        for key in self._keys(name):
+            insort(self._entries, (key, kind, id))
+        self._forget((kind, id))
+
+    def _delete(self, kind, id):
+        if (kind, id) in self._names:
+            self._forget((kind, id))
+            for key in self._keys(self._names.pop((kind, id))):
+                position = bisect_left(self._entries, (key, kind, id))
+                if position < len(self._entries) and self._entries[position] == (key, kind, id):
+                    del self._entries[position]
+
+    def _forget(self, match):
+        # Drop the kept results this name can appear in; they are recomputed on next use.
+        for prefix in self._kept_prefixes(match):
+            del self._top[prefix]
+
+    def _promote(self, match):
+        # Popularity only grows with sales, so a kept list either reorders or admits the match.
+        for prefix in self._kept_prefixes(match):
+            top = self._top[prefix]
+            if match in top:
+                top.sort(key=self._rank)
+            elif len(top) == MAX_LIMIT and self._rank(match) < self._rank(top[-1]):
+                top[-1] = match
+                top.sort(key=self._rank)
+
+    def _search(self, prefix, limit):
+        top = self._top.get(prefix)
+        if top is not None:
+            return top[:limit]
+        start = bisect_left(self._entries, (prefix,))
+        end = bisect_left(self._entries, (prefix + PREFIX_END,), start)
+        # A name can match at several word starts; keep each (kind, id) once.
+        matches = {(kind, id) for _, kind, id in self._entries[start:end]}
+        if end - start <= KEEP_RESULTS_ABOVE:
+            return heapq.nsmallest(limit, matches, key=self._rank)
+        top = self._top[prefix] = heapq.nsmallest(MAX_LIMIT, matches, key=self._rank)
+        return top[:limit]
+
+    def load(self, categories, products, sold):
+        """Bulk-load (id, name), (id, name, category_id) and {product_id: units} in one sort."""
+        with self._lock:
+            for category_id, name in categories:
+                self._names[("category", category_id)] = name
+            for product_id, name, category_id in products:
+                self._names[("product", product_id)] = name
+                self._product_category[product_id] = category_id
+            self._entries = sorted(
+                (key, kind, id) for (kind, id), name in self._names.items() for key in self._keys(name)
+            )
+            self._top.clear()
+        self.record_sales(sold)
+
+    def has_category(self, category_id: int):
+        return ("category", category_id) in self._names
+
+    def set_category(self, category_id: int, name: str):
+        with self._lock:
+            self._delete("category", category_id)
+            self._insert("category", category_id, name)
+
+    def set_product(self, product_id: int, name: str, category_id: int = None):
+        with self._lock:
+            if self._names.get(("product", product_id)) != name:
+                self._delete("product", product_id)
+                self._insert("product", product_id, name)
+            previous_category = self._product_category.get(product_id)
+            if previous_category != category_id:
+                sold = self._sold.get(product_id, 0)
+                self._category_sold[previous_category] = self._category_sold.get(previous_category, 0) - sold
+                self._category_sold[category_id] = self._category_sold.get(category_id, 0) + sold
+                self._product_category[product_id] = category_id
+                if sold:
+                    for moved in (("category", previous_category), ("category", category_id)):
+                        if moved in self._names:
+                            self._forget(moved)
+
+    def record_sales(self, quantities: dict):
+        with self._lock:
+            for product_id, quantity in quantities.items():
+                self._sold[product_id] = self._sold.get(product_id, 0) + quantity
+                category_id = self._product_category.get(product_id)
+                self._category_sold[category_id] = self._category_sold.get(category_id, 0) + quantity
+                for match in (("product", product_id), ("category", category_id)):
+                    if match in self._names:
+                        self._promote(match)
+
+    def suggest(self, prefix: str, limit: int = 10):
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        with self._lock:
+            top = self._search(prefix, limit)
+            return [{"type": kind, "id": id, "text": self._names[(kind, id)]} for kind, id in top]
+
+
+def build(db):
+    index = SuggestIndex()
+    sold = db.query(models.OrderItem.product_id, func.sum(models.OrderItem.quantity)).group_by(models.OrderItem.product_id)
+    index.load(
+        db.query(models.Category.id, models.Category.name).all(),
+        db.query(models.Product.id, models.Product.name, models.Product.category_id).all(),
+        dict(sold.all()),
+    )
+    return index
+
+_index = None
+_build_lock = threading.Lock()
+
+def rebuild(db):
+    global _index
+    _index = build(db)
+    return _index
+
+def get_index():
+    """The process-wide index, built from the database on first use."""
+    if _index is None:
+        with _build_lock:
+            if _index is None:
+                with SessionLocal() as db:
+                    rebuild(db)
+    return _index
+
+def reset():
+    global _index
+    _index = None
+
+@catalog.on_product_change
+def _product_changed(product):
+    if _index is not None:
+        if product.category is not None and not _index.has_category(product.category_id):
+            _index.set_category(product.category_id, product.category.name)
+        _index.set_product(product.id, product.name, product.category_id)
+
+@catalog.on_products_sold
+def _products_sold(quantities):
+    if _index is not None:
+        _index.record_sales(quantities)
+
+@catalog.on_products_change
+def _products_changed(products):
+    if _index is not None:
+        for product in products:
+            if not _index.has_category(product.category_id):
+                _index.set_category(product.category_id, product.category_name)
+            _index.set_product(product.id, product.name, product.category_id)
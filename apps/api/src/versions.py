@@ -0,0 +1,106 @@
+import threading
+import uuid
+
+from . import catalog
+from .config import REDIS_URL, VERSIONS_BACKEND
+
+# Version counters for state that responses are built from: "catalog" (every product and
+# category), "product:{id}" and "cart:{user_id}", plus STRUCTURE (product creates, edits
+# and imports; not sales or bulk price/stock updates) and PRICES (bulk price updates).
+# Writes bump them through the catalog listeners, so response cache keys and ETags that
+# embed them change with the data, without reading the database.
+
+
+class InProcessVersions:
+    """Counters in this process (single worker).
+
+    They start over at 0 on restart; the epoch changes with them, so a restarted
+    process never repeats an ETag it handed out before.
+    """
+
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex[:8]
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, *names: str):
+        return [self._counters.get(name, 0) for name in names]
+
+    def bump(self, *names: str):
+        with self._lock:
+            for name in names:
+                self._counters[name] = self._counters.get(name, 0) + 1
+
+
+class RedisVersions:
+    """Counters shared by every worker through Redis.
+
+    The keys carry no TTL, so with ``maxmemory-policy volatile-lru`` Redis evicts
+    cached responses (which all expire) but never a counter.
+    """
+
+    def __init__(self, client, prefix: str = "versions:"):
+        self.client = client
+        self.prefix = prefix
+        self.client.set(prefix + "epoch", uuid.uuid4().hex[:8], nx=True)
+        self.epoch = self.client.get(prefix + "epoch").decode()
+
+    def get(self, *names: str):
+        return [int(value or 0) for value in self.client.mget([self.prefix + name for name in names])]
+
+    def bump(self, *names: str):
+        pipeline = self.client.pipeline()
+        for name in names:
+            pipeline.incr(self.prefix + name)
+        pipeline.execute()
+
+
+def create_versions(name: str = VERSIONS_BACKEND):
+    if name == "redis":
+        import redis # only needed for this backend
+        return RedisVersions(redis.Redis.from_url(REDIS_URL))
+    return InProcessVersions()
+
+versions = create_versions()
+
+STRUCTURE = "catalog:structure"
+PRICES = "catalog:prices"
+
+def is_shared():
+    """True when other workers write too, so this process's listeners don't see every write."""
+    return not isinstance(versions, InProcessVersions)
+
+def product(product_id: int):
+    return f"product:{product_id}"
+
+def cart(user_id: int):
+    return f"cart:{user_id}"
+
+def tag(*names: str):
+    """Opaque token that changes whenever one of the named counters does."""
+    return versions.epoch + "." + ".".join(str(value) for value in versions.get(*names))
+
+def tags(*names: str):
+    """tag(name) for each name, read in one round trip."""
+    return [f"{versions.epoch}.{value}" for value in versions.get(*names)]
+
+@catalog.on_product_change
+def _product_changed(product_):
+    versions.bump("catalog", STRUCTURE, product(product_.id))
+
+@catalog.on_products_change
+def _products_changed(products):
+    versions.bump("catalog", STRUCTURE, *(product(product_.id) for product_ in products))
+
+@catalog.on_products_updated
+def _products_updated(product_ids, prices):
+    versions.bump("catalog", *([PRICES] if prices else []), *(product(product_id) for product_id in product_ids))
+
+@catalog.on_products_sold
+def _products_sold(quantities):
+    # Stock is part of every product response
+    versions.bump("catalog", *(product(product_id) for product_id in quantities))
+
+@catalog.on_cart_change
+def _cart_changed(user_id):
+    versions.bump(cart(user_id))
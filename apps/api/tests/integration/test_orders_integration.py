@@ -1,17 +1,21 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker
-from apps.api.src.database import Base
+from apps.api.src.database import Base, get_db
 from apps.api.src.main import app
 from apps.api.src.models.user import User
 from apps.api.src.models.product import Product
 from apps.api.src.models.cart import CartItem
 from apps.api.src.models.order import Order
 from apps.api.src.models.order_item import OrderItem
+from apps.api.src.models.idempotency_key import IdempotencyKey
+from apps.api.src import idempotency
 from apps.api.src.config import SECRET_KEY, ALGORITHM
 from jose import jwt
-from datetime import datetime, timedelta
 
 # Setup test database
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -35,7 +39,7 @@ def client_fixture(session):
     def override_get_db():
         yield session
 
-    app.dependency_overrides[app.dependency_overrides.get(session)] = override_get_db
+    app.dependency_overrides[get_db] = override_get_db
     with TestClient(app) as client:
         yield client
     app.dependency_overrides.clear()
@@ -146,3 +150,167 @@ def test_create_order_integration_product_not_found(client, session, test_user,
 
     assert response.status_code == 404
     assert "Product with ID 999 not found" in response.json()["detail"]
+
+
+def test_create_order_integration_concurrent_stock_change_rolls_back(client, session, test_user, test_product, test_cart_item, auth_token):
+    # Another checkout takes the stock after ours validated it but before the guarded UPDATE runs
+    sold_out = []
+    def sell_out(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE products") and not sold_out:
+            sold_out.append(True)
+            with engine.connect() as other:
+                other.execute(text("UPDATE products SET stock = 1 WHERE id = :id"), {"id": test_product.id})
+                other.commit()
+
+    event.listen(engine, "before_cursor_execute", sell_out)
+    try:
+        headers = {"Authorization": f"Bearer {auth_token}"}
+        response = client.post("/api/orders", headers=headers, json={"shipping_address_id": 1})
+    finally:
+        event.remove(engine, "before_cursor_execute", sell_out)
+
+    assert response.status_code == 400
+    assert "Insufficient stock" in response.json()["detail"]
+    session.expire_all()
+    assert session.query(Order).count() == 0
+    assert session.query(CartItem).filter(CartItem.user_id == test_user.id).count() == 1
+    assert session.query(Product).filter(Product.id == test_product.id).first().stock == 1
+
+
+@pytest.fixture
+def clear_replay_cache():
+    idempotency.replay_cache.clear()
+    yield
+    idempotency.replay_cache.clear()
+
+
+def test_create_order_idempotency_key_replays_first_response(client, session, test_user, test_product, test_cart_item, auth_token, clear_replay_cache):
+    headers = {"Authorization": f"Bearer {auth_token}", "Idempotency-Key": "checkout-1"}
+    first = client.post("/api/orders", headers=headers, json={"shipping_address_id": 1})
+    assert first.status_code == 201
+
+    # The cart is empty now, so only a replay can still return 201
+    second = client.post("/api/orders", headers=headers, json={"shipping_address_id": 1})
+    assert second.status_code == 201
+    assert second.json() == first.json()
+    assert second.headers["Idempotent-Replayed"] == "true"
+
+    session.expire_all()
+    assert session.query(Order).count() == 1
+    assert session.query(Product).filter(Product.id == test_product.id).first().stock == 3
+
+
+def test_create_order_idempotency_key_replays_from_database(client, session, test_user, test_product, test_cart_item, auth_token, clear_replay_cache):
+    headers = {"Authorization": f"Bearer {auth_token}", "Idempotency-Key": "checkout-2"}
+    first = client.post("/api/orders", headers=headers, json={"shipping_address_id": 1})
+    idempotency.replay_cache.clear()  # as if another worker handled the first request
+
+    second = client.post("/api/orders", headers=headers, json={"shipping_address_id": 1})
+    assert second.status_code == 201
+    assert second.json() == first.json()
+    session.expire_all()
+    assert session.query(Order).count() == 1
+
+
+def test_create_order_failed_checkout_does_not_store_key(client, session, test_user, test_product, auth_token, clear_replay_cache):
+    headers = {"Authorization": f"Bearer {auth_token}", "Idempotency-Key": "checkout-3"}
+    response = client.post("/api/orders", headers=headers, json={"shipping_address_id": 1})
+    assert response.status_code == 400
+    session.expire_all()
+    assert session.query(IdempotencyKey).count() == 0
+
+    # Once the cart is filled, the same key places the order
+    session.add(CartItem(user_id=test_user.id, product_id=test_product.id, quantity=1))
+    session.commit()
+    response = client.post("/api/orders", headers=headers, json={"shipping_address_id": 1})
+    assert response.status_code == 201
+    assert session.query(IdempotencyKey).count() == 1
+
+
+def test_create_order_rejects_overlong_idempotency_key(client, test_user, auth_token):
+    headers = {"Authorization": f"Bearer {auth_token}", "Idempotency-Key": "k" * 256}
+    response = client.post("/api/orders", headers=headers, json={"shipping_address_id": 1})
+    assert response.status_code == 400
+
+
+def test_create_order_concurrent_duplicates_place_one_order(client, session, test_user, test_product, test_cart_item, auth_token, clear_replay_cache):
+    # A session per request, as in production: the two requests run on separate threads
+    def override_get_db():
+        with TestingSessionLocal() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    headers = {"Authorization": f"Bearer {auth_token}", "Idempotency-Key": "checkout-4"}
+    start = threading.Barrier(2)
+    responses = []
+
+    def checkout():
+        start.wait()
+        responses.append(client.post("/api/orders", headers=headers, json={"shipping_address_id": 1}))
+
+    threads = [threading.Thread(target=checkout) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [response.status_code for response in responses] == [201, 201]
+    assert responses[0].json() == responses[1].json()
+    # One placed the order, the other waited for it and replayed its response
+    assert [response.headers.get("Idempotent-Replayed") for response in responses].count("true") == 1
+    session.expire_all()
+    assert session.query(Order).count() == 1
+    assert session.query(Product).filter(Product.id == test_product.id).first().stock == 3
+
+
+def test_create_order_key_claimed_elsewhere_asks_for_a_retry(client, test_user, test_cart_item, auth_token, clear_replay_cache, monkeypatch):
+    # Another worker holds the key but its response isn't stored yet
+    monkeypatch.setattr(idempotency, "claim", lambda db, user_id, key, request_hash: None)
+    headers = {"Authorization": f"Bearer {auth_token}", "Idempotency-Key": "checkout-5"}
+    response = client.post("/api/orders", headers=headers, json={"shipping_address_id": 1})
+    assert response.status_code == 409
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_create_order_rejects_key_reused_with_a_different_body(client, session, test_user, test_product, test_cart_item, auth_token, clear_replay_cache):
+    headers = {"Authorization": f"Bearer {auth_token}", "Idempotency-Key": "checkout-6"}
+    assert client.post("/api/orders", headers=headers, json={"shipping_address_id": 1}).status_code == 201
+    response = client.post("/api/orders", headers=headers, json={"shipping_address_id": 2})
+    assert response.status_code == 422
+    idempotency.replay_cache.clear()  # the database copy keeps the hash too
+    assert client.post("/api/orders", headers=headers, json={"shipping_address_id": 2}).status_code == 422
+    assert client.post("/api/orders", headers=headers, json={"shipping_address_id": 1}).headers["Idempotent-Replayed"] == "true"
+
+
+def test_create_order_expired_key_is_not_replayed(client, session, test_user, test_product, test_cart_item, auth_token, clear_replay_cache, monkeypatch):
+    headers = {"Authorization": f"Bearer {auth_token}", "Idempotency-Key": "checkout-7"}
+    first = client.post("/api/orders", headers=headers, json={"shipping_address_id": 1})
+    assert first.status_code == 201
+    idempotency.replay_cache.clear()
+
+    # A day and a second later the key is forgotten: the same key places a new order
+    later = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(seconds=idempotency.IDEMPOTENCY_KEY_RETENTION_SECONDS + 1)
+    monkeypatch.setattr(idempotency, "_now", lambda: later)
+    session.add(CartItem(user_id=test_user.id, product_id=test_product.id, quantity=1))
+    session.commit()
+    second = client.post("/api/orders", headers=headers, json={"shipping_address_id": 1})
+    assert second.status_code == 201
+    assert "Idempotent-Replayed" not in second.headers
+    assert second.json()["id"] != first.json()["id"]
+    session.expire_all()
+    assert session.query(IdempotencyKey).count() == 1
+
+
+def test_purge_deletes_expired_keys(session, test_user, monkeypatch):
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    retention = timedelta(seconds=idempotency.IDEMPOTENCY_KEY_RETENTION_SECONDS)
+    session.add_all([
+        IdempotencyKey(user_id=test_user.id, key="old", status_code=201, response_body="{}", created_at=now - retention - timedelta(minutes=1)),
+        IdempotencyKey(user_id=test_user.id, key="new", status_code=201, response_body="{}", created_at=now),
+    ])
+    session.commit()
+    assert idempotency.purge(session) == 1
+    assert [record.key for record in session.query(IdempotencyKey)] == ["new"]
+
+    monkeypatch.setattr(idempotency, "_next_purge", 0.0)
+    assert idempotency.purge_due() and not idempotency.purge_due()
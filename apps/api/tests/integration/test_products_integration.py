@@ -0,0 +1,199 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from apps.api.src.main import app
+from apps.api.src.database import Base, get_db
+from apps.api.src import models
+from apps.api.src.config import SECRET_KEY, ALGORITHM
+from jose import jwt
+from datetime import datetime, timedelta
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture(name="db_session")
+def db_session_fixture():
+    # test.db may hold tables from an older schema (no sku column)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture(name="client")
+def client_fixture(db_session):
+    def override_get_db():
+        try:
+            yield db_session
+        finally:
+            db_session.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as c:
+        yield c
+    app.dependency_overrides.clear()
+
+
+def token_for(db_session, email, role):
+    db_session.add(models.User(email=email, hashed_password="x", role=role))
+    db_session.commit()
+    return jwt.encode({"sub": email, "exp": datetime.utcnow() + timedelta(minutes=5)}, SECRET_KEY, algorithm=ALGORITHM)
+
+@pytest.fixture
+def admin_headers(db_session):
+    return {"Authorization": f"Bearer {token_for(db_session, 'admin@example.com', 'admin')}"}
+
+@pytest.fixture
+def buyer_headers(db_session):
+    return {"Authorization": f"Bearer {token_for(db_session, 'buyer@example.com', 'buyer')}"}
+
+@pytest.fixture
+def electronics(db_session):
+    category = models.Category(name="Electronics")
+    db_session.add(category)
+    db_session.commit()
+    return category
+
+
+CSV_FEED = (
+    "sku,name,description,price,image_url,stock,category\n"
+    "EL-1,Laptop,\"Fast, light\",1200,https://example.com/1.jpg,5,Electronics\n"
+    "EL-2,Mouse,,25.5,,100,Electronics\n"
+    "EL-3,Broken,,not-a-price,,1,Electronics\n"
+    "BK-1,Novel,,15,,10,Books\n"
+)
+
+def test_import_csv_reports_row_errors(client, admin_headers, electronics):
+    response = client.post("/api/products/import?format=csv", content=CSV_FEED, headers=admin_headers)
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["rows"], report["written"], report["failed"]) == (4, 2, 2)
+    assert [(error["line"], error["sku"]) for error in report["errors"]] == [(4, "EL-3"), (5, "BK-1")]
+    assert report["chunks"][0]["rows_per_second"] > 0
+    names = {product["name"] for product in client.get("/api/products").json()}
+    assert names == {"Laptop", "Mouse"}
+
+def test_import_ndjson_upserts_on_sku(client, admin_headers, electronics):
+    feed = '{"sku": "EL-1", "name": "Laptop", "price": 1200, "stock": 5, "category": "Electronics"}\n'
+    client.post("/api/products/import?format=ndjson", content=feed, headers=admin_headers)
+    listing = client.get("/api/products")
+
+    feed = (
+        '{"sku": "EL-1", "name": "Laptop Pro", "price": 1500, "stock": 3, "category": "Electronics"}\n'
+        '{"sku": "BK-1", "name": "Novel", "price": 15, "stock": 10, "category": "Books"}\n'
+        'not json\n'
+    )
+    report = client.post("/api/products/import?format=ndjson&create_categories=true", content=feed, headers=admin_headers).json()
+    assert (report["written"], report["failed"], report["created_categories"]) == (2, 1, ["Books"])
+
+    products = client.get("/api/products", headers={"If-None-Match": listing.headers["ETag"]}).json()
+    assert [(product["sku"], product["name"], product["price"]) for product in products] == [("EL-1", "Laptop Pro", 1500.0), ("BK-1", "Novel", 15.0)]
+    assert products[1]["category"]["name"] == "Books"
+
+def test_import_requires_admin(client, buyer_headers):
+    assert client.post("/api/products/import", content="sku,name\n", headers=buyer_headers).status_code == 403
+    assert client.post("/api/products/import?format=xml", content="", headers=buyer_headers).status_code in (403, 422)
+
+@pytest.fixture
+def manager_headers(db_session):
+    return {"Authorization": f"Bearer {token_for(db_session, 'manager@example.com', 'manager')}"}
+
+@pytest.fixture
+def products(db_session, electronics):
+    products = [models.Product(name=f"Item {i}", price=10.0 + i, stock=5, category_id=electronics.id) for i in range(30)]
+    db_session.add_all(products)
+    db_session.commit()
+    return [product.id for product in products]
+
+def test_bulk_update_applies_partial_updates(client, manager_headers, products):
+    etag = client.get(f"/api/products/{products[0]}").headers["ETag"]
+    response = client.patch("/api/products/bulk", json=[
+        {"id": products[0], "price": 99.5},
+        {"id": products[1], "stock": 0},
+        {"id": 999999, "price": 1},
+        {"id": products[0], "stock": 7},
+    ], headers=manager_headers)
+    assert response.status_code == 200
+    assert response.json() == {"updated": [products[0], products[1]], "not_found": [999999]}
+
+    first = client.get(f"/api/products/{products[0]}", headers={"If-None-Match": etag})
+    assert first.status_code == 200
+    assert (first.json()["price"], first.json()["stock"]) == (99.5, 7)
+    second = client.get(f"/api/products/{products[1]}").json()
+    assert (second["price"], second["stock"]) == (11.0, 0)
+
+def test_bulk_update_statement_count_is_constant(client, manager_headers, products):
+    statements = []
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        response = client.patch("/api/products/bulk", json=[{"id": product_id, "price": 1.0} for product_id in products], headers=manager_headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    assert len(response.json()["updated"]) == 30
+    assert len([statement for statement in statements if statement.lstrip().upper().startswith("UPDATE")]) == 1
+
+def test_bulk_update_validation_and_permissions(client, manager_headers, buyer_headers, products):
+    assert client.patch("/api/products/bulk", json=[{"id": products[0], "price": -1}], headers=manager_headers).status_code == 422
+    assert client.patch("/api/products/bulk", json=[{"id": products[0], "price": 1}], headers=buyer_headers).status_code == 403
+
+def test_export_streams_ndjson_and_csv(client, admin_headers, products, monkeypatch):
+    from apps.api.src import export
+    monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 7)
+    partitions = []
+    iter_partitions = export.iter_partitions
+
+    def recorded(*args):
+        for rows in iter_partitions(*args):
+            partitions.append(len(rows))
+            yield rows
+
+    monkeypatch.setattr(export, "iter_partitions", recorded)
+    response = client.get("/api/products/export", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["id"] for row in rows] == products
+    assert rows[0] == {"id": products[0], "sku": None, "name": "Item 0", "description": None, "price": 10.0, "image_url": None, "stock": 5, "category": "Electronics"}
+    # 30 products in partitions of EXPORT_BATCH_SIZE
+    assert partitions == [7, 7, 7, 7, 2]
+
+    response = client.get("/api/products/export?format=csv", headers=admin_headers)
+    assert response.headers["content-type"].startswith("text/csv")
+    lines = response.text.splitlines()
+    assert lines[0] == "id,sku,name,description,price,image_url,stock,category"
+    assert len(lines) == len(products) + 1
+
+def test_export_keeps_products_without_a_category(client, admin_headers, db_session, products):
+    orphan = models.Product(name="Orphan", price=1.0, stock=0)
+    db_session.add(orphan)
+    db_session.commit()
+    orphan_id = orphan.id
+    rows = [json.loads(line) for line in client.get("/api/products/export", headers=admin_headers).text.splitlines()]
+    assert [row["id"] for row in rows] == products + [orphan_id]
+    assert rows[-1]["category"] is None
+    lines = client.get("/api/products/export?format=csv", headers=admin_headers).text.splitlines()
+    assert lines[-1] == f"{orphan_id},,Orphan,,1.0,,0,"
+
+def test_export_can_be_imported_again(client, admin_headers, electronics):
+    client.post("/api/products/import", content=CSV_FEED, headers=admin_headers)
+    dump = client.get("/api/products/export?format=csv", headers=admin_headers).content
+    report = client.post("/api/products/import", content=dump, headers=admin_headers).json()
+    assert (report["rows"], report["written"], report["failed"]) == (2, 2, 0)
+
+def test_export_requires_admin(client, buyer_headers):
+    assert client.get("/api/products/export", headers=buyer_headers).status_code == 403
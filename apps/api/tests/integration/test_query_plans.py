@@ -0,0 +1,149 @@
+import asyncio
+import os
+import re
+import pytest
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from apps.api.src import crud, idempotency
+from apps.api.src.database import Base, get_async_url
+from apps.api.src.functions.orders.main import place_order
+from apps.api.src.models import User, Product, Category, CartItem, Order, OrderItem
+
+# A separate database, large enough that the planner has a reason to prefer indexes
+DATABASE_PATH = "./test_query_plans.db"
+SQLALCHEMY_DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
+
+USERS = 2000
+CATEGORIES = 50
+PRODUCTS = 20000
+CART_SIZE = 5
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine(get_async_url(SQLALCHEMY_DATABASE_URL))
+TestingAsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+# "SCAN products" is a full table walk; "SCAN products USING INDEX ..." is an ordered index walk.
+FULL_SCAN = re.compile(r"\bSCAN (\w+)\b(?! USING)")
+
+
+@pytest.fixture(scope="module", autouse=True)
+def seeded_database():
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Category), [{"id": i, "name": f"Category {i}"} for i in range(1, CATEGORIES + 1)])
+        conn.execute(insert(User), [
+            {"id": i, "email": f"user{i}@example.com", "hashed_password": "x"} for i in range(1, USERS + 1)
+        ])
+        conn.execute(insert(Product), [
+            {"id": i, "name": f"Product {i}", "price": float(i % 997), "stock": 1000, "category_id": i % CATEGORIES + 1}
+            for i in range(1, PRODUCTS + 1)
+        ])
+        conn.execute(insert(CartItem), [
+            {"user_id": u, "product_id": (u * CART_SIZE + n) % PRODUCTS + 1, "quantity": 1}
+            for u in range(1, USERS + 1) for n in range(CART_SIZE)
+        ])
+        conn.execute(insert(Order), [{"id": u, "user_id": u, "total_amount": 1.0} for u in range(1, USERS + 1)])
+        conn.execute(insert(OrderItem), [
+            {"order_id": u, "product_id": u, "quantity": 1, "price": 1.0} for u in range(1, USERS + 1)
+        ])
+        conn.exec_driver_sql("ANALYZE")
+    yield
+    asyncio.run(async_engine.dispose())
+    engine.dispose()
+    os.remove(DATABASE_PATH)
+
+
+@contextmanager
+def capture_statements(bind):
+    statements = []
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and not statement.lstrip().upper().startswith("INSERT"):
+            statements.append((statement, parameters))
+    event.listen(bind, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(bind, "before_cursor_execute", before_cursor_execute)
+
+
+def query_plans(statements):
+    with engine.connect() as conn:
+        return [
+            (statement, [row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)])
+            for statement, parameters in statements
+        ]
+
+
+def full_scans(statements):
+    return [
+        (match.group(1), statement)
+        for statement, plan in query_plans(statements)
+        for detail in plan
+        for match in [FULL_SCAN.search(detail)] if match
+    ]
+
+
+@pytest.fixture
+def db():
+    with TestingSessionLocal() as session:
+        yield session
+
+
+@pytest.mark.parametrize("name, run", [
+    ("get_user_by_email", lambda db: crud.get_user_by_email(db, "user42@example.com")),
+    ("get_product", lambda db: crud.get_product(db, 42)),
+    ("get_products by category", lambda db: crud.get_products(db, category_id=7)),
+    ("get_cart_items", lambda db: crud.get_cart_items(db, 42)),
+    ("get_stored_response", lambda db: idempotency.get_stored_response(db, 42, "missing-key")),
+    ("order items", lambda db: db.get(Order, 42).order_items),
+])
+def test_sync_queries_use_indexes(db, name, run):
+    with capture_statements(engine) as statements:
+        run(db)
+    assert statements
+    assert full_scans(statements) == []
+
+
+@pytest.mark.parametrize("name, run", [
+    ("unsorted by category", lambda db: crud.get_products(db, category_id=7)),
+    ("by price", lambda db: crud.get_products(db, sort_by_price="desc")),
+    ("by category and price", lambda db: crud.get_products(db, category_id=7, sort_by_price="asc")),
+    ("after id", lambda db: crud.get_products(db, after=[15000])),
+    ("by price after key", lambda db: crud.get_products(db, sort_by_price="asc", after=[500.0, 1500])),
+    ("by category and price after key", lambda db: crud.get_products(db, category_id=7, sort_by_price="desc", after=[500.0, 1500])),
+])
+def test_product_pages_read_in_index_order(db, name, run):
+    # Each page must be a range read on a matching index, not a sort of every candidate row
+    with capture_statements(engine) as statements:
+        run(db)
+    assert full_scans(statements) == []
+    assert not any("TEMP B-TREE" in detail for _, plan in query_plans(statements) for detail in plan)
+
+
+def test_checkout_uses_indexes(db):
+    idempotency.replay_cache.clear()
+    with capture_statements(engine) as statements:
+        place_order(db, 43)
+    assert len(statements) > 3
+    assert full_scans(statements) == []
+
+
+@pytest.mark.parametrize("name, run", [
+    ("get_user_by_email_async", lambda db: crud.get_user_by_email_async(db, "user42@example.com")),
+    ("get_product_async", lambda db: crud.get_product_async(db, 42)),
+    ("get_cart_items_async", lambda db: crud.get_cart_items_async(db, 42)),
+])
+def test_async_queries_use_indexes(name, run):
+    async def go():
+        async with TestingAsyncSessionLocal() as session:
+            await run(session)
+            await session.rollback()
+
+    with capture_statements(async_engine.sync_engine) as statements:
+        asyncio.run(go())
+    assert statements
+    assert full_scans(statements) == []
@@ -1,12 +1,15 @@
 import pytest
+from contextlib import contextmanager
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
-from apps.api.src.database import Base, get_db
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from apps.api.src.database import Base, get_db, get_async_db, get_async_url
 from apps.api.src.main import app
-from apps.api.src.models import User, Product, Category
-from apps.api.src.crud import get_user_by_email, create_user, get_product
-from apps.api.src.schemas import UserCreate
+from apps.api.src.cache import principal_cache
+from apps.api.src.models import User, Product, Category, CartItem
+from apps.api.src.crud import get_user_by_email, create_user, get_product, get_cart_items
+from apps.api.src.schemas import UserCreate, CartItem as CartItemSchema
 
 # Use a test database
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -15,9 +18,12 @@ engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine(get_async_url(SQLALCHEMY_DATABASE_URL))
+TestingAsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
 
 @pytest.fixture(name="db_session")
 def db_session_fixture():
+    Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
     db = TestingSessionLocal()
     try:
@@ -33,7 +39,11 @@ def client_fixture(db_session):
             yield db_session
         finally:
             db_session.close()
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
     yield TestClient(app)
     app.dependency_overrides.clear()
 
@@ -229,3 +239,121 @@ def test_cart_unauthorized_access(client):
 
     response = client.delete("/api/cart/items/1")
     assert response.status_code == 401
+
+def test_add_existing_item_to_cart_keeps_single_row(client, auth_headers, test_product, db_session):
+    for quantity in (1, 2, 3):
+        response = client.post(
+            "/api/cart/items",
+            headers=auth_headers,
+            json={"product_id": test_product.id, "quantity": quantity}
+        )
+        assert response.status_code == 200
+        assert response.json()["product"]["id"] == test_product.id
+    rows = db_session.query(CartItem).filter(CartItem.product_id == test_product.id).all()
+    assert len(rows) == 1
+    assert rows[0].quantity == 6
+
+@contextmanager
+def count_statements(bind):
+    statements = []
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(bind, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(bind, "before_cursor_execute", before_cursor_execute)
+
+def fill_cart(db_session, user_id, category_id, size):
+    products = [
+        Product(name=f"Product {i}", price=1.0 + i, stock=10, category_id=category_id)
+        for i in range(size)
+    ]
+    db_session.add_all(products)
+    db_session.flush()
+    db_session.add_all([CartItem(user_id=user_id, product_id=p.id, quantity=1) for p in products])
+    db_session.commit()
+
+@pytest.mark.parametrize("cart_size", [1, 30])
+def test_get_cart_items_statement_count_is_constant(db_session, test_user, test_product, cart_size):
+    user_id, category_id = test_user.id, test_product.category_id
+    fill_cart(db_session, user_id, category_id, cart_size)
+    db_session.expunge_all()
+
+    with count_statements(engine) as statements:
+        items = get_cart_items(db_session, user_id)
+        payload = [CartItemSchema.model_validate(item).model_dump() for item in items]
+
+    assert len(payload) == cart_size
+    assert all(item["product"]["category"]["name"] == "Electronics" for item in payload)
+    assert len(statements) == 1
+
+def test_read_cart_statement_count_is_constant(client, auth_headers, db_session, test_user, test_product):
+    user_id, category_id = test_user.id, test_product.category_id
+    counts = []
+    for cart_size in (1, 30):
+        db_session.query(CartItem).delete()
+        db_session.commit()
+        fill_cart(db_session, user_id, category_id, cart_size)
+        with count_statements(async_engine.sync_engine) as statements:
+            response = client.get("/api/cart", headers=auth_headers)
+        assert response.status_code == 200
+        assert len(response.json()) == cart_size
+        counts.append(len(statements))
+    assert counts[0] == counts[1] == 1
+
+def test_read_cart_etag(client, auth_headers, test_product):
+    empty = client.get("/api/cart", headers=auth_headers)
+    tag = empty.headers["ETag"]
+    assert client.get("/api/cart", headers={**auth_headers, "If-None-Match": tag}).status_code == 304
+
+    client.post("/api/cart/items", json={"product_id": test_product.id, "quantity": 1}, headers=auth_headers)
+    response = client.get("/api/cart", headers={**auth_headers, "If-None-Match": tag})
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+    assert response.headers["ETag"] != tag
+
+def test_read_cart_etag_is_per_user(client, auth_headers, db_session):
+    create_user(db_session, UserCreate(email="other@example.com", password="password"))
+    token = client.post("/api/auth/login", data={"username": "other@example.com", "password": "password"}).json()["access_token"]
+    other_headers = {"Authorization": f"Bearer {token}"}
+
+    mine = client.get("/api/cart", headers=auth_headers)
+    theirs = client.get("/api/cart", headers=other_headers)
+    assert mine.headers["ETag"] != theirs.headers["ETag"]
+    assert mine.headers["Cache-Control"] == "private"
+    assert "Authorization" in mine.headers["Vary"]
+
+    response = client.get("/api/cart", headers={**other_headers, "If-None-Match": mine.headers["ETag"]})
+    assert response.status_code == 200
+    not_modified = client.get("/api/cart", headers={**auth_headers, "If-None-Match": mine.headers["ETag"]})
+    assert not_modified.status_code == 304
+    assert not_modified.headers["Cache-Control"] == "private"
+
+def test_cache_stats_report_principals(client, auth_headers, db_session, test_user):
+    assert client.get("/api/cache/stats").status_code == 401
+    assert client.get("/api/cache/stats", headers=auth_headers).status_code == 403
+    db_session.query(User).filter(User.id == test_user.id).update({"role": "admin"})
+    db_session.commit()
+    principal_cache.clear()
+
+    before = client.get("/api/cache/stats", headers=auth_headers).json()["principals"]
+    client.get("/api/cart", headers=auth_headers)
+    client.get("/api/cart", headers=auth_headers)
+    after = client.get("/api/cache/stats", headers=auth_headers).json()["principals"]
+    assert after["hits"] >= before["hits"] + 1
+    assert after["size"] >= 1
+
+def test_read_cart_sparse_fields(client, auth_headers, test_product):
+    client.post("/api/cart/items", headers=auth_headers, json={"product_id": test_product.id, "quantity": 2})
+    full = client.get("/api/cart", headers=auth_headers)
+    response = client.get("/api/cart?fields=name,price,image_url", headers=auth_headers)
+    assert response.status_code == 200
+    line = response.json()[0]
+    assert line == {**{k: full.json()[0][k] for k in ("product_id", "quantity", "id", "user_id")},
+                    "product": {"name": "Test Product", "price": 10.0, "imageUrl": "http://example.com/image.jpg"}}
+    assert response.headers["ETag"] != full.headers["ETag"]
+    assert client.get("/api/cart?fields=category", headers=auth_headers).json()[0]["product"] == {
+        "category": {"name": "Electronics", "id": test_product.category_id},
+    }
+    assert client.get("/api/cart?fields=weight", headers=auth_headers).status_code == 422
@@ -7,7 +7,10 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from src.main import app
+from src import categories, response_cache
+from src.pagination import encode_cursor
 from src.database import Base, get_db
+from src.dependencies import get_current_admin_user
 from src.models import product, category
 from src.models.product import Product
 from src.models.category import Category
@@ -23,6 +26,7 @@ TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engin
 
 @pytest.fixture(name="db_session")
 def db_session_fixture():
+    Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
     db = TestingSessionLocal()
     try:
@@ -41,6 +45,10 @@ def client_fixture(db_session):
             db_session.close()
 
     app.dependency_overrides[get_db] = override_get_db
+    # Tests write rows directly, bypassing the invalidation in crud
+    if response_cache.response_cache:
+        response_cache.response_cache.clear()
+    categories.reset()
     with TestClient(app) as c:
         yield c
     app.dependency_overrides.clear()
@@ -122,3 +130,244 @@ def test_read_single_product_not_found(client, db_session):
     response = client.get("/api/products/999")
     assert response.status_code == 404
     assert response.json() == {"detail": "Product not found"}
+
+def walk_cursor_pages(client, query, limit):
+    names, cursor = [], None
+    while True:
+        url = f"/api/products?limit={limit}{query}" + (f"&cursor={cursor}" if cursor else "")
+        response = client.get(url)
+        assert response.status_code == 200
+        names += [p["name"] for p in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return names
+
+@pytest.mark.parametrize("query", ["", "&sort_by_price=asc", "&sort_by_price=desc", "&category_id=1", "&category_id=2&sort_by_price=desc"])
+def test_read_products_cursor_pages_match_offset_listing(client, db_session, query):
+    seed_test_data(db_session)
+    # A price tie across a page boundary must neither repeat nor skip a product
+    db_session.add(Product(name="Book F", description="Poetry", price=20.00, image_url="url11", stock=5, category_id=2))
+    db_session.commit()
+    expected = [p["name"] for p in client.get(f"/api/products?limit=100{query}").json()]
+    assert walk_cursor_pages(client, query, limit=3) == expected
+
+def test_read_products_cursor_ignores_skip(client, db_session):
+    seed_test_data(db_session)
+    first = client.get("/api/products?limit=2")
+    cursor = first.headers["X-Next-Cursor"]
+    response = client.get(f"/api/products?limit=2&skip=5&cursor={cursor}")
+    assert [p["name"] for p in response.json()] == ["Keyboard", "Monitor"]
+
+def test_read_products_rejects_invalid_cursor(client, db_session):
+    seed_test_data(db_session)
+    assert client.get("/api/products?cursor=not-a-cursor").status_code == 400
+    # A cursor is only valid for the ordering it was issued for
+    cursor = client.get("/api/products?limit=2").headers["X-Next-Cursor"]
+    assert client.get(f"/api/products?limit=2&sort_by_price=asc&cursor={cursor}").status_code == 400
+
+def test_read_products_rejects_cursor_keys_of_the_wrong_type(client, db_session):
+    seed_test_data(db_session)
+    forged = [(None, ["x"]), (None, [True]), (None, [1.5]), ("asc", ["10", 3]), ("asc", [None, 3]), ("desc", [10.0, False])]
+    for sort, key in forged:
+        query = f"&sort_by_price={sort}" if sort else ""
+        assert client.get(f"/api/products?limit=2{query}&cursor={encode_cursor(sort, key)}").status_code == 400
+    assert client.get(f"/api/products/search?q=laptop&cursor={encode_cursor('relevance', ['x', 1])}").status_code == 400
+    assert client.get(f"/api/products?limit=2&sort_by_price=asc&cursor={encode_cursor('asc', [10, 3])}").status_code == 200
+
+def test_search_products_ranks_name_matches_first(client, db_session):
+    seed_test_data(db_session)
+    db_session.add(Product(name="Desk lamp", description="Lights up any laptop desk", price=30.00, image_url="url12", stock=10, category_id=1))
+    db_session.commit()
+    response = client.get("/api/products/search?q=laptop")
+    assert response.status_code == 200
+    assert [p["name"] for p in response.json()] == ["Laptop", "Desk lamp"]
+
+def test_search_products_filters_by_category_and_stems(client, db_session):
+    seed_test_data(db_session)
+    response = client.get("/api/products/search?q=novels&category_id=2")
+    assert len(response.json()) == 5
+    assert client.get("/api/products/search?q=novels&category_id=1").json() == []
+
+def test_search_products_cursor_pages(client, db_session):
+    seed_test_data(db_session)
+    expected = [p["name"] for p in client.get("/api/products/search?q=novel").json()]
+    names, cursor = [], None
+    while True:
+        response = client.get("/api/products/search?q=novel&limit=2" + (f"&cursor={cursor}" if cursor else ""))
+        names += [p["name"] for p in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert names == expected
+
+def test_search_products_follows_product_updates(client, db_session):
+    seed_test_data(db_session)
+    laptop = db_session.query(Product).filter(Product.name == "Laptop").first()
+    laptop.name = "Notebook"
+    laptop.description = "Powerful notebook"
+    db_session.commit()
+    assert client.get("/api/products/search?q=laptop").json() == []
+    assert [p["name"] for p in client.get("/api/products/search?q=notebook").json()] == ["Notebook"]
+
+def test_search_products_treats_query_syntax_as_text(client, db_session):
+    seed_test_data(db_session)
+    assert client.get('/api/products/search?q=NEAR("mouse"').status_code == 200
+    assert client.get("/api/products/search?q=").status_code == 422
+
+def test_search_products_with_in_memory_index(client, db_session, monkeypatch):
+    pytest.importorskip("numpy")
+    from src import crud, search_index
+    seed_test_data(db_session)
+    monkeypatch.setattr(crud, "product_search_index", search_index.build_from_db(db_session))
+    response = client.get("/api/products/search?q=novel&category_id=2&limit=3")
+    assert response.status_code == 200
+    assert len(response.json()) == 3
+    assert "X-Next-Cursor" in response.headers
+    assert client.get("/api/products/search?q=laptop").json()[0]["name"] == "Laptop"
+
+def test_suggest_products(client, db_session):
+    from src import suggest
+    seed_test_data(db_session)
+    suggest.rebuild(db_session)
+    try:
+        response = client.get("/api/products/suggest?prefix=boo")
+        assert response.status_code == 200
+        # Nothing sold yet, so ties are broken alphabetically
+        assert [s["text"] for s in response.json()] == ["Book A", "Book B", "Book C", "Book D", "Book E", "Books"]
+        assert response.json()[-1]["type"] == "category"
+
+        client.put("/api/products/1", json={"name": "Notebook", "price": 1200.0, "stock": 50, "category": "Electronics"})
+        assert [s["text"] for s in client.get("/api/products/suggest?prefix=note").json()] == ["Notebook"]
+        assert client.get("/api/products/suggest?prefix=").status_code == 422
+    finally:
+        suggest.reset()
+
+def test_cached_product_responses_follow_updates(client, db_session):
+    seed_test_data(db_session)
+    first = client.get("/api/products?limit=2")
+    assert client.get("/api/products?limit=2").content == first.content
+    assert client.get("/api/products?limit=2").headers["X-Next-Cursor"] == first.headers["X-Next-Cursor"]
+    assert client.get("/api/products/1").json()["name"] == "Laptop"
+
+    client.put("/api/products/1", json={"name": "Notebook", "price": 1200.0, "stock": 50, "category": "Electronics"})
+    assert client.get("/api/products?limit=2").json()[0]["name"] == "Notebook"
+    assert client.get("/api/products/1").json()["name"] == "Notebook"
+    app.dependency_overrides[get_current_admin_user] = lambda: None
+    assert client.get("/api/cache/stats").json()["responses"]["hits"] >= 2
+
+def test_product_etags(client, db_session):
+    seed_test_data(db_session)
+    listing = client.get("/api/products?limit=2")
+    detail = client.get("/api/products/1")
+    categories = client.get("/api/categories")
+    for path, response in (("/api/products?limit=2", listing), ("/api/products/1", detail), ("/api/categories", categories)):
+        not_modified = client.get(path, headers={"If-None-Match": response.headers["ETag"]})
+        assert not_modified.status_code == 304
+        assert not_modified.content == b""
+        assert not_modified.headers["ETag"] == response.headers["ETag"]
+
+    client.put("/api/products/1", json={"name": "Notebook", "price": 1200.0, "stock": 50, "category": "Electronics"})
+    changed = client.get("/api/products/1", headers={"If-None-Match": detail.headers["ETag"]})
+    assert changed.status_code == 200
+    assert changed.json()["name"] == "Notebook"
+    assert client.get("/api/products?limit=2", headers={"If-None-Match": listing.headers["ETag"]}).status_code == 200
+    assert client.get("/api/products/2", headers={"If-None-Match": f'W/{client.get("/api/products/2").headers["ETag"]}'}).status_code == 304
+
+def test_read_products_price_and_stock_filters(client, db_session):
+    seed_test_data(db_session)
+    response = client.get("/api/products?min_price=20&max_price=300&sort_by_price=asc")
+    assert [p["price"] for p in response.json()] == [20.0, 22.0, 25.0, 50.0, 75.0, 300.0]
+    db_session.query(Product).filter(Product.name == "Mouse").update({"stock": 0})
+    db_session.commit()
+    response = client.get("/api/products?min_price=20&max_price=300&sort_by_price=asc&in_stock=true")
+    assert "Mouse" not in [p["name"] for p in response.json()]
+
+def test_product_facets(client, db_session):
+    from src import facets
+    seed_test_data(db_session)
+    facets.reset()
+    try:
+        response = client.get("/api/products/facets")
+        assert response.status_code == 200
+        assert [(c["name"], c["count"]) for c in response.json()["categories"]] == [("Electronics", 5), ("Books", 5)]
+        buckets = response.json()["price_buckets"]
+        assert buckets[0] == {"min": None, "max": 10.0, "count": 0}
+        assert [b["count"] for b in buckets] == [0, 5, 1, 2, 0, 1, 0, 1]
+        books = client.get("/api/products/facets?category_id=2").json()["price_buckets"]
+        assert [b["count"] for b in books] == [0, 5, 0, 0, 0, 0, 0, 0]
+
+        tag = response.headers["ETag"]
+        assert client.get("/api/products/facets", headers={"If-None-Match": tag}).status_code == 304
+        client.put("/api/products/1", json={"name": "Laptop", "price": 40.0, "stock": 50, "category": "Electronics"})
+        response = client.get("/api/products/facets", headers={"If-None-Match": tag})
+        assert response.status_code == 200
+        assert [b["count"] for b in response.json()["price_buckets"]] == [0, 5, 2, 2, 0, 1, 0, 0]
+    finally:
+        facets.reset()
+
+def test_categories_served_from_registry(client, db_session):
+    seed_test_data(db_session)
+    response = client.get("/api/categories")
+    assert response.status_code == 200
+    assert response.json() == [
+        {"name": "Electronics", "id": 1, "product_count": 5},
+        {"name": "Books", "id": 2, "product_count": 5},
+    ]
+    assert client.get("/api/categories?skip=1&limit=1").json()[0]["name"] == "Books"
+
+    client.post("/api/products", json={"name": "Book F", "price": 9.0, "stock": 1, "category": "Books"})
+    client.put("/api/products/1", json={"name": "Laptop", "price": 1200.0, "stock": 50, "category": "Books"})
+    assert [c["product_count"] for c in client.get("/api/categories").json()] == [4, 7]
+
+    # A category the registry hasn't seen yet is found in the database once
+    db_session.add(Category(name="Toys"))
+    db_session.commit()
+    assert client.post("/api/products", json={"name": "Kite", "price": 5.0, "stock": 1, "category": "Toys"}).status_code == 200
+    assert client.post("/api/products", json={"name": "Kite", "price": 5.0, "stock": 1, "category": "Games"}).status_code == 400
+    assert client.get("/api/categories").json()[-1] == {"name": "Toys", "id": 3, "product_count": 1}
+    assert "product_count" not in client.get("/api/products/1").json()["category"]
+
+def test_read_products_by_ids(client, db_session):
+    seed_test_data(db_session)
+    response = client.get("/api/products?ids=3,999,1,3&category_id=2")
+    assert response.status_code == 200
+    assert [p["id"] for p in response.json()] == [3, 1]
+    assert response.json()[1]["category"]["name"] == "Electronics"
+    assert response.headers["X-Missing-Ids"] == "999"
+    # Cached bodies are joined into the same bytes as a freshly rendered list
+    assert client.get("/api/products?ids=1,3").json() == list(reversed(response.json()))
+    assert client.get("/api/products?ids=3,1,999").content == response.content
+
+    tag = response.headers["ETag"]
+    assert client.get("/api/products?ids=3,999,1", headers={"If-None-Match": tag}).status_code == 304
+    client.put("/api/products/1", json={"name": "Notebook", "price": 1200.0, "stock": 50, "category": "Electronics"})
+    response = client.get("/api/products?ids=3,999,1", headers={"If-None-Match": tag})
+    assert response.status_code == 200
+    assert response.json()[1]["name"] == "Notebook"
+
+    assert "X-Missing-Ids" not in client.get("/api/products?ids=2").headers
+    assert client.get("/api/products?ids=1,x").status_code == 422
+    assert client.get("/api/products?ids=").status_code == 422
+    assert client.get("/api/products?ids=" + ",".join(map(str, range(1, 502)))).status_code == 422
+
+def test_sparse_fieldsets(client, db_session):
+    seed_test_data(db_session)
+    full = client.get("/api/products?limit=3&sort_by_price=asc").json()
+    response = client.get("/api/products?limit=3&sort_by_price=asc&fields=price,image_url,name,id")
+    assert response.status_code == 200
+    # Fields come back in the full response's order, with the full response's values
+    assert response.json() == [{k: p[k] for k in ("name", "price", "imageUrl", "id")} for p in full]
+    assert list(response.json()[0]) == ["name", "price", "imageUrl", "id"]
+    # Cursors work although price and id weren't both requested
+    page = client.get("/api/products?limit=3&sort_by_price=asc&fields=name")
+    after = client.get(f"/api/products?limit=3&sort_by_price=asc&fields=name&cursor={page.headers['X-Next-Cursor']}").json()
+    assert [p["name"] for p in after] == ["Book B", "Book D", "Mouse"]
+    assert page.headers["ETag"] != client.get("/api/products?limit=3&sort_by_price=asc").headers["ETag"]
+
+    product = client.get("/api/products/1?fields=category,stock")
+    assert product.json() == {"stock": 50, "category": {"name": "Electronics", "id": 1}}
+    assert client.get("/api/products/1").json()["description"] == "Powerful laptop"
+    assert client.get("/api/products/99?fields=name").status_code == 404
+    assert client.get("/api/products?ids=2,1&fields=name").json() == [{"name": "Mouse"}, {"name": "Laptop"}]
+    assert client.get("/api/products?fields=name,weight").status_code == 422
+    assert client.get("/api/products?fields=").status_code == 422
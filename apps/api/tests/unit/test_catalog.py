@@ -0,0 +1,20 @@
+from apps.api.src import catalog
+
+def test_remove_listener_covers_every_event():
+    calls = []
+
+    def listener(*args):
+        calls.append(args)
+
+    for register in (catalog.on_product_change, catalog.on_products_change, catalog.on_products_updated,
+                     catalog.on_products_sold, catalog.on_cart_change):
+        register(listener)
+    catalog.remove_listener(listener)
+
+    catalog.products_updated([1], {1: 2.0})
+    catalog.products_sold({1: 1})
+    catalog.cart_changed(1)
+    assert calls == []
+    for listeners in (catalog._listeners, catalog._bulk_listeners, catalog._update_listeners,
+                      catalog._sales_listeners, catalog._cart_listeners):
+        assert listener not in listeners
@@ -0,0 +1,136 @@
+import random
+
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+pytest.importorskip("numpy")
+
+from apps.api.src import catalog, catalog_snapshot, crud, models, versions
+from apps.api.src.catalog_snapshot import CatalogSnapshot, SnapshotEngine
+
+QUERIES = [
+    {},
+    {"sort_by_price": "asc"},
+    {"sort_by_price": "desc", "skip": 5},
+    {"category_id": 2, "sort_by_price": "asc"},
+    {"category_id": 3, "in_stock": True},
+    {"min_price": 20, "max_price": 40, "sort_by_price": "desc"},
+    {"in_stock": True, "sort_by_price": "asc", "min_price": 10},
+]
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    models.Base.metadata.create_all(engine)
+    rng = random.Random(7)
+    with Session(engine) as db:
+        db.execute(insert(models.Category), [{"id": i, "name": f"Category {i}"} for i in range(1, 5)])
+        # Few distinct prices, so pages have to break ties by id
+        db.execute(insert(models.Product), [
+            {"id": i, "name": f"Product {i}", "price": float(rng.randint(1, 10) * 5), "stock": rng.randint(0, 3), "category_id": rng.randint(1, 4)}
+            for i in range(1, 301)
+        ])
+        db.commit()
+        yield db
+
+def sql_page(db, **query):
+    return [product.id for product in crud.get_products(db, limit=query.pop("limit", 25), **query)]
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_pages_match_sql(db, query):
+    snapshot = CatalogSnapshot.load(db)
+    assert snapshot.page(limit=25, **query) == sql_page(db, **query)
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_keyset_pages_match_sql(db, query):
+    snapshot = CatalogSnapshot.load(db)
+    query = {key: value for key, value in query.items() if key != "skip"}
+    first = crud.get_products(db, limit=10, **query)
+    after = list(crud.product_sort_key(first[-1], query.get("sort_by_price")))
+    assert snapshot.page(limit=10, after=after, **query) == sql_page(db, limit=10, after=after, **query)
+
+def test_null_prices_fall_back_to_sql(db):
+    db.add(models.Product(name="Unpriced", stock=1, category_id=1))
+    db.commit()
+    snapshot = CatalogSnapshot.load(db)
+    assert snapshot.page(sort_by_price="asc") is None
+    assert snapshot.page(limit=5) == [1, 2, 3, 4, 5]
+
+def test_engine_serves_only_current_snapshots(db, monkeypatch):
+    monkeypatch.setattr(versions, "versions", versions.InProcessVersions())
+    engine = SnapshotEngine(db.get_bind())
+    engine.refresh()
+    assert engine.current() is engine.snapshot
+
+    product = models.Product(name="New", price=1.0, stock=1, category_id=1)
+    db.add(product)
+    db.commit()
+    catalog.product_changed(product)
+    monkeypatch.setattr(engine, "_rebuilding", True)  # hold the background rebuild
+    assert engine.current() is None
+
+    engine.refresh()
+    assert engine.current().page(sort_by_price="asc", limit=1) == [product.id]
+
+def test_sales_and_price_updates_apply_in_place(db, monkeypatch):
+    monkeypatch.setattr(versions, "versions", versions.InProcessVersions())
+    monkeypatch.setattr(catalog_snapshot, "_engine", None)  # put back after the test
+    engine = catalog_snapshot.enable(db.get_bind())
+    monkeypatch.setattr(engine, "refresh", lambda: pytest.fail("rebuilt the snapshot"))
+    stocked = [product.id for product in crud.get_products(db, in_stock=True, limit=1000)]
+
+    db.get(models.Product, stocked[0]).stock = 0
+    db.commit()
+    catalog.products_sold({stocked[0]: 1})
+    assert engine.current().page(in_stock=True, limit=1000) == stocked[1:]
+
+    db.get(models.Product, 7).price = 0.5
+    db.get(models.Product, 8).stock = 9
+    db.commit()
+    catalog.products_updated([7, 8], {7: 0.5})
+    for query in QUERIES:
+        assert engine.current().page(**query, limit=25) == sql_page(db, **query)
+
+def test_snapshot_refuses_shared_versions(db, monkeypatch):
+    # Other workers' sales would only reach it by rebuilding on every checkout
+    monkeypatch.setattr(catalog_snapshot, "_engine", None)
+    monkeypatch.setattr(versions, "is_shared", lambda: True)
+    with pytest.raises(RuntimeError, match="VERSIONS_BACKEND=redis"):
+        catalog_snapshot.enable(db.get_bind())
+    assert catalog_snapshot._engine is None
+
+def test_price_changes_keep_the_orderings_of_a_fresh_build(db):
+    snapshot = CatalogSnapshot.load(db)
+    ids = [3, 4, 150, 151, 300]
+    # Ties with unchanged products and with each other, a new lowest and highest price
+    updated = snapshot.with_values(ids, [25.0, 25.0, 0.5, 99.0, 25.0], [1, 0, 2, 3, 0])
+    expected = CatalogSnapshot(updated.ids, updated.prices, updated.stock, updated.category_ids)
+    for name in ("by_price", "prices_by_price", "by_category_price", "by_category", "stock"):
+        assert getattr(updated, name).tolist() == getattr(expected, name).tolist()
+    assert snapshot.prices[149] != 0.5  # the original is not modified
+
+def test_updates_during_a_rebuild_reach_the_new_snapshot(db, monkeypatch):
+    monkeypatch.setattr(versions, "versions", versions.InProcessVersions())
+    engine = SnapshotEngine(db.get_bind())
+    engine.refresh()
+    load = CatalogSnapshot.load
+
+    def load_then_sell(db_, version):
+        snapshot = load(db_, version)
+        # Committed after the rebuild read the catalog, before it is swapped in
+        db.get(models.Product, 5).price = 0.25
+        db.commit()
+        engine.apply([5])
+        return snapshot
+
+    monkeypatch.setattr(CatalogSnapshot, "load", load_then_sell)
+    engine.refresh()
+    assert engine.current().page(sort_by_price="asc", limit=1) == [5]
+
+def test_get_products_uses_the_snapshot(db, monkeypatch):
+    engine = SnapshotEngine(db.get_bind())
+    engine.refresh()
+    monkeypatch.setattr(crud, "product_snapshots", engine)
+    monkeypatch.setattr(CatalogSnapshot, "page", lambda self, *args: [3, 1, 2])
+    assert [product.id for product in crud.get_products(db, limit=3)] == [3, 1, 2]
@@ -0,0 +1,57 @@
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from apps.api.src import bulk_import, categories, models, versions
+
+def test_registry_serves_reads_without_queries(monkeypatch):
+    engine = create_engine("sqlite://")
+    models.Base.metadata.create_all(engine)
+    monkeypatch.setattr(categories, "_registry", None)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    with Session(engine) as db:
+        db.add_all([models.Category(id=1, name="Electronics"), models.Category(id=2, name="Books")])
+        db.add(models.Product(name="Laptop", price=1.0, stock=1, category_id=1))
+        db.commit()
+        statements.clear()
+
+        registry = categories.get_registry(db)
+        assert len(statements) == 2
+        body = registry.body()
+        assert categories.get_registry(db).body() is body
+        assert registry.id_for("Books") == 2 and registry.id_for("Toys") is None
+        assert len(statements) == 2
+
+        registry.product_moved(1, 2)
+        assert registry.rows() == [
+            {"id": 1, "name": "Electronics", "product_count": 0},
+            {"id": 2, "name": "Books", "product_count": 1},
+        ]
+        assert registry.body() != body
+
+        # A bulk import may add products and categories: the next use reloads
+        bulk_import.import_products(db, [(2, {"sku": "T-1", "name": "Kite", "price": "3", "category": "Toys"})],
+                                    create_categories=True)
+        reloaded = categories.get_registry(db)
+        assert reloaded is not registry
+        assert reloaded.rows()[-1] == {"id": 3, "name": "Toys", "product_count": 1}
+
+def test_registry_follows_writes_of_other_workers(monkeypatch):
+    engine = create_engine("sqlite://")
+    models.Base.metadata.create_all(engine)
+    monkeypatch.setattr(categories, "_registry", None)
+    monkeypatch.setattr(versions, "versions", versions.InProcessVersions())
+    monkeypatch.setattr(versions, "is_shared", lambda: True)
+    with Session(engine) as db:
+        db.add(models.Category(id=1, name="Electronics"))
+        db.commit()
+        registry = categories.get_registry(db)
+        assert registry.rows()[0]["product_count"] == 0
+
+        # Another worker adds a product: this one only sees the shared versions move
+        db.add(models.Product(name="Laptop", price=1.0, stock=1, category_id=1))
+        db.commit()
+        versions.versions.bump("catalog")
+        assert categories.get_registry(db) is registry
+        versions.versions.bump("catalog", versions.STRUCTURE)
+        assert categories.get_registry(db).rows()[0]["product_count"] == 1
@@ -0,0 +1,97 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from apps.api.src import bulk_import, categories, crud, facets, models, schemas, versions
+from apps.api.src.facets import FacetCounts
+
+@pytest.fixture
+def counts():
+    counts = FacetCounts([10, 100])
+    counts.load(
+        [(1, "Electronics"), (2, "Books")],
+        [(1, 1, 500.0), (2, 1, 25.0), (3, 2, 5.0), (4, 2, 12.0), (5, 2, None)],
+    )
+    return counts
+
+def bucket_counts(result):
+    return [bucket["count"] for bucket in result["price_buckets"]]
+
+def test_facets_count_categories_and_price_buckets(counts):
+    result = counts.facets()
+    assert result["categories"] == [
+        {"id": 1, "name": "Electronics", "count": 2},
+        {"id": 2, "name": "Books", "count": 3},
+    ]
+    # Bucket bounds are [min, max); the product without a price is only counted in its category
+    assert result["price_buckets"][1] == {"min": 10, "max": 100, "count": 2}
+    assert bucket_counts(result) == [1, 2, 1]
+    assert bucket_counts(counts.facets(category_id=2)) == [1, 1, 0]
+    assert counts.bucket(10) == 1 and counts.bucket(9.99) == 0
+
+def test_writes_move_products_between_cells(counts):
+    counts.set_product(1, 2, 50.0)
+    counts.set_product(6, 1, 1.0)
+    counts.set_prices({3: 1000.0, 99: 1.0})
+    assert [category["count"] for category in counts.facets()["categories"]] == [2, 4]
+    assert bucket_counts(counts.facets(category_id=2)) == [0, 2, 1]
+    assert bucket_counts(counts.facets(category_id=1)) == [1, 1, 0]
+
+def test_catalog_writes_reach_process_counts(counts, monkeypatch):
+    monkeypatch.setattr(facets, "_counts", counts)
+    engine = create_engine("sqlite://")
+    models.Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add_all([models.Category(id=1, name="Electronics"), models.Category(id=2, name="Books")])
+        db.add(models.Product(id=2, name="Mouse", price=25.0, stock=1, category_id=1))
+        db.commit()
+        crud.bulk_update_products(db, [schemas.ProductBulkUpdate(id=2, price=200.0), schemas.ProductBulkUpdate(id=2, stock=3)])
+        assert bucket_counts(counts.facets(category_id=1)) == [0, 0, 2]
+
+        report = bulk_import.import_products(db, [(2, {"sku": "T-1", "name": "Toy", "price": "3", "category": "Toys"})],
+                                             create_categories=True)
+        assert report["written"] == 1
+    toys = counts.facets()["categories"][-1]
+    assert (toys["name"], toys["count"]) == ("Toys", 1)
+    assert bucket_counts(counts.facets(category_id=toys["id"])) == [1, 0, 0]
+
+@pytest.fixture
+def db(monkeypatch):
+    monkeypatch.setattr(facets, "_counts", None)
+    monkeypatch.setattr(categories, "_registry", None)
+    monkeypatch.setattr(versions, "versions", versions.InProcessVersions())
+    engine = create_engine("sqlite://")
+    models.Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(models.Category(id=1, name="Electronics"))
+        db.commit()
+        yield db
+
+def test_writes_during_a_build_are_not_lost(db, monkeypatch):
+    load = FacetCounts.load
+
+    def load_after_a_write(self, category_rows, product_rows):
+        # Committed after the build's queries ran, before its counts are published
+        crud.create_product(db, schemas.ProductCreate(name="Lamp", price=20.0, stock=1, category="Electronics"))
+        load(self, category_rows, product_rows)
+
+    monkeypatch.setattr(FacetCounts, "load", load_after_a_write)
+    assert facets.get_counts(db).facets()["categories"] == [{"id": 1, "name": "Electronics", "count": 1}]
+
+def test_counts_follow_writes_of_other_workers(db, monkeypatch):
+    monkeypatch.setattr(versions, "is_shared", lambda: True)
+    counts = facets.get_counts(db)
+    assert counts.facets()["categories"] == []
+
+    # Another worker's writes reach this one only through the shared versions
+    db.add(models.Product(id=1, name="Lamp", price=20.0, stock=1, category_id=1))
+    db.commit()
+    versions.versions.bump("catalog")  # a sale: no rebuild
+    assert facets.get_counts(db) is counts
+    versions.versions.bump("catalog", versions.STRUCTURE)
+    assert facets.get_counts(db).facets()["categories"] == [{"id": 1, "name": "Electronics", "count": 1}]
+
+    db.get(models.Product, 1).price = 5000.0
+    db.commit()
+    versions.versions.bump("catalog", versions.PRICES)
+    assert bucket_counts(facets.get_counts(db).facets())[-1] == 1
@@ -0,0 +1,98 @@
+import asyncio
+import itertools
+import json
+from typing import List
+
+import pytest
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+
+from apps.api.src import crud, fast_json, fieldsets, models, schemas
+from apps.api.src.database import get_async_url
+from apps.api.src.response_cache import PRODUCT, PRODUCT_LIST, render
+
+# Parity of the row -> dict -> bytes path with the pydantic responses it replaced.
+
+CART = TypeAdapter(List[schemas.CartItem])
+
+PRODUCTS = [
+    {"sku": "EL-1", "name": "Laptop", "description": "Fast, light", "price": 1200.0, "image_url": "https://example.com/1.jpg", "stock": 5},
+    {"sku": None, "name": "Mouse \"Pro\"", "description": None, "price": 19.99, "image_url": None, "stock": 0},
+    {"sku": "ÜN-1", "name": "Café ☕ 😀", "description": "line\nbreak\ttab \\ /   \x00", "price": 0.1, "image_url": "", "stock": 2**31 - 1},
+    {"sku": "BK-1", "name": "Book", "description": "<b>&amp;</b>", "price": 12345678.9, "image_url": "x", "stock": 7},
+]
+
+@pytest.fixture(params=["orjson", "json"])
+def encoder(request, monkeypatch):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(fast_json, "orjson", None)
+    return request.param
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/parity.db")
+    models.Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add_all([models.Category(id=1, name="Electronics"), models.Category(id=2, name="Bücher")])
+        db.add_all(models.Product(category_id=1 + i % 2, **product) for i, product in enumerate(PRODUCTS))
+        db.add(models.User(id=1, email="a@example.com", hashed_password="x"))
+        db.add_all([models.CartItem(user_id=1, product_id=3, quantity=2), models.CartItem(user_id=1, product_id=1, quantity=1)])
+        db.commit()
+        yield db
+
+def test_listing_bytes_match_pydantic(db, encoder):
+    expected = render(PRODUCT_LIST, crud.get_products(db))
+    db.expunge_all()
+    rows = crud.get_products(db, fields=fieldsets.FIELDS)
+    assert fieldsets.render([fieldsets.product(row) for row in rows]) == expected
+
+def test_sorted_and_batch_bytes_match_pydantic(db, encoder):
+    expected = render(PRODUCT_LIST, crud.get_products(db, sort_by_price="desc", limit=3))
+    rows = crud.get_products(db, sort_by_price="desc", limit=3, fields=fieldsets.FIELDS)
+    assert fieldsets.render([fieldsets.product(row) for row in rows]) == expected
+    ids = [4, 1, 3]
+    expected = [render(PRODUCT, product) for product in crud.get_products_by_ids(db, ids)]
+    assert [fieldsets.render(fieldsets.product(row)) for row in crud.get_products_by_ids(db, ids, fieldsets.FIELDS)] == expected
+
+def test_detail_bytes_match_pydantic(db, encoder):
+    for product_id in range(1, len(PRODUCTS) + 1):
+        expected = render(PRODUCT, crud.get_product(db, product_id))
+        assert fieldsets.render(fieldsets.product(crud.get_product(db, product_id, fields=fieldsets.FIELDS))) == expected
+
+def test_cart_bytes_match_pydantic(db, encoder):
+    expected = render(CART, crud.get_cart_items(db, user_id=1))
+
+    async def cart_rows():
+        engine = create_async_engine(get_async_url(str(db.get_bind().url)))
+        async with AsyncSession(engine) as async_db:
+            rows = await crud.get_cart_items_async(async_db, user_id=1, fields=fieldsets.FIELDS)
+        await engine.dispose()
+        return rows
+
+    rows = asyncio.run(cart_rows())
+    assert fast_json.FastJSONResponse([fieldsets.cart_line(row) for row in rows]).body == expected
+
+def test_exponent_floats_are_schema_equivalent(db, encoder):
+    for product_id, price in ((1, 1e-7), (2, 1e16), (3, 2.5e300)):
+        db.get(models.Product, product_id).price = price
+    db.commit()
+    expected = render(PRODUCT_LIST, crud.get_products(db))
+    body = fieldsets.render([fieldsets.product(row) for row in crud.get_products(db, fields=fieldsets.FIELDS)])
+    # orjson writes 1e-7 where json writes 1e-07: same numbers, same schema
+    assert json.loads(body) == json.loads(expected)
+    TypeAdapter(List[schemas.Product]).validate_json(body)
+
+@pytest.mark.parametrize("size", [1, 2, 3])
+def test_sparse_fieldsets_project_the_full_response(db, size):
+    full = json.loads(render(PRODUCT_LIST, crud.get_products(db)))
+    for fields in itertools.combinations(fieldsets.FIELDS, size):
+        rows = crud.get_products(db, fields=fields)
+        assert [fieldsets.product(row, fields) for row in rows] == [{field: product[field] for field in fields} for product in full]
+
+def test_fieldset_serializers_are_built_once():
+    assert fieldsets.serializer(fieldsets.FIELDS) is fieldsets.serializer(fieldsets.FIELDS)
+    assert fieldsets.serializer(("name",), 4) is not fieldsets.serializer(("name",))
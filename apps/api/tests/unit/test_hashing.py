@@ -0,0 +1,25 @@
+import asyncio
+
+import pytest
+
+from apps.api.src import hashing
+
+@pytest.fixture(params=[0, 1], ids=["thread-pool", "process-pool"])
+def hashing_workers(request):
+    hashing.configure(request.param)
+    yield request.param
+    hashing.configure(hashing.PASSWORD_HASH_WORKERS)
+
+def test_hash_and_verify_round_trip(hashing_workers):
+    async def run():
+        hashed = await hashing.hash_password("password")
+        return (
+            await hashing.verify_password("password", hashed),
+            await hashing.verify_password("wrongpassword", hashed),
+        )
+
+    assert asyncio.run(run()) == (True, False)
+
+def test_hash_is_compatible_with_pwd_context(hashing_workers):
+    hashed = asyncio.run(hashing.hash_password("password"))
+    assert hashing.pwd_context.verify("password", hashed)
@@ -0,0 +1,69 @@
+import pytest
+from unittest.mock import MagicMock
+from sqlalchemy.orm import Session
+
+from apps.api.src import crud, models
+from apps.api.src.cache import TTLCache, principal_cache
+from apps.api.src.dependencies import get_principal
+
+@pytest.fixture(autouse=True)
+def clear_principal_cache():
+    principal_cache.clear()
+    yield
+    principal_cache.clear()
+
+@pytest.fixture
+def mock_db_session():
+    return MagicMock(spec=Session)
+
+def test_get_principal_caches_lookup(mock_db_session, monkeypatch):
+    user = models.User(id=1, email="test@example.com", role="buyer")
+    lookup = MagicMock(return_value=user)
+    monkeypatch.setattr(crud, "get_user_by_email", lookup)
+
+    first = get_principal(mock_db_session, email="test@example.com")
+    second = get_principal(mock_db_session, email="test@example.com")
+
+    assert first.id == second.id == 1
+    assert lookup.call_count == 1
+    assert principal_cache.stats()["hits"] == 1
+    assert principal_cache.stats()["misses"] == 1
+
+def test_get_principal_unknown_user_not_cached(mock_db_session, monkeypatch):
+    monkeypatch.setattr(crud, "get_user_by_email", MagicMock(return_value=None))
+
+    assert get_principal(mock_db_session, email="ghost@example.com") is None
+    assert len(principal_cache) == 0
+
+def test_update_user_role_evicts_principal(mock_db_session, monkeypatch):
+    user = models.User(id=1, email="test@example.com", role="buyer")
+    monkeypatch.setattr(crud, "get_user_by_email", MagicMock(return_value=user))
+    get_principal(mock_db_session, email="test@example.com")
+    mock_db_session.query.return_value.filter.return_value.first.return_value = user
+
+    crud.update_user_role(mock_db_session, 1, "admin")
+
+    assert principal_cache.get("test@example.com") is None
+    assert get_principal(mock_db_session, email="test@example.com").role == "admin"
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+def test_ttl_cache_expires_entries(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("apps.api.src.cache.time.monotonic", lambda: now[0])
+    cache = TTLCache(maxsize=10, ttl=5)
+    cache.set("a", 1)
+
+    now[0] += 6
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
@@ -0,0 +1,132 @@
+import fnmatch
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from apps.api.src import catalog, crud, models, schemas, versions
+from apps.api.src.response_cache import InProcessBackend, RedisBackend, ResponseCache
+from apps.api.src.versions import InProcessVersions, RedisVersions
+
+
+class FakeRedis:
+    """The subset of redis.Redis the backend uses; expiry is not simulated."""
+
+    def __init__(self):
+        self.data = {}
+        self.expiry = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value.encode() if isinstance(value, str) else value
+        self.expiry[key] = ex
+        return True
+
+    def incr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def scan_iter(self, match):
+        return [key for key in self.data if fnmatch.fnmatch(key, match)]
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def incr(self, key):
+        self.commands.append(key)
+
+    def execute(self):
+        return [self.client.incr(key) for key in self.commands]
+
+
+@pytest.fixture(params=["memory", "redis"])
+def cache(request):
+    if request.param == "redis":
+        return ResponseCache(RedisBackend(FakeRedis(), ttl=60))
+    return ResponseCache(InProcessBackend(maxsize=10, ttl=60))
+
+@pytest.fixture(params=["memory", "redis"])
+def counters(request):
+    if request.param == "redis":
+        return RedisVersions(FakeRedis())
+    return InProcessVersions()
+
+def test_hits_and_misses_are_counted(cache):
+    key = cache.listing_key("v1", 0, None, 20, None, "asc")
+    assert cache.get(key) is None
+    cache.set(key, b"[]")
+    assert cache.get(key) == b"[]"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["hit_ratio"] == 0.5
+
+def test_get_many_keeps_key_order(cache):
+    cache.set(cache.product_key(2, "v1"), b"{2}")
+    keys = [cache.product_key(product_id, "v1") for product_id in (1, 2, 3)]
+    assert cache.get_many(keys) == [None, b"{2}", None]
+    assert cache.get_many([]) == []
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 2)
+
+def test_clear_drops_entries(cache):
+    key = cache.product_key(1, "v1")
+    cache.set(key, b"{}")
+    cache.clear()
+    assert cache.get(key) is None
+
+def test_redis_entries_expire_with_ttl():
+    client = FakeRedis()
+    cache = ResponseCache(RedisBackend(client, ttl=30))
+    cache.set(cache.product_key(1, "v1"), b"{}")
+    assert client.expiry["response-cache:product:1:v1"] == 30
+
+def test_versions_count_bumps(counters):
+    assert counters.get("catalog", "product:1") == [0, 0]
+    counters.bump("catalog", "product:1")
+    counters.bump("catalog")
+    assert counters.get("catalog", "product:1", "product:2") == [2, 1, 0]
+
+def test_redis_versions_share_the_epoch():
+    client = FakeRedis()
+    first, second = RedisVersions(client), RedisVersions(client)
+    first.bump("catalog")
+    assert second.epoch == first.epoch
+    assert second.get("catalog") == [1]
+    # Counters carry no TTL, so volatile-lru never evicts them
+    assert client.expiry["versions:epoch"] is None
+
+def test_product_and_cart_writes_change_tags(monkeypatch):
+    monkeypatch.setattr(versions, "versions", InProcessVersions())
+    engine = create_engine("sqlite://")
+    models.Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(models.Category(name="Electronics"))
+        db.commit()
+        product = crud.create_product(db, schemas.ProductCreate(name="Mouse", price=25.0, stock=10, category="Electronics"))
+        listing, detail = versions.tag("catalog"), versions.tag(versions.product(product.id))
+        crud.update_product(db, product.id, schemas.ProductUpdate(name="Trackball", price=25.0, stock=10, category="Electronics"))
+        assert versions.tag("catalog") != listing
+        assert versions.tag(versions.product(product.id)) != detail
+
+        detail = versions.tag(versions.product(product.id))
+        catalog.products_sold({product.id: 1})
+        assert versions.tag(versions.product(product.id)) != detail
+
+        cart = versions.tag(versions.cart(7))
+        crud.add_item_to_cart(db, user_id=7, product_id=product.id, quantity=1)
+        assert versions.tag(versions.cart(7)) != cart
@@ -0,0 +1,78 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+pytest.importorskip("numpy")
+
+from apps.api.src import catalog, crud, models, schemas
+from apps.api.src.search_index import SearchIndex
+
+@pytest.fixture
+def index():
+    index = SearchIndex()
+    index.add(1, "Laptop", "Powerful laptop for work", category_id=1)
+    index.add(2, "Laptop sleeve", "Padded sleeve", category_id=2)
+    index.add(3, "Desk lamp", "Lights up any laptop desk", category_id=1)
+    index.add(4, "Mouse", "Wireless mouse", category_id=1)
+    return index
+
+def test_search_ranks_name_matches_first(index):
+    assert [product_id for product_id, _ in index.search("laptop")] == [1, 2, 3]
+    assert index.search("keyboard") == []
+    assert index.search("") == []
+
+def test_search_scores_any_term(index):
+    hits = index.search("wireless sleeve")
+    assert {product_id for product_id, _ in hits} == {2, 4}
+
+def test_search_filters_by_category(index):
+    assert [product_id for product_id, _ in index.search("laptop", category_id=1)] == [1, 3]
+
+def test_search_pages_with_after(index):
+    first = index.search("laptop", limit=2)
+    score, product_id = first[-1][1], first[-1][0]
+    assert [product_id for product_id, _ in index.search("laptop", limit=2, after=[score, product_id])] == [3]
+
+def test_search_breaks_score_ties_by_id():
+    index = SearchIndex()
+    for product_id in (5, 3, 9, 1):
+        index.add(product_id, "Book", "Paperback")
+    assert [product_id for product_id, _ in index.search("book", limit=3)] == [1, 3, 5]
+
+def test_add_replaces_previous_version(index):
+    index.add(1, "Notebook", "Powerful notebook for work", category_id=1)
+    assert [product_id for product_id, _ in index.search("laptop")] == [2, 3]
+    assert [product_id for product_id, _ in index.search("notebook")] == [1]
+    assert index.stats()["dead_documents"] == 1
+
+def test_compact_keeps_results(index):
+    index.add(2, "Laptop sleeve", "Padded neoprene sleeve", category_id=2)
+    index.remove(4)
+    before = index.search("laptop sleeve neoprene")
+    index.compact()
+    assert index.search("laptop sleeve neoprene") == before
+    assert index.stats()["dead_documents"] == 0
+    assert index.search("mouse") == []
+
+def test_stats_reports_memory(index):
+    stats = index.stats()
+    assert stats["documents"] == 4
+    assert stats["memory_bytes"] > 0
+
+def test_product_writes_update_index():
+    engine = create_engine("sqlite://")
+    models.Base.metadata.create_all(engine)
+    index = SearchIndex()
+    catalog.on_product_change(index.add_product)
+    try:
+        with Session(engine) as db:
+            db.add(models.Category(name="Electronics"))
+            db.commit()
+            product = crud.create_product(db, schemas.ProductCreate(name="Mouse", description="Wireless", price=25.0, stock=10, category="Electronics"))
+            assert [product_id for product_id, _ in index.search("mouse")] == [product.id]
+
+            crud.update_product(db, product.id, schemas.ProductUpdate(name="Trackball", description="Wireless", price=25.0, stock=10, category="Electronics"))
+    finally:
+        catalog.remove_listener(index.add_product)
+    assert index.search("mouse") == []
+    assert [product_id for product_id, _ in index.search("trackball")] == [product.id]
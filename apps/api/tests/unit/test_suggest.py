@@ -0,0 +1,62 @@
+import pytest
+
+from apps.api.src import catalog, suggest
+from apps.api.src.suggest import SuggestIndex
+
+@pytest.fixture
+def index():
+    index = SuggestIndex()
+    index.load(
+        [(1, "Electronics"), (2, "Books")],
+        [(1, "Gaming Laptop", 1), (2, "Laptop Sleeve", 1), (3, "Lamp", 1), (4, "Learning Python", 2)],
+        {2: 5, 4: 1},
+    )
+    return index
+
+def texts(results):
+    return [result["text"] for result in results]
+
+def test_suggest_matches_any_word_start(index):
+    assert texts(index.suggest("lap")) == ["Laptop Sleeve", "Gaming Laptop"]
+    assert texts(index.suggest("SLEE")) == ["Laptop Sleeve"]
+    assert index.suggest("aptop") == []
+    assert index.suggest("  ") == []
+
+def test_suggest_ranks_by_units_sold(index):
+    assert texts(index.suggest("l")) == ["Laptop Sleeve", "Learning Python", "Gaming Laptop", "Lamp"]
+    index.record_sales({1: 10})
+    assert texts(index.suggest("l", limit=2)) == ["Gaming Laptop", "Laptop Sleeve"]
+
+def test_suggest_includes_categories(index):
+    assert index.suggest("ele") == [{"type": "category", "id": 1, "text": "Electronics"}]
+    # Electronics sold 5 units, Books 1
+    assert texts(index.suggest("b")) == ["Books"]
+
+def test_set_product_replaces_old_name(index):
+    index.suggest("lamp")
+    index.set_product(3, "Desk Light", 1)
+    assert index.suggest("lamp") == []
+    assert texts(index.suggest("light")) == ["Desk Light"]
+
+def test_product_writes_reach_process_index(index, monkeypatch):
+    monkeypatch.setattr(suggest, "_index", index)
+
+    class Product:
+        id, name, category_id, category = 5, "Laser Printer", 1, None
+
+    catalog.product_changed(Product())
+    assert texts(index.suggest("laser")) == ["Laser Printer"]
+    catalog.products_sold({5: 100})
+    assert texts(index.suggest("la"))[0] == "Laser Printer"
+
+def test_kept_results_follow_sales_and_renames(index, monkeypatch):
+    monkeypatch.setattr(suggest, "KEEP_RESULTS_ABOVE", 0)
+    assert texts(index.suggest("l", limit=2)) == ["Laptop Sleeve", "Learning Python"]
+    assert "l" in index._top
+
+    index.record_sales({3: 6})
+    assert texts(index.suggest("l", limit=2)) == ["Lamp", "Laptop Sleeve"]
+
+    index.set_product(3, "Floor Light", 1)
+    assert "l" not in index._top
+    assert texts(index.suggest("l", limit=2)) == ["Floor Light", "Laptop Sleeve"]
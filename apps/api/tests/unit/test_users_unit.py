@@ -58,3 +58,17 @@ def test_update_user_role_user_not_found(mock_db_session):
     mock_db_session.commit.assert_not_called()
     mock_db_session.refresh.assert_not_called()
 
+
+def test_get_users_reads_rows_outside_the_identity_map():
+    from sqlalchemy import create_engine
+    engine = create_engine("sqlite://")
+    models.Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add_all([models.User(email="a@example.com", hashed_password="x"), models.User(email="b@example.com", hashed_password="y")])
+        db.commit()
+        db.expunge_all()
+        users = crud.get_users(db)
+        assert [user.email for user in users] == ["a@example.com", "b@example.com"]
+        assert "hashed_password" not in users[0]._fields
+        assert len(db.identity_map) == 0
+        assert schemas.User.model_validate(users[0]).role == "buyer"
@@ -0,0 +1,81 @@
+"""Checkout latency and statement count for carts of 1, 50 and 500 lines.
+
+Usage (from the project root):
+    python scripts/bench_checkout.py --rounds 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(".")
+
+_db_dir = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench_checkout.db")
+
+import httpx
+from sqlalchemy import event
+
+from apps.api.src import models
+from apps.api.src.database import SessionLocal, engine
+from apps.api.src.main import app, create_access_token
+
+EMAIL = "bench-checkout@example.com"
+CART_SIZES = (1, 50, 500)
+
+
+def seed():
+    db = SessionLocal()
+    try:
+        user = models.User(email=EMAIL, hashed_password="x")
+        category = models.Category(name="Bench")
+        db.add_all([user, category])
+        db.flush()
+        db.add_all([
+            models.Product(name=f"Bench {i}", price=1.0 + i, stock=10**9, category_id=category.id)
+            for i in range(max(CART_SIZES))
+        ])
+        db.commit()
+        return user.id
+    finally:
+        db.close()
+
+
+def fill_cart(user_id, size):
+    db = SessionLocal()
+    try:
+        product_ids = [row.id for row in db.query(models.Product.id).order_by(models.Product.id).limit(size)]
+        db.add_all([models.CartItem(user_id=user_id, product_id=pid, quantity=1) for pid in product_ids])
+        db.commit()
+    finally:
+        db.close()
+
+
+async def main(args):
+    user_id = seed()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': EMAIL})}"}
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print("lines  median ms  p95 ms  statements")
+        for size in CART_SIZES:
+            timings = []
+            for _ in range(args.rounds):
+                fill_cart(user_id, size)
+                statements.clear()
+                started = time.perf_counter()
+                response = await client.post("/api/orders", headers=headers)
+                timings.append((time.perf_counter() - started) * 1000)
+                response.raise_for_status()
+            p95 = statistics.quantiles(timings, n=20)[18] if len(timings) >= 2 else timings[0]
+            print(f"{size:>5}  {statistics.median(timings):>9.2f}  {p95:>6.2f}  {len(statements):>10}", flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,106 @@
+"""Catalog export: GET /api/products/export throughput and memory on a large catalog.
+
+Seeds --products synthetic products, then streams the full dump in each format
+through the ASGI app, reporting time to first byte and rows/s, then the
+tracemalloc peak of a second, traced pass. The peak should not grow with
+--products.
+
+Usage (from the project root):
+    python scripts/bench_export.py --products 1000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(".")
+
+_db_dir = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench_export.db")
+
+from sqlalchemy import insert
+
+from apps.api.src import models
+from apps.api.src.database import SessionLocal, engine
+from apps.api.src.main import app, create_access_token
+
+EMAIL = "bench-admin@example.com"
+WORDS = ["red", "blue", "wireless", "compact", "vintage", "smart", "laptop", "mouse", "keyboard", "chair", "lamp", "kettle"]
+
+
+def seed(total, rng):
+    with SessionLocal() as db:
+        db.execute(insert(models.Category), [{"id": i, "name": f"Category {i}"} for i in range(1, 51)])
+        db.execute(insert(models.User), [{"email": EMAIL, "hashed_password": "x", "role": "admin"}])
+        for start in range(1, total + 1, 50_000):
+            db.connection().execute(insert(models.Product.__table__), [
+                {"id": i, "sku": f"SKU-{i}", "name": f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {i}",
+                 "description": " ".join(rng.choice(WORDS) for _ in range(8)), "price": rng.randint(100, 99_999) / 100,
+                 "stock": rng.randint(0, 500), "category_id": rng.randint(1, 50)}
+                for i in range(start, min(start + 50_000, total + 1))
+            ])
+        db.commit()
+
+
+async def export(format, token):
+    # Drives the ASGI app directly and drops each body chunk as it arrives; httpx's
+    # ASGITransport would buffer the whole response before returning it.
+    first_byte, lines, size = None, 0, 0
+    started = time.perf_counter()
+
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if requested:
+            await asyncio.Event().wait()  # no disconnect; the app stops listening when done
+        requested = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal first_byte, lines, size
+        if message["type"] == "http.response.start":
+            assert message["status"] == 200, message
+        elif message["type"] == "http.response.body" and message.get("body"):
+            first_byte = first_byte or time.perf_counter() - started
+            lines += message["body"].count(b"\n")
+            size += len(message["body"])
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": "/api/products/export", "raw_path": b"/api/products/export", "query_string": f"format={format}".encode(),
+        "headers": [(b"host", b"bench"), (b"authorization", f"Bearer {token}".encode())],
+        "client": ("127.0.0.1", 1), "server": ("bench", 80), "root_path": "",
+    }
+    await app(scope, receive, send)
+    return first_byte, time.perf_counter() - started, lines, size
+
+
+def main(args):
+    rng = random.Random(42)
+    models.Base.metadata.create_all(bind=engine)
+    started = time.perf_counter()
+    seed(args.products, rng)
+    print(f"seeded {args.products} products in {time.perf_counter() - started:.1f}s")
+    token = create_access_token({"sub": EMAIL})
+
+    for format in ("ndjson", "csv"):
+        first_byte, seconds, lines, size = asyncio.run(export(format, token))
+        # Tracing slows everything down, so memory is measured on a second pass.
+        tracemalloc.start()
+        asyncio.run(export(format, token))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rows = lines - (format == "csv")
+        print(f"{format:<7} {rows} rows, {size / 2**20:.0f} MiB in {seconds:.1f}s ({rows / seconds:.0f} rows/s), "
+              f"first byte {first_byte * 1000:.0f} ms, traced peak {peak / 2**20:.1f} MiB", flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=1_000_000)
+    main(parser.parse_args())
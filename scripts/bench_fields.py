@@ -0,0 +1,98 @@
+"""Product listing payloads and serialization paths.
+
+Seeds --products synthetic products with realistic descriptions, then for each
+page size reports the response bytes, query time (crud.get_products, a fresh
+session each run), serialization time and their total for:
+
+  orm   Product objects rendered through pydantic (schemas.Product), as before
+  rows  the same full response from Core rows (fieldsets.FIELDS, fast_json)
+  card  the listing-card fields id,name,price,imageUrl
+
+Usage (from the project root):
+    python scripts/bench_fields.py --products 50000 --repeat 50
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(".")
+
+_db_dir = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench_fields.db")
+
+from sqlalchemy import insert
+
+from apps.api.src import crud, fieldsets, models, response_cache as responses
+from apps.api.src.database import SessionLocal, engine
+
+PAGE_SIZES = (20, 100, 500)
+CARD_FIELDS = fieldsets.parse("id,name,price,imageUrl")
+WORDS = ["wireless", "compact", "durable", "premium", "lightweight", "ergonomic", "waterproof", "adjustable",
+         "rechargeable", "portable", "stainless", "steel", "cotton", "leather", "bluetooth", "battery"]
+
+
+def seed(total, rng):
+    with SessionLocal() as db:
+        db.execute(insert(models.Category), [{"id": i, "name": f"Category {i}"} for i in range(1, 51)])
+        db.connection().execute(insert(models.Product.__table__), [
+            {"id": i, "sku": f"SKU-{i}", "name": f"Product {i}", "price": rng.randint(100, 99_999) / 100,
+             "description": " ".join(rng.choice(WORDS) for _ in range(40)),
+             "image_url": f"https://cdn.example.com/products/{i}.jpg", "stock": rng.randint(0, 50),
+             "category_id": rng.randint(1, 50)}
+            for i in range(1, total + 1)
+        ])
+        db.commit()
+
+
+def timed(fn, repeat):
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return statistics.median(latencies)
+
+
+def query(limit, fields):
+    with SessionLocal() as db:
+        return crud.get_products(db, limit=limit, skip=limit, fields=fields)
+
+
+def render(products, fields):
+    if fields:
+        serialize = fieldsets.serializer(fields)
+        return fieldsets.render([serialize(product) for product in products])
+    return responses.render(responses.PRODUCT_LIST, products)
+
+
+def main(args):
+    rng = random.Random(42)
+    models.Base.metadata.create_all(bind=engine)
+    seed(args.products, rng)
+
+    print(f"{'page':>5} {'fields':<8} {'bytes':>9} {'query ms':>9} {'render ms':>10} {'total ms':>9}")
+    for limit in PAGE_SIZES:
+        for label, fields in (("orm", None), ("rows", fieldsets.FIELDS), ("card", CARD_FIELDS)):
+            def full_request():
+                # The full path renders while the session (and lazy category loads) is open
+                with SessionLocal() as db:
+                    render(crud.get_products(db, limit=limit, skip=limit, fields=fields), fields)
+
+            with SessionLocal() as db:
+                products = crud.get_products(db, limit=limit, skip=limit, fields=fields)
+                size = len(render(products, fields))
+                render_ms = timed(lambda: render(products, fields), args.repeat)
+            query_ms = timed(lambda: query(limit, fields), args.repeat)
+            total_ms = timed(full_request, args.repeat)
+            print(f"{limit:>5} {label:<8} {size:>9} {query_ms:>9.2f} {render_ms:>10.2f} {total_ms:>9.2f}", flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    main(parser.parse_args())
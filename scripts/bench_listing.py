@@ -0,0 +1,92 @@
+"""Product listings: SQL vs. the columnar snapshot (LISTING_BACKEND=memory).
+
+Seeds --products synthetic products, builds a CatalogSnapshot, then times
+crud.get_products for common listing shapes both ways: computing the page ids
+alone and the full call (page ids plus loading the page rows).
+
+Usage (from the project root):
+    python scripts/bench_listing.py --products 1000000 --repeat 50
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(".")
+
+_db_dir = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench_listing.db")
+
+from sqlalchemy import insert
+
+from apps.api.src import crud, models
+from apps.api.src.catalog_snapshot import SnapshotEngine
+from apps.api.src.database import SessionLocal, engine
+
+QUERIES = {
+    "newest ids": {},
+    "price asc": {"sort_by_price": "asc"},
+    "category, price desc": {"category_id": 7, "sort_by_price": "desc"},
+    "price range, in stock": {"min_price": 100, "max_price": 200, "in_stock": True, "sort_by_price": "asc"},
+    "category, in stock, page 50": {"category_id": 7, "in_stock": True, "skip": 50 * 20},
+}
+
+
+def seed(total, rng):
+    with SessionLocal() as db:
+        db.execute(insert(models.Category), [{"id": i, "name": f"Category {i}"} for i in range(1, 51)])
+        for start in range(1, total + 1, 50_000):
+            db.connection().execute(insert(models.Product.__table__), [
+                {"id": i, "name": f"Product {i}", "price": rng.randint(100, 99_999) / 100,
+                 "stock": rng.choice([0, 0, 1, 5, 20]), "category_id": rng.randint(1, 50)}
+                for i in range(start, min(start + 50_000, total + 1))
+            ])
+        db.commit()
+
+
+def percentiles(latencies):
+    return statistics.median(latencies), statistics.quantiles(latencies, n=100)[98]
+
+
+def timed(fn, repeat):
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return percentiles(latencies)
+
+
+def main(args):
+    rng = random.Random(42)
+    models.Base.metadata.create_all(bind=engine)
+    seed(args.products, rng)
+
+    snapshots = SnapshotEngine(engine)
+    started = time.perf_counter()
+    snapshot = snapshots.refresh()
+    print(f"snapshot of {len(snapshot)} products in {time.perf_counter() - started:.2f}s, {snapshot.memory_bytes() / 2**20:.1f} MiB")
+
+    print(f"{'query':<30} {'sql p50':>9} {'sql p99':>9} {'ids p50':>9} {'ids p99':>9} {'full p50':>9} {'full p99':>9}")
+    with SessionLocal() as db:
+        for label, query in QUERIES.items():
+            query = {"limit": 20, **query}
+            crud.product_snapshots = None
+            sql = [product.id for product in crud.get_products(db, **query)]
+            sql_p50, sql_p99 = timed(lambda: crud.get_products(db, **query), args.repeat)
+            crud.product_snapshots = snapshots
+            assert [product.id for product in crud.get_products(db, **query)] == sql
+            ids_p50, ids_p99 = timed(lambda: snapshot.page(**query), args.repeat)
+            full_p50, full_p99 = timed(lambda: crud.get_products(db, **query), args.repeat)
+            db.expunge_all()
+            print(f"{label:<30} {sql_p50:>9.2f} {sql_p99:>9.2f} {ids_p50:>9.2f} {ids_p99:>9.2f} {full_p50:>9.2f} {full_p99:>9.2f}", flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    main(parser.parse_args())
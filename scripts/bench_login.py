@@ -0,0 +1,101 @@
+"""Login throughput vs. hashing pool size, and cart latency during a login storm.
+
+Usage (from the project root):
+    python scripts/bench_login.py --logins 200 --concurrency 32
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(".")
+
+_db_dir = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench_login.db")
+
+import httpx
+
+from apps.api.src import hashing, schemas, crud
+from apps.api.src.database import SessionLocal
+from apps.api.src.main import app, create_access_token
+
+EMAIL = "bench@example.com"
+PASSWORD = "bench-password"
+
+
+def seed_user():
+    db = SessionLocal()
+    try:
+        if crud.get_user_by_email(db, email=EMAIL) is None:
+            crud.create_user(db, schemas.UserCreate(email=EMAIL, password=PASSWORD))
+    finally:
+        db.close()
+
+
+async def login(client):
+    response = await client.post("/api/auth/login", data={"username": EMAIL, "password": PASSWORD})
+    response.raise_for_status()
+
+
+async def run_logins(client, total, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await login(client)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return total / (time.perf_counter() - started)
+
+
+async def cart_latencies(client, headers, duration):
+    latencies = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        response = await client.get("/api/cart", headers=headers)
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def p99(values):
+    return statistics.quantiles(values, n=100)[98] if len(values) >= 2 else values[0]
+
+
+async def main(args):
+    seed_user()
+    token = create_access_token({"sub": EMAIL})
+    headers = {"Authorization": f"Bearer {token}"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print("workers  logins/sec")
+        workers = 1
+        while workers <= args.max_workers:
+            hashing.configure(workers)
+            await login(client)  # warm up the pool
+            rate = await run_logins(client, args.logins, args.concurrency)
+            print(f"{workers:>7}  {rate:>10.1f}")
+            workers *= 2
+
+        hashing.configure(args.max_workers)
+        idle = await cart_latencies(client, headers, args.duration)
+        storm = asyncio.ensure_future(run_logins(client, args.logins * 4, args.concurrency))
+        busy = await cart_latencies(client, headers, args.duration)
+        await storm
+        print(f"cart p99 idle:        {p99(idle):.2f} ms ({len(idle)} requests)")
+        print(f"cart p99 login storm: {p99(busy):.2f} ms ({len(busy)} requests)")
+    hashing.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--duration", type=float, default=3.0)
+    asyncio.run(main(parser.parse_args()))
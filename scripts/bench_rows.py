@@ -0,0 +1,96 @@
+"""Read-only result sets: ORM entities vs. Core rows.
+
+Seeds --rows products and users, then loads --rows of each both ways and
+reports rows/sec (median of --repeat loads, fresh session each) and the memory
+each loaded row keeps alive while the result is held (tracemalloc, session open):
+
+  products  orm   db.query(Product), categories joined (what listings loaded before)
+            rows  crud.get_products(fields=fieldsets.FIELDS)
+  users     orm   db.query(User)
+            rows  crud.get_users (crud.read_only)
+
+Usage (from the project root):
+    python scripts/bench_rows.py --rows 10000 --repeat 20
+"""
+import argparse
+import gc
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(".")
+
+_db_dir = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench_rows.db")
+
+from sqlalchemy import insert
+from sqlalchemy.orm import joinedload
+
+from apps.api.src import crud, fieldsets, models
+from apps.api.src.database import SessionLocal, engine
+
+
+def seed(total):
+    with SessionLocal() as db:
+        db.execute(insert(models.Category), [{"id": i, "name": f"Category {i}"} for i in range(1, 51)])
+        db.connection().execute(insert(models.Product.__table__), [
+            {"id": i, "sku": f"SKU-{i}", "name": f"Product {i}", "price": i / 100, "description": "A product " * 10,
+             "image_url": f"https://cdn.example.com/{i}.jpg", "stock": i % 50, "category_id": i % 50 + 1}
+            for i in range(1, total + 1)
+        ])
+        db.connection().execute(insert(models.User.__table__), [
+            {"id": i, "email": f"user{i}@example.com", "hashed_password": "x" * 60, "role": "buyer"}
+            for i in range(1, total + 1)
+        ])
+        db.commit()
+
+
+def loaders(total):
+    return {
+        ("products", "orm"): lambda db: db.query(models.Product).options(joinedload(models.Product.category))
+                                          .order_by(models.Product.id).limit(total).all(),
+        ("products", "rows"): lambda db: crud.get_products(db, limit=total, fields=fieldsets.FIELDS),
+        ("users", "orm"): lambda db: db.query(models.User).limit(total).all(),
+        ("users", "rows"): lambda db: crud.get_users(db, limit=total),
+    }
+
+
+def rows_per_second(load, repeat):
+    seconds = []
+    for _ in range(repeat):
+        with SessionLocal() as db:
+            started = time.perf_counter()
+            rows = load(db)
+            seconds.append(time.perf_counter() - started)
+    return len(rows) / statistics.median(seconds)
+
+
+def bytes_per_row(load):
+    with SessionLocal() as db:
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        rows = load(db)
+        gc.collect()
+        held = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        return held / len(rows)
+
+
+def main(args):
+    models.Base.metadata.create_all(bind=engine)
+    seed(args.rows)
+    print(f"{'query':<10} {'mode':<5} {'rows/s':>10} {'bytes/row':>10}")
+    for (query, mode), load in loaders(args.rows).items():
+        rate = rows_per_second(load, args.repeat)
+        print(f"{query:<10} {mode:<5} {rate:>10.0f} {bytes_per_row(load):>10.0f}", flush=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    main(parser.parse_args())
@@ -0,0 +1,90 @@
+"""In-memory BM25 index: build time, memory and query latency on a synthetic catalog.
+
+Builds apps.api.src.search_index.SearchIndex straight from generated rows (no
+database), reports its own accounting of the buffers next to the tracemalloc
+peak, then times searches and incremental updates.
+
+Usage (from the project root):
+    python scripts/bench_search_index.py --products 500000 --repeat 200
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.append(".")
+
+from apps.api.src.search_index import SearchIndex
+
+ADJECTIVES = ["red", "blue", "wireless", "compact", "vintage", "smart", "ergonomic", "waterproof", "portable", "premium",
+              "leather", "steel", "organic", "classic", "ultra", "silent", "foldable", "heavy", "light", "modular"]
+NOUNS = ["laptop", "mouse", "keyboard", "monitor", "chair", "desk", "lamp", "backpack", "speaker", "headphones",
+         "jacket", "boots", "kettle", "blender", "camera", "tripod", "novel", "puzzle", "drone", "watch"]
+FILLER = ["with", "for", "and", "durable", "design", "everyday", "use", "battery", "warranty", "fast", "quiet",
+          "travel", "home", "office", "gift", "edition", "build", "quality", "comfort", "power"]
+QUERIES = ["laptop", "wireless headphones", "vintage leather boots", "ergonomic office chair", "kettle warranty", "77777", "zeppelin"]
+
+
+def products(total, rng):
+    for product_id in range(1, total + 1):
+        yield (
+            product_id,
+            f"{rng.choice(ADJECTIVES)} {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {product_id}",
+            " ".join(rng.choice(FILLER + ADJECTIVES + NOUNS) for _ in range(12)),
+            rng.randint(1, 50),
+        )
+
+
+def percentiles(latencies):
+    return statistics.median(latencies), statistics.quantiles(latencies, n=100)[98]
+
+
+def timed(fn, repeat):
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return percentiles(latencies)
+
+
+def main(args):
+    rng = random.Random(42)
+    rows = list(products(args.products, rng))
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    index = SearchIndex()
+    for row in rows:
+        index.add(*row)
+    build_seconds = time.perf_counter() - started
+    traced, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stats = index.stats()
+    print(f"built {stats['documents']} documents, {stats['terms']} terms, {stats['postings']} postings in {build_seconds:.1f}s")
+    print(f"index accounting: {stats['memory_bytes'] / 2**20:.1f} MiB, tracemalloc: {traced / 2**20:.1f} MiB (peak {peak / 2**20:.1f} MiB)")
+
+    print(f"{'query':<28} {'p50 ms':>8} {'p99 ms':>8} {'page2 p50':>10}")
+    for q in QUERIES:
+        category_id = 7 if " " in q else None
+        hits = index.search(q, category_id=category_id)
+        after = [hits[-1][1], hits[-1][0]] if hits else None
+        p50, p99 = timed(lambda: index.search(q, category_id=category_id), args.repeat)
+        page2_p50, _ = timed(lambda: index.search(q, category_id=category_id, after=after), args.repeat)
+        label = q + (f" [cat {category_id}]" if category_id else "")
+        print(f"{label:<28} {p50:>8.3f} {p99:>8.3f} {page2_p50:>10.3f}", flush=True)
+
+    updates = [rows[rng.randrange(len(rows))] for _ in range(args.repeat)]
+    update_p50, update_p99 = timed(lambda: index.add(*updates.pop()), args.repeat)
+    print(f"{'update':<28} {update_p50:>8.3f} {update_p99:>8.3f}")
+    print(f"index accounting with cached term weights: {index.stats()['memory_bytes'] / 2**20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=200)
+    main(parser.parse_args())
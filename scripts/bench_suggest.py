@@ -0,0 +1,119 @@
+"""Autocomplete latency: SuggestIndex lookups and GET /api/products/suggest throughput.
+
+Seeds --products synthetic products with order history, then reports index
+lookup p50/p99 for typed prefixes (1-4 characters), first with no short-prefix
+results kept and then in steady state with sales coming in, and end-to-end
+request rate and p99 through the ASGI app.
+
+Usage (from the project root):
+    python scripts/bench_suggest.py --products 100000 --requests 20000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(".")
+
+_db_dir = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench_suggest.db")
+
+import httpx
+from sqlalchemy import insert
+
+from apps.api.src import models, suggest
+from apps.api.src.database import SessionLocal, engine
+from apps.api.src.main import app
+
+WORDS = ["red", "blue", "wireless", "compact", "vintage", "smart", "ergonomic", "waterproof", "portable", "premium",
+         "laptop", "mouse", "keyboard", "monitor", "chair", "desk", "lamp", "backpack", "speaker", "headphones",
+         "jacket", "boots", "kettle", "blender", "camera", "tripod", "novel", "puzzle", "drone", "watch"]
+
+
+def seed(total, rng):
+    with SessionLocal() as db:
+        db.execute(insert(models.Category), [{"id": i, "name": f"{rng.choice(WORDS).title()} {i}"} for i in range(1, 51)])
+        db.execute(insert(models.Product), [
+            {"id": i, "name": f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {i}", "price": 1.0, "stock": 10,
+             "category_id": rng.randint(1, 50)}
+            for i in range(1, total + 1)
+        ])
+        db.execute(insert(models.User), [{"id": 1, "email": "bench@example.com", "hashed_password": "x"}])
+        db.execute(insert(models.Order), [{"id": 1, "user_id": 1, "total_amount": 1.0}])
+        db.execute(insert(models.OrderItem), [
+            {"order_id": 1, "product_id": rng.randint(1, total), "quantity": rng.randint(1, 5), "price": 1.0}
+            for _ in range(total // 10)
+        ])
+        db.commit()
+
+
+def typed_prefixes(rng, count):
+    # Prefixes as a user types them: mostly 1-4 characters of a catalog word
+    return [rng.choice(WORDS)[:rng.randint(1, 4)] for _ in range(count)]
+
+
+def percentiles(latencies):
+    return statistics.median(latencies), statistics.quantiles(latencies, n=100)[98]
+
+
+def lookups(index, prefixes, rng, cold=False, products=0):
+    latencies = []
+    for n, prefix in enumerate(prefixes):
+        if cold:
+            index._top.clear()
+        elif products and n % 10 == 0:
+            index.record_sales({rng.randint(1, products): 1})  # a checkout every 10 keystrokes
+        started = time.perf_counter()
+        index.suggest(prefix)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return percentiles(latencies)
+
+
+async def http_load(prefixes, concurrency):
+    latencies = []
+    queue = iter(prefixes)
+
+    async def worker(client):
+        for prefix in queue:
+            started = time.perf_counter()
+            response = await client.get("/api/products/suggest", params={"prefix": prefix})
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return len(latencies) / elapsed, *percentiles(latencies)
+
+
+def main(args):
+    rng = random.Random(42)
+    models.Base.metadata.create_all(bind=engine)
+    seed(args.products, rng)
+
+    started = time.perf_counter()
+    index = suggest.get_index()
+    print(f"built index over {args.products} products in {time.perf_counter() - started:.2f}s")
+
+    prefixes = typed_prefixes(rng, args.requests)
+    cold_p50, cold_p99 = lookups(index, prefixes[:2000], rng, cold=True)
+    warm_p50, warm_p99 = lookups(index, prefixes, rng, products=args.products)
+    print(f"lookup, nothing kept:         p50 {cold_p50:.3f} ms  p99 {cold_p99:.3f} ms")
+    print(f"lookup, steady state + sales: p50 {warm_p50:.3f} ms  p99 {warm_p99:.3f} ms")
+
+    rate, p50, p99 = asyncio.run(http_load(prefixes, args.concurrency))
+    print(f"http ({args.concurrency} clients): {rate:.0f} req/s  p50 {p50:.2f} ms  p99 {p99:.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=1)
+    main(parser.parse_args())
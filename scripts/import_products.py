@@ -0,0 +1,48 @@
+"""Bulk-load a product feed (CSV with a header row, or NDJSON) into the catalog.
+
+Rows are upserted on sku in chunks of multi-row statements; each chunk's size,
+time and throughput is printed as it commits, row errors are listed at the end
+and never stop the load.
+
+Columns / keys: sku, name, description, price, image_url, stock, category (name).
+
+Usage (from the project root):
+    python scripts/import_products.py feed.csv
+    python scripts/import_products.py feed.ndjson --format ndjson --create-categories
+"""
+import argparse
+import json
+import sys
+
+sys.path.append(".")
+
+from apps.api.src import bulk_import
+from apps.api.src.database import SessionLocal
+
+
+def print_chunk(stats):
+    print(f"chunk {stats['chunk']}: {stats['written']}/{stats['rows']} rows in {stats['seconds']:.3f}s ({stats['rows_per_second']} rows/s)", flush=True)
+
+
+def main(args):
+    format = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+    with open(args.path, "rb") as feed, SessionLocal() as db:
+        records = bulk_import.parse_records(bulk_import.iter_lines(iter(lambda: feed.read(1 << 16), b"")), format)
+        report = bulk_import.import_products(
+            db, records, chunk_size=args.chunk_size, create_categories=args.create_categories, on_chunk=print_chunk
+        )
+    for error in report["errors"]:
+        print(json.dumps(error), file=sys.stderr)
+    if report["created_categories"]:
+        print(f"created categories: {', '.join(report['created_categories'])}")
+    print(f"{report['written']} written, {report['failed']} failed of {report['rows']} rows in {report['seconds']:.1f}s ({report['rows_per_second']} rows/s)")
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=bulk_import.FORMATS)
+    parser.add_argument("--chunk-size", type=int, default=bulk_import.BULK_IMPORT_CHUNK_SIZE)
+    parser.add_argument("--create-categories", action="store_true", help="create categories missing from the catalog instead of rejecting their rows")
+    sys.exit(main(parser.parse_args()))